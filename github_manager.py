@@ -4,163 +4,906 @@ Github Manager - A tool for managing GitHub repositories and automating workflow
 """
 
 import os
+import sys
+import asyncio
+import atexit
+import codecs
+import contextlib
+import contextvars
+import inspect
+import io
+import itertools
+import sqlite3
 import subprocess
 import json
+import random
+import shutil
 import datetime
+import functools
+import hashlib
+import heapq
+import http.client
 import re
-from typing import Dict, List, Optional, Tuple
+import signal
+import socket
+import socketserver
+import tempfile
+import time
+import threading
+import types
+import urllib.parse
+import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from pathlib import Path
 
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class CommandRecord:
+    """One finished process: argv, timings, exit code and bytes read from it"""
+    __slots__ = ('argv', 'method', 'spawn_seconds', 'duration', 'returncode', 'output_bytes')
+    
+    def __init__(self, argv: List[str], method: Optional[str], spawn_seconds: float, duration: float,
+                 returncode: Optional[int], output_bytes: int):
+        self.argv = argv
+        self.method = method
+        self.spawn_seconds = spawn_seconds
+        self.duration = duration
+        self.returncode = returncode
+        self.output_bytes = output_bytes
+    
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class Span:
+    """Time spent in one public method call, with the git processes it started"""
+    __slots__ = ('name', 'parent', 'started', 'duration', 'spawns', 'spawn_seconds', 'git_seconds', 'commands')
+    
+    def __init__(self, name: str, parent: Optional['Span']):
+        self.name = name
+        self.parent = parent
+        self.started = time.perf_counter()
+        self.duration = None
+        self.spawns = 0
+        self.spawn_seconds = 0.0
+        self.git_seconds = 0.0
+        self.commands = []
+    
+    def to_dict(self) -> Dict:
+        return {"name": self.name, "parent": self.parent.name if self.parent else None,
+                "duration": self.duration, "spawns": self.spawns, "spawn_seconds": self.spawn_seconds,
+                "git_seconds": self.git_seconds, "commands": [record.to_dict() for record in self.commands]}
+
+_CURRENT_SPAN = contextvars.ContextVar('github_manager_span', default=None)
+
+def _histogram() -> List[int]:
+    return [0] * (len(DURATION_BUCKETS) + 1)
+
+def _observe(histogram: List[int], seconds: float) -> None:
+    for i, bound in enumerate(DURATION_BUCKETS):
+        if seconds <= bound:
+            histogram[i] += 1
+            return
+    histogram[-1] += 1
+
+def git_subcommand(argv: List[str]) -> str:
+    """The git subcommand in an argv (`status` for `git -c x=y status ...`)"""
+    if not argv or os.path.basename(argv[0]) != 'git':
+        return os.path.basename(argv[0]) if argv else ''
+    args = iter(argv[1:])
+    for arg in args:
+        if arg in ('-c', '-C', '--git-dir', '--work-tree', '--namespace'):
+            next(args, None)
+        elif not arg.startswith('-'):
+            return arg
+    return 'git'
+
+class Telemetry:
+    """Counters and histograms for every git process and every instrumented method call
+    
+    Commands are attributed to the innermost active span, and their time and
+    spawn counts roll up into every enclosing span. `spawn_seconds` is the time
+    to start a process (fork/exec) and `duration` runs until it is reaped, so a
+    method whose git time is mostly spawn time is spawn-bound.
+    """
+    
+    def __init__(self, max_records: int = 1000, max_spans: int = 1000):
+        self._lock = threading.Lock()
+        self.max_records = max_records
+        self.reset(max_spans)
+    
+    def reset(self, max_spans: int = None) -> None:
+        with self._lock:
+            self.started = 0
+            self.commands = {}
+            self.methods = {}
+            self.records = deque(maxlen=self.max_records)
+            self.spans = deque(maxlen=max_spans or self.spans.maxlen)
+    
+    @contextlib.contextmanager
+    def span(self, name: str):
+        """Attribute git processes started inside the block to `name`"""
+        span = Span(name, _CURRENT_SPAN.get())
+        token = _CURRENT_SPAN.set(span)
+        try:
+            yield span
+        finally:
+            _CURRENT_SPAN.reset(token)
+            self.finish_span(span)
+    
+    def finish_span(self, span: Span) -> None:
+        span.duration = time.perf_counter() - span.started
+        with self._lock:
+            stats = self.methods.get(span.name)
+            if stats is None:
+                stats = self.methods[span.name] = {"calls": 0, "seconds": 0.0, "git_seconds": 0.0,
+                                                   "spawn_seconds": 0.0, "spawns": 0, "buckets": _histogram()}
+            stats["calls"] += 1
+            stats["seconds"] += span.duration
+            stats["git_seconds"] += span.git_seconds
+            stats["spawn_seconds"] += span.spawn_seconds
+            stats["spawns"] += span.spawns
+            _observe(stats["buckets"], span.duration)
+            if span.parent is None:
+                self.spans.append(span)
+    
+    def process_started(self, span: Optional[Span]) -> None:
+        with self._lock:
+            self.started += 1
+            while span is not None:
+                span.spawns += 1
+                span = span.parent
+    
+    def record(self, argv: List[str], spawn_seconds: float, duration: float, returncode: Optional[int],
+               output_bytes: int, span: Optional[Span]) -> CommandRecord:
+        """Account for one finished process started while `span` was active"""
+        record = CommandRecord([str(arg) for arg in argv], span.name if span else None,
+                               spawn_seconds, duration, returncode, output_bytes)
+        command = git_subcommand(record.argv)
+        with self._lock:
+            stats = self.commands.get(command)
+            if stats is None:
+                stats = self.commands[command] = {"ok": 0, "error": 0, "seconds": 0.0, "spawn_seconds": 0.0,
+                                                  "output_bytes": 0, "buckets": _histogram()}
+            stats["ok" if returncode == 0 else "error"] += 1
+            stats["seconds"] += duration
+            stats["spawn_seconds"] += spawn_seconds
+            stats["output_bytes"] += output_bytes
+            _observe(stats["buckets"], duration)
+            self.records.append(record)
+            if span is not None and len(span.commands) < 1000:
+                span.commands.append(record)
+            while span is not None:
+                span.git_seconds += duration
+                span.spawn_seconds += spawn_seconds
+                span = span.parent
+        return record
+    
+    def prometheus(self) -> str:
+        """All counters and histograms in the Prometheus text exposition format"""
+        def label(value: str) -> str:
+            return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        
+        def histogram(lines: List[str], name: str, labels: str, buckets: List[int], total: float) -> None:
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS + (float('inf'),), buckets):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{labels}}} {total}')
+            lines.append(f'{name}_count{{{labels}}} {cumulative}')
+        
+        with self._lock:
+            commands = {name: dict(stats, buckets=list(stats["buckets"])) for name, stats in self.commands.items()}
+            methods = {name: dict(stats, buckets=list(stats["buckets"])) for name, stats in self.methods.items()}
+            started = self.started
+        
+        lines = ['# HELP github_manager_processes_started_total Processes started by github_manager.',
+                 '# TYPE github_manager_processes_started_total counter',
+                 f'github_manager_processes_started_total {started}',
+                 '# HELP github_manager_git_commands_total Finished git processes by subcommand and outcome.',
+                 '# TYPE github_manager_git_commands_total counter']
+        for name, stats in sorted(commands.items()):
+            for outcome in ('ok', 'error'):
+                lines.append(f'github_manager_git_commands_total{{command="{label(name)}",outcome="{outcome}"}} {stats[outcome]}')
+        for metric, key, help_text in (
+                ('github_manager_git_spawn_seconds_total', 'spawn_seconds', 'Time spent starting git processes.'),
+                ('github_manager_git_output_bytes_total', 'output_bytes', 'Bytes read from git processes.')):
+            lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} counter']
+            for name, stats in sorted(commands.items()):
+                lines.append(f'{metric}{{command="{label(name)}"}} {stats[key]}')
+        lines += ['# HELP github_manager_git_command_duration_seconds Wall time of git processes, start to exit.',
+                  '# TYPE github_manager_git_command_duration_seconds histogram']
+        for name, stats in sorted(commands.items()):
+            histogram(lines, 'github_manager_git_command_duration_seconds', f'command="{label(name)}"',
+                      stats["buckets"], stats["seconds"])
+        
+        for metric, key, help_text in (
+                ('github_manager_method_calls_total', 'calls', 'Calls to instrumented methods.'),
+                ('github_manager_method_spawns_total', 'spawns', 'Processes started inside each method.'),
+                ('github_manager_method_git_seconds_total', 'git_seconds', 'Time spent waiting on git in each method.')):
+            lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} counter']
+            for name, stats in sorted(methods.items()):
+                lines.append(f'{metric}{{method="{label(name)}"}} {stats[key]}')
+        lines += ['# HELP github_manager_method_duration_seconds Wall time of instrumented method calls.',
+                  '# TYPE github_manager_method_duration_seconds histogram']
+        for name, stats in sorted(methods.items()):
+            histogram(lines, 'github_manager_method_duration_seconds', f'method="{label(name)}"',
+                      stats["buckets"], stats["seconds"])
+        return '\n'.join(lines) + '\n'
+    
+    def profile_report(self, slowest: int = 10) -> str:
+        """Human-readable per-method and per-command breakdown"""
+        with self._lock:
+            methods = sorted(self.methods.items(), key=lambda item: -item[1]["seconds"])
+            commands = sorted(self.commands.items(), key=lambda item: -item[1]["seconds"])
+            records = sorted(self.records, key=lambda record: -record.duration)[:slowest]
+            started = self.started
+        
+        lines = [f"Profile: {started} process(es) started",
+                 f"  {'method':<40} {'calls':>6} {'total ms':>10} {'git ms':>10} {'spawn ms':>10} {'spawns':>7}"]
+        for name, stats in methods:
+            lines.append(f"  {name:<40} {stats['calls']:>6} {stats['seconds'] * 1000:>10.2f} "
+                         f"{stats['git_seconds'] * 1000:>10.2f} {stats['spawn_seconds'] * 1000:>10.2f} {stats['spawns']:>7}")
+        lines.append(f"  {'git command':<40} {'runs':>6} {'total ms':>10} {'spawn ms':>10} {'bytes':>10} {'failed':>7}")
+        for name, stats in commands:
+            lines.append(f"  {name:<40} {stats['ok'] + stats['error']:>6} {stats['seconds'] * 1000:>10.2f} "
+                         f"{stats['spawn_seconds'] * 1000:>10.2f} {stats['output_bytes']:>10} {stats['error']:>7}")
+        if records:
+            lines.append("  slowest invocations:")
+            for record in records:
+                argv = ' '.join(record.argv)
+                lines.append(f"  {record.duration * 1000:>9.2f} ms  exit {record.returncode}  "
+                             f"{record.method or '-'}: {argv[:100]}")
+        return '\n'.join(lines) + '\n'
+
+TELEMETRY = Telemetry()
+
+def instrumented(cls):
+    """Class decorator: run each public method of `cls` inside a telemetry span"""
+    for name, func in list(vars(cls).items()):
+        if name.startswith('_') or not inspect.isfunction(func):
+            continue
+        setattr(cls, name, _traced(func, f"{cls.__name__}.{name}"))
+    return cls
+
+def _traced(func: Callable, name: str) -> Callable:
+    if inspect.isasyncgenfunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            span = Span(name, _CURRENT_SPAN.get())
+            agen = func(*args, **kwargs)
+            try:
+                while True:
+                    token = _CURRENT_SPAN.set(span)
+                    try:
+                        item = await agen.__anext__()
+                    except StopAsyncIteration:
+                        return
+                    finally:
+                        _CURRENT_SPAN.reset(token)
+                    yield item
+            finally:
+                await agen.aclose()
+                TELEMETRY.finish_span(span)
+    elif inspect.isgeneratorfunction(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # The span is only current while the generator runs, never while the caller does
+            span = Span(name, _CURRENT_SPAN.get())
+            gen = func(*args, **kwargs)
+            try:
+                while True:
+                    token = _CURRENT_SPAN.set(span)
+                    try:
+                        item = next(gen)
+                    except StopIteration:
+                        return
+                    finally:
+                        _CURRENT_SPAN.reset(token)
+                    yield item
+            finally:
+                gen.close()
+                TELEMETRY.finish_span(span)
+    elif inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with TELEMETRY.span(name):
+                return await func(*args, **kwargs)
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with TELEMETRY.span(name):
+                return func(*args, **kwargs)
+    return wrapper
+
+class _CountingReader:
+    """Wrap a process pipe and count the bytes read through it"""
+    
+    def __init__(self, stream):
+        self._stream = stream
+        self.bytes = 0
+    
+    def read(self, *args):
+        data = self._stream.read(*args)
+        self.bytes += len(data)
+        return data
+    
+    def read1(self, *args):
+        data = self._stream.read1(*args)
+        self.bytes += len(data)
+        return data
+    
+    def readline(self, *args):
+        data = self._stream.readline(*args)
+        self.bytes += len(data)
+        return data
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        line = self.readline()
+        if not line:
+            raise StopIteration
+        return line
+    
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+class _InstrumentedPopen(subprocess.Popen):
+    """Popen that reports itself to TELEMETRY once it has been waited for"""
+    
+    def __init__(self, args, **kwargs):
+        started = time.perf_counter()
+        span = _CURRENT_SPAN.get()
+        super().__init__(args, **kwargs)
+        self._started = started
+        self._spawn_seconds = time.perf_counter() - started
+        self._span = span
+        self._recorded = False
+        self._communicating = False
+        if self.stdout is not None:
+            self.stdout = _CountingReader(self.stdout)
+        TELEMETRY.process_started(span)
+    
+    def _finish(self, output_bytes: Optional[int] = None) -> None:
+        if not self._recorded and not self._communicating:
+            self._recorded = True
+            if output_bytes is None:
+                output_bytes = self.stdout.bytes if isinstance(self.stdout, _CountingReader) else 0
+            TELEMETRY.record(self.args, self._spawn_seconds, time.perf_counter() - self._started,
+                             self.returncode, output_bytes, self._span)
+    
+    def poll(self):
+        returncode = super().poll()
+        if returncode is not None:
+            self._finish()
+        return returncode
+    
+    def wait(self, timeout=None):
+        returncode = super().wait(timeout)
+        self._finish()
+        return returncode
+    
+    def communicate(self, input=None, timeout=None):
+        # communicate() may read the pipes directly, so count what it returns instead
+        stdout = stderr = None
+        self._communicating = True
+        try:
+            stdout, stderr = super().communicate(input, timeout)
+            return stdout, stderr
+        finally:
+            self._communicating = False
+            if self.returncode is not None:
+                self._finish(len(stdout or b'') + len(stderr or b''))
+
+def start_command(cmd: List[str], **kwargs) -> subprocess.Popen:
+    """subprocess.Popen, recorded in TELEMETRY when the process is reaped"""
+    return _InstrumentedPopen(cmd, **kwargs)
+
+def run_command(cmd: List[str], input=None, capture_output: bool = False, timeout: Optional[float] = None,
+                check: bool = False, **kwargs) -> subprocess.CompletedProcess:
+    """subprocess.run, recorded in TELEMETRY; every synchronous git call goes through here"""
+    if input is not None:
+        kwargs['stdin'] = subprocess.PIPE
+    if capture_output:
+        kwargs['stdout'] = kwargs['stderr'] = subprocess.PIPE
+    with _InstrumentedPopen(cmd, **kwargs) as process:
+        try:
+            stdout, stderr = process.communicate(input, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise
+        except BaseException:
+            process.kill()
+            raise
+    if check and process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, process.args, stdout, stderr)
+    return subprocess.CompletedProcess(process.args, process.returncode, stdout, stderr)
+
+def _stat_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    """Cheap change fingerprint for a file: (mtime_ns, size, inode), or None if missing"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+def _worktree_signature(root: str) -> Tuple[int, int]:
+    """Newest mtime and entry count across the working tree, skipping .git"""
+    newest = 0
+    count = 0
+    stack = [root]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.name == '.git':
+                    continue
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                count += 1
+                newest = max(newest, st.st_mtime_ns)
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+    return (newest, count)
+
+class StatusCache:
+    """LRU + TTL cache for repository status, validated by git metadata fingerprints
+    
+    An entry stays valid while `.git/index`, `.git/HEAD`, `packed-refs`, the
+    current branch ref, the upstream ref and `.git/config` are unchanged, so any
+    git command that changes the answer invalidates it. Edits and new files
+    git hasn't seen yet show up once the TTL expires; `scan_worktree` also
+    fingerprints the working tree on every lookup so they miss the cache
+    right away, at the cost of walking the whole tree each time.
+    """
+    
+    def __init__(self, max_entries: int = 256, ttl: Optional[float] = 2.0, scan_worktree: bool = False):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.scan_worktree = scan_worktree
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple, Tuple[float, List[str], Tuple, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _watched_paths(git_dir: str, status: Dict) -> List[str]:
+        # Linked worktrees keep index and HEAD to themselves but share refs and config
+        common_dir = common_git_dir(git_dir)
+        paths = [
+            os.path.join(git_dir, 'index'),
+            os.path.join(git_dir, 'HEAD'),
+            os.path.join(common_dir, 'packed-refs'),
+            os.path.join(common_dir, 'config')
+        ]
+        if status.get('current_branch'):
+            paths.append(os.path.join(common_dir, 'refs', 'heads', status['current_branch']))
+        if status.get('upstream'):
+            paths.append(os.path.join(common_dir, 'refs', 'remotes', status['upstream']))
+            paths.append(os.path.join(common_dir, 'refs', 'heads', status['upstream']))
+        return paths
+    
+    def _fingerprint(self, repo_path: str, paths: List[str], scan_worktree: Optional[bool]) -> Tuple:
+        fingerprint = tuple(_stat_signature(path) for path in paths)
+        if self.scan_worktree if scan_worktree is None else scan_worktree:
+            fingerprint += (_worktree_signature(repo_path),)
+        return fingerprint
+    
+    def get(self, repo_path: str, git_dir: str, options: Tuple = (),
+            scan_worktree: Optional[bool] = None) -> Optional[Dict]:
+        """Return a cached status if it is still valid, else None
+        
+        `scan_worktree` overrides the cache-wide setting for one lookup; pass
+        the same value to fingerprint() when storing.
+        """
+        if self.max_entries <= 0:
+            return None
+        key = (os.path.abspath(repo_path), options)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            stored_at, paths, fingerprint, status = entry
+            expired = self.ttl is not None and time.monotonic() - stored_at > self.ttl
+            if not expired and self._fingerprint(repo_path, paths, scan_worktree) == fingerprint:
+                with self._lock:
+                    self.hits += 1
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                return dict(status)
+        with self._lock:
+            self.misses += 1
+            self._entries.pop(key, None)
+        return None
+    
+    def fingerprint(self, repo_path: str, git_dir: str, status: Dict, scan_worktree: Optional[bool] = None) -> Tuple:
+        """Take the fingerprint for a status before it is computed
+        
+        Taking it first means a change racing with `git status` leaves a stale
+        fingerprint behind, so the next lookup misses instead of serving stale data.
+        """
+        paths = self._watched_paths(git_dir, status)
+        return (paths, self._fingerprint(repo_path, paths, scan_worktree))
+    
+    def extend(self, repo_path: str, git_dir: str, fingerprint: Tuple, status: Dict,
+               scan_worktree: Optional[bool] = None) -> Tuple:
+        """Add the refs only known once status is computed (the upstream) to a fingerprint
+        
+        The signatures already taken, including any worktree scan, are kept.
+        """
+        paths, signature = fingerprint
+        wanted = self._watched_paths(git_dir, status)
+        if wanted == paths:
+            return fingerprint
+        if wanted[:len(paths)] != paths:
+            return self.fingerprint(repo_path, git_dir, status, scan_worktree)
+        extra = tuple(_stat_signature(path) for path in wanted[len(paths):])
+        return (wanted, signature[:len(paths)] + extra + signature[len(paths):])
+    
+    def put(self, repo_path: str, status: Dict, fingerprint: Tuple, options: Tuple = ()) -> None:
+        """Store a freshly computed status under a fingerprint from `fingerprint()`"""
+        if self.max_entries <= 0 or 'error' in status:
+            return
+        key = (os.path.abspath(repo_path), options)
+        paths, signature = fingerprint
+        with self._lock:
+            self._entries[key] = (time.monotonic(), paths, signature, dict(status))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, repo_path: str = None) -> None:
+        """Drop cached status for one repository, or for all of them"""
+        with self._lock:
+            if repo_path is None:
+                self._entries.clear()
+                return
+            root = os.path.abspath(repo_path)
+            for key in [key for key in self._entries if key[0] == root]:
+                del self._entries[key]
+    
+    def stats(self) -> Dict:
+        """Hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+# Shared by every manager in the process unless one is given its own cache
+STATUS_CACHE = StatusCache()
+
+class SmokeTestCache:
+    """Remembers recent smoke test results per repository and check type"""
+    
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        self._results: Dict[Tuple[str, str], Tuple[float, bool]] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, repo_path: str, part: str) -> Optional[bool]:
+        """Return a result recorded within the TTL, or None"""
+        key = (os.path.abspath(repo_path), part)
+        with self._lock:
+            entry = self._results.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return None
+        return entry[1]
+    
+    def put(self, repo_path: str, part: str, ok: bool) -> None:
+        with self._lock:
+            self._results[(os.path.abspath(repo_path), part)] = (time.monotonic(), ok)
+    
+    def invalidate(self, repo_path: str = None) -> None:
+        """Forget results for one repository, or for all of them"""
+        with self._lock:
+            if repo_path is None:
+                self._results.clear()
+                return
+            root = os.path.abspath(repo_path)
+            for key in [key for key in self._results if key[0] == root]:
+                del self._results[key]
+
+SMOKE_TEST_CACHE = SmokeTestCache()
+
+@instrumented
 class GithubManager:
-    def __init__(self, repo_path: str = None):
+    def __init__(self, repo_path: str = None, status_cache: Optional[StatusCache] = None,
+                 smoke_cache: Optional[SmokeTestCache] = None, large_repo: bool = False):
         self.repo_path = repo_path or os.getcwd()
-        self.git_dir = os.path.join(self.repo_path, '.git')
+        self.large_repo = large_repo
+        self.git_dir = resolve_git_dir(self.repo_path) or os.path.join(self.repo_path, '.git')
+        self.status_cache = status_cache if status_cache is not None else STATUS_CACHE
+        self.smoke_cache = smoke_cache if smoke_cache is not None else SMOKE_TEST_CACHE
+    
+    def __enter__(self) -> 'GithubManager':
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    def close(self) -> None:
+        """Stop the cat-file workers kept for this repository"""
+        ObjectReader.release(self.repo_path)
         
     def is_git_repo(self) -> bool:
-        """Check if current directory is a git repository"""
-        return os.path.exists(self.git_dir)
+        """Check if current directory is a git repository (`.git` may be a directory or a gitfile)"""
+        if not os.path.isdir(self.git_dir):
+            # .git may have appeared, or changed from a directory to a gitfile, since __init__
+            self.git_dir = resolve_git_dir(self.repo_path) or self.git_dir
+        return os.path.isdir(self.git_dir)
     
-    def get_repo_status(self) -> Dict:
-        """Get current repository status with detailed information"""
+    def get_repo_status(self, use_cache: bool = False, paths: List[str] = None, counts_only: bool = False,
+                        untracked: str = 'normal') -> Dict:
+        """Get current repository status with detailed information
+        
+        `paths` scopes the file entries to pathspecs (branch information is
+        unaffected), `counts_only` returns per-category totals under "counts"
+        instead of per-file lists, and `untracked` ('all', 'normal' or 'no')
+        controls how much of the tree is scanned for untracked files.
+        `use_cache` opts in to the status cache (see StatusCache).
+        """
         if not self.is_git_repo():
             return {"error": "Not a git repository"}
         
+        options = (tuple(paths or ()), counts_only, untracked)
+        fingerprint = None
         try:
-            # Get git status
-            result = subprocess.run(
-                ['git', 'status', '--porcelain', '-b'],
-                cwd=self.repo_path,
-                capture_output=True,
-                text=True
-            )
-            
-            # Get current branch
-            branch_result = subprocess.run(
-                ['git', 'branch', '--show-current'],
-                cwd=self.repo_path,
-                capture_output=True,
-                text=True
-            )
-            
-            # Get remote info
-            remote_result = subprocess.run(
-                ['git', 'remote', '-v'],
-                cwd=self.repo_path,
-                capture_output=True,
-                text=True
-            )
+            if use_cache:
+                # Large repositories never get their worktree walked; the untracked cache is there for that
+                scan_worktree = False if self.large_repo else None
+                cached = self.status_cache.get(self.repo_path, self.git_dir, options, scan_worktree)
+                if cached is not None:
+                    return cached
+                # Fingerprint before running git so concurrent changes can't be masked
+                branch = _read_head_branch(self.git_dir)
+                fingerprint = self.status_cache.fingerprint(self.repo_path, self.git_dir, {"current_branch": branch},
+                                                            scan_worktree)
             
-            # Get last commit info
-            commit_result = subprocess.run(
-                ['git', 'log', '-1', '--format=%H|%s|%ai|%an'],
+            # Branch, upstream, ahead/behind, HEAD oid and every file entry in one call
+            result = run_command(
+                ['git', *self._status_config(), 'status', '--porcelain=v2', '-b', '-z',
+                 f'--untracked-files={untracked}', '--', *(paths or [])],
                 cwd=self.repo_path,
-                capture_output=True,
-                text=True
+                capture_output=True
             )
+            if result.returncode != 0:
+                return {"error": _decode(result.stderr).strip() or "git status failed"}
             
-            # Parse status output
-            status_lines = result.stdout.strip().split('\n')
-            branch_line = status_lines[0] if status_lines else ""
-            
-            # Count changes by type
-            modified = []
-            added = []
-            deleted = []
-            untracked = []
+            status = count_status_v2(result.stdout) if counts_only else parse_status_v2(result.stdout)
             
-            for line in status_lines[1:]:
-                if line.strip():
-                    status_code = line[:2]
-                    file_path = line[3:]
-                    
-                    if status_code.startswith(' M') or status_code.startswith('M'):
-                        modified.append(file_path)
-                    elif status_code.startswith('A'):
-                        added.append(file_path)
-                    elif status_code.startswith('D'):
-                        deleted.append(file_path)
-                    elif status_code.startswith('??'):
-                        untracked.append(file_path)
-            
-            # Parse commit info
+            # Last commit info (skipped entirely on an unborn branch)
             commit_info = {}
-            if commit_result.stdout.strip():
-                commit_hash, message, date, author = commit_result.stdout.strip().split('|')
-                commit_info = {
-                    "hash": commit_hash,
-                    "message": message,
-                    "date": date,
-                    "author": author
-                }
+            if status["head_oid"]:
+                commit_info = self._read_commit_info(status["head_oid"])
             
-            return {
-                "current_branch": branch_result.stdout.strip(),
-                "status": result.stdout.strip(),
-                "has_changes": bool(result.stdout.strip()),
-                "modified_files": modified,
-                "added_files": added,
-                "deleted_files": deleted,
-                "untracked_files": untracked,
-                "remotes": remote_result.stdout.strip().split('\n') if remote_result.stdout.strip() else [],
-                "last_commit": commit_info,
-                "is_ahead": 'ahead' in branch_line,
-                "is_behind": 'behind' in branch_line
-            }
+            status["remotes"] = self._read_remotes()
+            status["last_commit"] = commit_info
+            
+            if fingerprint is not None:
+                # Upstream wasn't known up front; fingerprint its ref as well
+                fingerprint = self.status_cache.extend(self.repo_path, self.git_dir, fingerprint, status, scan_worktree)
+                self.status_cache.put(self.repo_path, status, fingerprint, options)
+            return status
         except Exception as e:
             return {"error": str(e)}
     
-    def smoke_test(self) -> bool:
-        """Run comprehensive smoke test to ensure repository is functional"""
+    def _status_config(self) -> List[str]:
+        """Per-invocation config for the large-repository profile"""
+        if not self.large_repo:
+            return []
+        config = ['-c', 'core.untrackedCache=true']
+        if git_supports_builtin_fsmonitor():
+            config += ['-c', 'core.fsmonitor=true']
+        return config
+    
+    def enable_large_repo_mode(self) -> bool:
+        """Persistently enable the untracked cache and, where available, the built-in fsmonitor"""
         if not self.is_git_repo():
             print("Error: Not a git repository")
             return False
         
         try:
-            # Test basic git operations
-            print("Running smoke tests...")
-            
-            # Test git status
-            subprocess.run(['git', 'status'], cwd=self.repo_path, check=True, capture_output=True)
-            print("✓ Git status command works")
-            
-            # Test git log
-            subprocess.run(['git', 'log', '--oneline', '-1'], cwd=self.repo_path, check=True, capture_output=True)
-            print("✓ Git log command works")
-            
-            # Test remote connection (if remotes exist)
-            status = self.get_repo_status()
-            if status.get('remotes'):
-                try:
-                    subprocess.run(['git', 'remote', 'show', 'origin'], cwd=self.repo_path, check=True, capture_output=True, timeout=10)
-                    print("✓ Remote connection works")
-                except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
-                    print("⚠ Remote connection failed (offline or no access)")
-            
-            print("✓ All smoke tests passed")
+            run_command(['git', 'config', 'core.untrackedCache', 'true'], cwd=self.repo_path, check=True)
+            run_command(['git', 'update-index', '--untracked-cache'], cwd=self.repo_path, check=True,
+                           capture_output=True)
+            print("✓ Untracked cache enabled")
+            if git_supports_builtin_fsmonitor():
+                run_command(['git', 'config', 'core.fsmonitor', 'true'], cwd=self.repo_path, check=True)
+                print("✓ Built-in fsmonitor enabled")
+            else:
+                print("⚠ Built-in fsmonitor isn't available in this git build; skipped")
+            self.large_repo = True
             return True
         except subprocess.CalledProcessError as e:
-            print(f"✗ Smoke test failed: {e}")
+            print(f"✗ Enabling large repository mode failed: {e}")
             return False
     
-    def commit_changes(self, message: str, add_all: bool = True) -> bool:
-        """Commit current changes with options"""
-        if not self.smoke_test():
+    def iter_status_entries(self, paths: List[str] = None, untracked: str = 'normal') -> Iterator[Dict]:
+        """Stream status as records while git produces it
+        
+        The first record is {"type": "status"} with the branch fields, followed
+        by one {"type": "file"} record per entry (see status_record and
+        status_file_record). Raises RuntimeError if git fails.
+        """
+        if not self.is_git_repo():
+            raise RuntimeError("Not a git repository")
+        
+        cmd = ['git', *self._status_config(), 'status', '--porcelain=v2', '-b', '-z',
+               f'--untracked-files={untracked}', '--', *(paths or [])]
+        process = start_command(cmd, cwd=self.repo_path, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            branch = {"oid": None, "head": "", "upstream": None, "ahead": 0, "behind": 0}
+            chunks = iter(lambda: process.stdout.read1(65536), b'')
+            entries = iter_status_v2((fields[0] for fields in iter_nul_fields(chunks, 1)), branch)
+            # Headers precede every entry, so the branch is complete once the first entry arrives
+            first = next(entries, None)
+            stderr = process.stderr.read() if first is None else b''
+            if first is None and process.wait() != 0:
+                raise RuntimeError(_decode(stderr).strip() or "git status failed")
+            yield status_record(branch)
+            if first is not None:
+                yield status_file_record(first)
+                for entry in entries:
+                    yield status_file_record(entry)
+                stderr = process.stderr.read()
+                if process.wait() != 0:
+                    raise RuntimeError(_decode(stderr).strip() or "git status failed")
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+            process.stderr.close()
+    
+    def is_dirty(self, paths: List[str] = None, include_untracked: bool = True) -> bool:
+        """Whether anything is changed, stopping git as soon as the first entry appears"""
+        if not self.is_git_repo():
+            raise RuntimeError("Not a git repository")
+        
+        cmd = ['git', *self._status_config(), 'status', '--porcelain=v2', '-z',
+               f'--untracked-files={"normal" if include_untracked else "no"}', '--', *(paths or [])]
+        process = start_command(cmd, cwd=self.repo_path, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            dirty = bool(process.stdout.read(1))
+            if not dirty and process.wait() != 0:
+                raise RuntimeError(_decode(process.stderr.read()).strip() or "git status failed")
+            return dirty
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+            process.stderr.close()
+    
+    def _read_commit_info(self, rev: str = 'HEAD') -> Dict:
+        """Read hash, subject, date and author of a single commit"""
+        return read_commit_info(self.repo_path, rev)
+    
+    def _read_remotes(self) -> List[str]:
+        """List remotes in `git remote -v` form, read from the repository config"""
+        remotes = read_config_remotes(common_git_dir(self.git_dir))
+        if remotes is None:
+            # Config git would resolve differently (includes, no readable file); ask git instead
+            result = run_command(
+                ['git', 'remote', '-v'],
+                cwd=self.repo_path,
+                capture_output=True,
+                text=True
+            )
+            return result.stdout.strip().split('\n') if result.stdout.strip() else []
+        return remotes
+    
+    def smoke_test(self, verbose: bool = True, check_remote: bool = True, use_cache: bool = True,
+                   status: Dict = None) -> bool:
+        """Run comprehensive smoke test to ensure repository is functional
+        
+        The local part (status and log) and the remote part (reachability of
+        origin) are remembered separately for `smoke_cache.ttl` seconds; pass
+        check_remote=False for local-only operations such as commit, and
+        `status` to check a snapshot the caller already took.
+        """
+        log = print if verbose else (lambda *args, **kwargs: None)
+        
+        if not self.is_git_repo():
+            log("Error: Not a git repository")
+            return False
+        
+        if use_cache and self.smoke_cache.get(self.repo_path, 'local'):
+            if not check_remote or self.smoke_cache.get(self.repo_path, 'remote') is not None:
+                log("✓ Smoke tests passed (cached)")
+                return True
+        
+        log("Running smoke tests...")
+        if status is None:
+            status = self.get_repo_status()
+        if 'error' in status:
+            log(f"✗ Smoke test failed: {status['error']}")
             return False
+        log("✓ Git status command works")
         
+        if not status.get('last_commit'):
+            log("✗ Smoke test failed: git log found no commits")
+            return False
+        log("✓ Git log command works")
+        self.smoke_cache.put(self.repo_path, 'local', True)
+        
+        # Test remote connection (if remotes exist)
+        if check_remote and status.get('remotes'):
+            cached = self.smoke_cache.get(self.repo_path, 'remote') if use_cache else None
+            if cached is None:
+                cached = self._smoke_test_remote()
+                self.smoke_cache.put(self.repo_path, 'remote', cached)
+            if cached:
+                log("✓ Remote connection works")
+            else:
+                log("⚠ Remote connection failed (offline or no access)")
+        
+        log("✓ All smoke tests passed")
+        return True
+    
+    def _smoke_test_remote(self) -> bool:
+        """Check that origin answers within the remote timeout"""
         try:
-            # Check if there are changes to commit
+            run_command(
+                ['git', 'ls-remote', '--heads', 'origin'],
+                cwd=self.repo_path,
+                check=True,
+                capture_output=True,
+                timeout=10
+            )
+            return True
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+            return False
+    
+    def commit_changes(self, message: str, add_all: bool = True, files: List[str] = None,
+                       status: Dict = None) -> bool:
+        """Commit current changes with options
+        
+        With add_all, exactly the paths that the status snapshot lists as
+        changed or untracked are staged, instead of re-scanning the whole tree
+        with `git add .`. Pass `files` (paths or git pathspec globs) to stage
+        only those, and `status` to reuse a snapshot the caller already has.
+        """
+        # One snapshot serves both the smoke test and the staging below
+        if status is None:
             status = self.get_repo_status()
+        if not self.smoke_test(check_remote=False, status=status):
+            return False
+        
+        try:
+            # Check if there are changes to commit
+            if 'error' in status:
+                print(f"✗ Commit failed: {status['error']}")
+                return False
             if not status.get('has_changes') and not status.get('untracked_files'):
                 print("No changes to commit")
                 return True
             
-            if add_all:
-                # Add all changes
-                subprocess.run(['git', 'add', '.'], cwd=self.repo_path, check=True)
-                print("✓ All changes staged")
+            if files:
+                staged = self._stage_paths(files, literal=False)
+                print(f"✓ Staged changes matching {len(files)} pathspec(s)")
+            elif add_all:
+                staged = self._stage_paths(changed_paths(status), literal=True)
+                print(f"✓ All changes staged ({staged} paths)")
             
             # Commit changes
-            subprocess.run(['git', 'commit', '-m', message], cwd=self.repo_path, check=True)
+            run_command(['git', 'commit', '-m', message], cwd=self.repo_path, check=True)
             print(f"✓ Changes committed: {message}")
             return True
         except subprocess.CalledProcessError as e:
@@ -170,6 +913,16 @@ class GithubManager:
             print(f"✗ Commit failed: {e}")
             return False
     
+    def _stage_paths(self, paths: List[str], literal: bool = True) -> int:
+        """Stage paths through `git add --pathspec-from-file`, in batches of STAGE_BATCH_SIZE"""
+        cmd = ['git'] + (['--literal-pathspecs'] if literal else []) + \
+            ['add', '--all', '--pathspec-from-file=-', '--pathspec-file-nul']
+        for start in range(0, len(paths), STAGE_BATCH_SIZE):
+            batch = paths[start:start + STAGE_BATCH_SIZE]
+            data = b'\0'.join(path.encode('utf-8', errors='surrogateescape') for path in batch) + b'\0'
+            run_command(cmd, cwd=self.repo_path, input=data, check=True)
+        return len(paths)
+    
     def push_to_github(self, branch: str = None) -> bool:
         """Push changes to GitHub"""
         if not self.smoke_test():
@@ -177,9 +930,9 @@ class GithubManager:
         
         try:
             if branch:
-                subprocess.run(['git', 'push', 'origin', branch], cwd=self.repo_path, check=True)
+                run_command(['git', 'push', 'origin', branch], cwd=self.repo_path, check=True)
             else:
-                subprocess.run(['git', 'push'], cwd=self.repo_path, check=True)
+                run_command(['git', 'push'], cwd=self.repo_path, check=True)
             print("✓ Changes pushed to GitHub")
             return True
         except subprocess.CalledProcessError as e:
@@ -187,7 +940,18 @@ class GithubManager:
             return False
     
     def create_repository(self, repo_name: str, private: bool = False) -> bool:
-        """Create a new GitHub repository using GitHub CLI"""
+        """Create a new GitHub repository through the REST API, or GitHub CLI without a token"""
+        client = GithubClient.shared()
+        if client.available:
+            try:
+                repo = client.create_repo(repo_name, private)
+                print(f"✓ Repository '{repo['full_name']}' created on GitHub")
+                return True
+            except GithubAPIError as e:
+                print(f"✗ Repository creation failed: {e}")
+                return False
+            except ConnectionError as e:
+                print(f"⚠ GitHub API unreachable ({e}), using gh")
         try:
             cmd = ['gh', 'repo', 'create', repo_name]
             if private:
@@ -195,27 +959,77 @@ class GithubManager:
             else:
                 cmd.append('--public')
             
-            subprocess.run(cmd, cwd=self.repo_path, check=True)
+            run_command(cmd, cwd=self.repo_path, check=True)
             print(f"✓ Repository '{repo_name}' created on GitHub")
             return True
         except subprocess.CalledProcessError as e:
             print(f"✗ Repository creation failed: {e}")
             return False
     
-    def clone_repository(self, repo_url: str, target_dir: str = None) -> bool:
-        """Clone a GitHub repository"""
-        try:
-            if target_dir:
-                subprocess.run(['git', 'clone', repo_url, target_dir], check=True)
-                print(f"✓ Repository cloned to '{target_dir}'")
+    def create_repositories(self, repo_names: List[str], private: bool = False) -> Iterator[Dict]:
+        """Create every missing repository, yielding {"repo", "result"} per name (see GithubClient.create_repos)"""
+        client = GithubClient.shared()
+        if client.available:
+            yield from client.create_repos(repo_names, private)
+            return
+        for name in dict.fromkeys(repo_names):
+            result = run_command(['gh', 'repo', 'create', name, '--private' if private else '--public'],
+                                 capture_output=True)
+            if result.returncode == 0:
+                yield {"repo": name, "result": {"action": "created", "full_name": name,
+                                                "html_url": _decode(result.stdout).strip()}}
             else:
-                subprocess.run(['git', 'clone', repo_url], check=True)
-                print("✓ Repository cloned")
+                yield {"repo": name, "result": {"error": _decode(result.stderr).strip() or "gh repo create failed"}}
+    
+    def get_repositories(self, repo_names: List[str]) -> List[Dict]:
+        """GitHub metadata for many repositories as {"repo", "result"}, in the order given
+        
+        Uses the pooled REST client (conditional requests, so unchanged
+        repositories cost no rate limit) and `gh api` without a token.
+        """
+        client = GithubClient.shared()
+        if client.available:
+            results = {entry["repo"]: entry for entry in client.iter_repos(repo_names)}
+            return [results[name] for name in dict.fromkeys(repo_names)]
+        entries = []
+        login = None
+        for name in dict.fromkeys(repo_names):
+            if '/' not in name and login is None:
+                login = _decode(run_command(['gh', 'api', 'user', '--jq', '.login'],
+                                            capture_output=True).stdout).strip()
+            full_name = name if '/' in name else f"{login}/{name}"
+            result = run_command(['gh', 'api', f"repos/{full_name}"], capture_output=True)
+            if result.returncode == 0:
+                entries.append({"repo": name, "result": json.loads(result.stdout)})
+            else:
+                entries.append({"repo": name, "result": {"error": _decode(result.stderr).strip() or "gh api failed"}})
+        return entries
+    
+    def clone_repository(self, repo_url: str, target_dir: str = None, reference: str = None,
+                         filter: str = None, depth: int = None, single_branch: bool = False) -> bool:
+        """Clone a GitHub repository (see clone_args for the sharing and partial-clone options)"""
+        try:
+            run_command(clone_args(repo_url, target_dir, reference, filter, depth, single_branch), check=True)
+            print(f"✓ Repository cloned to '{target_dir}'" if target_dir else "✓ Repository cloned")
             return True
         except subprocess.CalledProcessError as e:
             print(f"✗ Clone failed: {e}")
             return False
     
+    def fetch_changes(self, remote: str = 'origin', prune: bool = True, depth: int = None) -> bool:
+        """Fetch from a remote without touching the working tree"""
+        if not self.is_git_repo():
+            print("Error: Not a git repository")
+            return False
+        
+        try:
+            run_command(fetch_args(remote, prune, depth), cwd=self.repo_path, check=True)
+            print(f"✓ Fetched changes from {remote}")
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"✗ Fetch failed: {e}")
+            return False
+    
     def create_branch(self, branch_name: str, checkout: bool = True) -> bool:
         """Create and optionally checkout a new branch"""
         if not self.is_git_repo():
@@ -224,10 +1038,10 @@ class GithubManager:
         
         try:
             if checkout:
-                subprocess.run(['git', 'checkout', '-b', branch_name], cwd=self.repo_path, check=True)
+                run_command(['git', 'checkout', '-b', branch_name], cwd=self.repo_path, check=True)
                 print(f"✓ Created and checked out branch '{branch_name}'")
             else:
-                subprocess.run(['git', 'branch', branch_name], cwd=self.repo_path, check=True)
+                run_command(['git', 'branch', branch_name], cwd=self.repo_path, check=True)
                 print(f"✓ Created branch '{branch_name}'")
             return True
         except subprocess.CalledProcessError as e:
@@ -241,35 +1055,142 @@ class GithubManager:
             return False
         
         try:
-            subprocess.run(['git', 'checkout', branch_name], cwd=self.repo_path, check=True)
+            run_command(['git', 'checkout', branch_name], cwd=self.repo_path, check=True)
             print(f"✓ Switched to branch '{branch_name}'")
             return True
         except subprocess.CalledProcessError as e:
             print(f"✗ Branch switch failed: {e}")
             return False
     
-    def merge_branch(self, source_branch: str, target_branch: str = None) -> bool:
-        """Merge a branch into current or target branch"""
+    def merge_branch(self, source_branch: str, target_branch: str = None, worktree: bool = True) -> bool:
+        """Merge a branch into current or target branch
+        
+        With worktree=False the merge is computed in the object database with
+        `git merge-tree --write-tree` and the target ref is advanced directly,
+        leaving the working tree and index untouched. The target must then be
+        a branch that isn't checked out.
+        """
         if not self.is_git_repo():
             print("Error: Not a git repository")
             return False
         
+        if not worktree:
+            return self._merge_without_worktree(source_branch, target_branch)
+        
         try:
-            current_branch = self.get_repo_status().get('current_branch')
+            # HEAD is part of the cache fingerprint, so a cached branch name is never stale
+            current_branch = self.get_repo_status(use_cache=True).get('current_branch')
             
             if target_branch and target_branch != current_branch:
                 # Switch to target branch first
-                subprocess.run(['git', 'checkout', target_branch], cwd=self.repo_path, check=True)
+                run_command(['git', 'checkout', target_branch], cwd=self.repo_path, check=True)
                 print(f"✓ Switched to branch '{target_branch}'")
             
             # Merge source branch
-            subprocess.run(['git', 'merge', source_branch], cwd=self.repo_path, check=True)
+            run_command(['git', 'merge', source_branch], cwd=self.repo_path, check=True)
             print(f"✓ Merged branch '{source_branch}' into '{target_branch or current_branch}'")
             return True
         except subprocess.CalledProcessError as e:
             print(f"✗ Merge failed: {e}")
             return False
     
+    def _merge_without_worktree(self, source_branch: str, target_branch: str = None) -> bool:
+        target_branch = target_branch or _read_head_branch(self.git_dir)
+        if not target_branch:
+            print("✗ Merge failed: no target branch (HEAD is detached)")
+            return False
+        if f'refs/heads/{target_branch}' in checked_out_branches(common_git_dir(self.git_dir)):
+            # Moving a branch under any worktree (linked ones too) would leave its index out of sync
+            print(f"✗ Merge failed: '{target_branch}' is checked out; merge it with the working tree instead")
+            return False
+        
+        target_ref = f'refs/heads/{target_branch}'
+        tips = self.resolve_refs([target_ref, source_branch])
+        target_tip, source_tip = tips[target_ref], tips[source_branch]
+        if target_tip is None or source_tip is None:
+            missing = target_branch if target_tip is None else source_branch
+            print(f"✗ Merge failed: unknown branch '{missing}'")
+            return False
+        
+        try:
+            def is_ancestor(old: str, new: str) -> bool:
+                return run_command(['git', 'merge-base', '--is-ancestor', old, new],
+                                      cwd=self.repo_path, capture_output=True).returncode == 0
+            
+            if is_ancestor(source_tip, target_tip):
+                print(f"✓ '{target_branch}' already contains '{source_branch}'")
+                return True
+            
+            if is_ancestor(target_tip, source_tip):
+                new_tip = source_tip
+                reflog = f"merge {source_branch}: Fast-forward"
+            else:
+                merge = run_command(['git', 'merge-tree', '--write-tree', '--name-only', '--no-messages', '-z',
+                                        target_tip, source_tip], cwd=self.repo_path, capture_output=True)
+                if merge.returncode not in (0, 1):
+                    print(f"✗ Merge failed: {_decode(merge.stderr).strip()}")
+                    return False
+                fields = [_decode(field) for field in merge.stdout.split(b'\0') if field]
+                if merge.returncode == 1:
+                    print(f"✗ Merge failed: conflicts in {', '.join(fields[1:]) or 'unknown files'}")
+                    return False
+                
+                message = f"Merge branch '{source_branch}'"
+                if target_branch not in ('main', 'master'):
+                    message += f" into {target_branch}"
+                commit = run_command(['git', 'commit-tree', fields[0], '-p', target_tip, '-p', source_tip, '-m', message],
+                                        cwd=self.repo_path, capture_output=True, text=True, check=True)
+                new_tip = commit.stdout.strip()
+                reflog = f"merge {source_branch}: Merge made by merge-tree"
+            
+            # Compare-and-swap so a concurrent update of the target isn't lost
+            run_command(['git', 'update-ref', '-m', reflog, target_ref, new_tip, target_tip],
+                           cwd=self.repo_path, capture_output=True, check=True)
+            print(f"✓ Merged branch '{source_branch}' into '{target_branch}' ({new_tip[:8]}) without touching the working tree")
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"✗ Merge failed: {e}")
+            return False
+    
+    def check_mergeability(self, branches: List[str], target: str = 'main', max_workers: int = 8) -> Iterator[Dict]:
+        """Check in parallel whether each branch merges cleanly into target
+        
+        Uses `git merge-tree --write-tree`, so nothing is checked out. Results
+        are yielded as they complete, each with "branch", "clean" and the
+        conflicted "conflicts" paths. Branches (or a target) that don't name
+        a commit, and merges git refuses, come back with an "error" instead.
+        """
+        if not self.is_git_repo():
+            raise RuntimeError("Not a git repository")
+        
+        # Resolve everything up front in one round-trip so unknown names can't pass for conflicts
+        commits = self.resolve_refs([f'{name}^{{commit}}' for name in dict.fromkeys([target, *branches])])
+        target_oid = commits[f'{target}^{{commit}}']
+        
+        def failed(branch: str, error: str) -> Dict:
+            return {"branch": branch, "target": target, "clean": False, "conflicts": [], "error": error}
+        
+        def check(branch: str) -> Dict:
+            branch_oid = commits[f'{branch}^{{commit}}']
+            if target_oid is None:
+                return failed(branch, f"Unknown target '{target}'")
+            if branch_oid is None:
+                return failed(branch, f"Unknown branch '{branch}'")
+            result = run_command(['git', 'merge-tree', '--write-tree', '--name-only', '--no-messages', '-z',
+                                     target_oid, branch_oid], cwd=self.repo_path, capture_output=True)
+            fields = [_decode(field) for field in result.stdout.split(b'\0') if field]
+            # A conflicted merge (exit 1) always lists the conflicted paths after the tree
+            if result.returncode not in (0, 1) or (result.returncode == 1 and len(fields) < 2):
+                error = _decode(result.stderr).strip()
+                return failed(branch, error or f"git merge-tree exited with {result.returncode}")
+            return {"branch": branch, "target": target, "clean": result.returncode == 0,
+                    "conflicts": fields[1:], "tree": fields[0] if fields else None}
+        
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = [executor.submit(check, branch) for branch in branches]
+            for future in as_completed(futures):
+                yield future.result()
+    
     def pull_changes(self, remote: str = 'origin', branch: str = None) -> bool:
         """Pull changes from remote repository"""
         if not self.is_git_repo():
@@ -278,41 +1199,73 @@ class GithubManager:
         
         try:
             if branch:
-                subprocess.run(['git', 'pull', remote, branch], cwd=self.repo_path, check=True)
+                run_command(['git', 'pull', remote, branch], cwd=self.repo_path, check=True)
                 print(f"✓ Pulled changes from {remote}/{branch}")
             else:
-                subprocess.run(['git', 'pull'], cwd=self.repo_path, check=True)
+                run_command(['git', 'pull'], cwd=self.repo_path, check=True)
                 print(f"✓ Pulled changes from {remote}")
             return True
         except subprocess.CalledProcessError as e:
             print(f"✗ Pull failed: {e}")
             return False
     
-    def get_commit_history(self, limit: int = 10) -> List[Dict]:
-        """Get commit history with details"""
+    def get_commit_history(self, limit: int = 10, **filters) -> List[Dict]:
+        """Get commit history with details (see iter_commit_history for filters)"""
         if not self.is_git_repo():
             return [{"error": "Not a git repository"}]
         
         try:
-            result = subprocess.run(
-                ['git', 'log', f'--oneline=-{limit}', '--format=%H|%s|%ai|%an'],
-                cwd=self.repo_path,
-                capture_output=True,
-                text=True
-            )
-            
-            commits = []
-            for line in result.stdout.strip().split('\n'):
-                if line.strip():
-                    commit_hash, message, date, author = line.split('|')
-                    commits.append({
-                        "hash": commit_hash,
-                        "message": message,
-                        "date": date,
-                        "author": author
-                    })
-            
-            return commits
+            if not filters and limit is not None and limit <= BATCH_HISTORY_LIMIT:
+                # Short unfiltered histories: walk parents over the cat-file pipe
+                commits = ObjectReader.for_repo(self.repo_path).walk_commits('HEAD', limit)
+                return [{field: commit[field] for field in COMMIT_FIELDS} for commit in commits]
+            return [commit.to_dict() for commit in self.iter_commit_history(limit=limit, **filters)]
+        except Exception as e:
+            return [{"error": str(e)}]
+    
+    def iter_commit_history(self, limit: Optional[int] = None, skip: int = 0, rev_range: str = None,
+                            paths: List[str] = None, since: str = None, until: str = None,
+                            author: str = None) -> Iterator['CommitRecord']:
+        """Stream commit history from a `git log -z` pipe in constant memory
+        
+        Commits are yielded as git produces them; closing the generator early
+        stops git. Raises RuntimeError if git fails.
+        """
+        if not self.is_git_repo():
+            raise RuntimeError("Not a git repository")
+        
+        cmd = ['git'] + history_args(limit, skip, rev_range, paths, since, until, author)
+        process = start_command(cmd, cwd=self.repo_path, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            chunks = iter(lambda: process.stdout.read1(65536), b'')
+            for fields in iter_nul_fields(chunks, len(COMMIT_FIELDS)):
+                yield CommitRecord(*fields)
+            stderr = process.stderr.read()
+            if process.wait() != 0:
+                raise RuntimeError(_decode(stderr).strip() or f"git log exited with {process.returncode}")
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+            process.stderr.close()
+    
+    def commit_index(self) -> 'CommitIndex':
+        """The repository's on-disk commit index (created on first use)"""
+        if getattr(self, '_commit_index', None) is None:
+            self._commit_index = CommitIndex(self.repo_path, self.git_dir)
+        return self._commit_index
+    
+    def search_commits(self, author: str = None, since: str = None, until: str = None,
+                       limit: Optional[int] = 10, skip: int = 0) -> List[Dict]:
+        """Answer author and date-range history queries from the commit index"""
+        if not self.is_git_repo():
+            return [{"error": "Not a git repository"}]
+        
+        try:
+            index = self.commit_index()
+            index.update()
+            return index.query(author=author, since=since, until=until, limit=limit, skip=skip)
         except Exception as e:
             return [{"error": str(e)}]
     
@@ -324,10 +1277,10 @@ class GithubManager:
         
         try:
             if message:
-                subprocess.run(['git', 'stash', 'push', '-m', message], cwd=self.repo_path, check=True)
+                run_command(['git', 'stash', 'push', '-m', message], cwd=self.repo_path, check=True)
                 print(f"✓ Changes stashed with message: {message}")
             else:
-                subprocess.run(['git', 'stash'], cwd=self.repo_path, check=True)
+                run_command(['git', 'stash'], cwd=self.repo_path, check=True)
                 print("✓ Changes stashed")
             return True
         except subprocess.CalledProcessError as e:
@@ -341,7 +1294,7 @@ class GithubManager:
             return False
         
         try:
-            subprocess.run(['git', 'stash', 'pop', f'stash@{{{stash_index}}}'], cwd=self.repo_path, check=True)
+            run_command(['git', 'stash', 'pop', f'stash@{{{stash_index}}}'], cwd=self.repo_path, check=True)
             print(f"✓ Stashed changes applied (stash@{{{stash_index}}})")
             return True
         except subprocess.CalledProcessError as e:
@@ -360,11 +1313,84 @@ class GithubManager:
             if file_path:
                 cmd.append(file_path)
             
-            result = subprocess.run(cmd, cwd=self.repo_path, capture_output=True, text=True)
+            result = run_command(cmd, cwd=self.repo_path, capture_output=True, text=True)
             return result.stdout
         except Exception as e:
             return f"Error getting diff: {e}"
     
+    def _diff_cmd(self, file_path: str = None, staged: bool = False, *options: str) -> List[str]:
+        cmd = ['git', '-c', 'core.quotepath=off', 'diff', *options]
+        if staged:
+            cmd.append('--staged')
+        cmd.append('--')
+        if file_path:
+            cmd.append(file_path)
+        return cmd
+    
+    def stream_file_diff(self, file_path: str = None, staged: bool = False,
+                         writer=None, chunk_size: int = 65536) -> bool:
+        """Copy the diff to a binary writer chunk by chunk instead of buffering it
+        
+        `writer` is any object with a `write(bytes)` method and defaults to
+        stdout, so memory use is bounded by chunk_size whatever the diff size.
+        """
+        if not self.is_git_repo():
+            print("Error: Not a git repository")
+            return False
+        
+        writer = writer or sys.stdout.buffer
+        process = start_command(self._diff_cmd(file_path, staged), cwd=self.repo_path,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            for chunk in iter(lambda: process.stdout.read1(chunk_size), b''):
+                writer.write(chunk)
+            stderr = process.stderr.read()
+            if process.wait() != 0:
+                print(f"✗ Diff failed: {_decode(stderr).strip()}")
+                return False
+            return True
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+            process.stderr.close()
+    
+    def iter_diff_hunks(self, file_path: str = None, staged: bool = False) -> Iterator[Dict]:
+        """Stream the diff as one record per hunk
+        
+        Each record has the file's "path" and "old_path", the hunk "header" and
+        its "lines". Files without hunks (binary, pure renames, mode changes)
+        yield a single record with header None.
+        """
+        if not self.is_git_repo():
+            raise RuntimeError("Not a git repository")
+        
+        process = start_command(self._diff_cmd(file_path, staged), cwd=self.repo_path,
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            yield from iter_diff_hunks(_decode(line).rstrip('\n') for line in process.stdout)
+            process.wait()
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+    
+    def get_diff_stats(self, file_path: str = None, staged: bool = False) -> Dict:
+        """Per-file added/deleted line counts from `git diff --numstat`, without patch text"""
+        if not self.is_git_repo():
+            return {"error": "Not a git repository"}
+        
+        try:
+            result = run_command(self._diff_cmd(file_path, staged, '--numstat', '-z', '-M'),
+                                    cwd=self.repo_path, capture_output=True)
+            if result.returncode != 0:
+                return {"error": _decode(result.stderr).strip()}
+            return parse_numstat(result.stdout)
+        except Exception as e:
+            return {"error": str(e)}
+    
     def revert_last_commit(self) -> bool:
         """Revert the last commit"""
         if not self.is_git_repo():
@@ -372,7 +1398,7 @@ class GithubManager:
             return False
         
         try:
-            subprocess.run(['git', 'revert', 'HEAD'], cwd=self.repo_path, check=True)
+            run_command(['git', 'revert', 'HEAD'], cwd=self.repo_path, check=True)
             print("✓ Last commit reverted")
             return True
         except subprocess.CalledProcessError as e:
@@ -392,7 +1418,7 @@ class GithubManager:
             cmd.append(commit_hash)
             
             mode = "hard" if hard else "soft"
-            subprocess.run(cmd, cwd=self.repo_path, check=True)
+            run_command(cmd, cwd=self.repo_path, check=True)
             print(f"✓ Reset to commit {commit_hash} ({mode} mode)")
             return True
         except subprocess.CalledProcessError as e:
@@ -406,70 +1432,3565 @@ class GithubManager:
             return False
         
         try:
-            subprocess.run(['git', 'remote', 'add', name, url], cwd=self.repo_path, check=True)
+            run_command(['git', 'remote', 'add', name, url], cwd=self.repo_path, check=True)
             print(f"✓ Added remote '{name}': {url}")
             return True
         except subprocess.CalledProcessError as e:
             print(f"✗ Adding remote failed: {e}")
             return False
     
-    def list_branches(self, remote: bool = False) -> List[str]:
-        """List all branches"""
+    def list_branches(self, remote: bool = False, with_tips: bool = False):
+        """List all branches, or only remote ones (as {name: tip oid} when with_tips is set)"""
         if not self.is_git_repo():
             return ["Error: Not a git repository"]
         
         try:
-            cmd = ['git', 'branch']
-            if remote:
-                cmd.append('-r')
-            cmd.append('-a')
+            cmd = ['git', 'branch', '-r' if remote else '-a']
             
-            result = subprocess.run(cmd, cwd=self.repo_path, capture_output=True, text=True)
+            result = run_command(cmd, cwd=self.repo_path, capture_output=True, text=True)
             branches = [b.strip().replace('* ', '') for b in result.stdout.strip().split('\n') if b.strip()]
+            if with_tips:
+                names = [branch.split(' -> ')[0] for branch in branches if not branch.startswith('(')]
+                return self.resolve_refs(names)
             return branches
         except Exception as e:
             return [f"Error: {e}"]
-
-def main():
-    """Main function for command-line usage"""
-    import sys
-    
-    if len(sys.argv) < 2:
-        print("Usage: python github_manager.py <command> [options]")
-        print("Commands:")
-        print("  status                    - Show repository status")
-        print("  smoke-test               - Run smoke tests")
-        print("  commit <message>         - Commit changes")
-        print("  push [branch]            - Push to GitHub")
-        print("  pull [remote] [branch]   - Pull from remote")
-        print("  create-repo <name>       - Create new repository")
-        print("  clone <url> [dir]        - Clone repository")
-        print("  branch <name>            - Create and checkout branch")
-        print("  checkout <name>          - Switch to branch")
-        print("  merge <source> [target]  - Merge branches")
-        print("  history [limit]          - Show commit history")
-        print("  stash [message]          - Stash changes")
-        print("  stash-pop [index]        - Apply stashed changes")
-        print("  diff [file]              - Show diff")
-        print("  revert                   - Revert last commit")
-        print("  reset <hash> [--hard]    - Reset to commit")
-        print("  branches                 - List all branches")
-        print("  remote-add <name> <url>  - Add remote repository")
-        return
-    
-    manager = GithubManager()
-    command = sys.argv[1].lower()
+    
+    def get_branch_overview(self, include_remote: bool = True, base: str = None) -> List[Dict]:
+        """Every local (and remote) branch with tip, upstream, ahead/behind and last commit
+        
+        Refs and ahead/behind against the upstream come from a single
+        `git for-each-ref` (ahead/behind are None when the upstream is gone).
+        With `base`, every branch is also compared against that branch
+        (base_ahead/base_behind, cached per (tip, base tip) pair and None if
+        the comparison failed).
+        """
+        if not self.is_git_repo():
+            return [{"error": "Not a git repository"}]
+        
+        try:
+            patterns = ['refs/heads'] + (['refs/remotes'] if include_remote else [])
+            result = run_command(
+                ['git', 'for-each-ref', f'--format={BRANCH_FORMAT}', *patterns],
+                cwd=self.repo_path,
+                capture_output=True
+            )
+            if result.returncode != 0:
+                return [{"error": _decode(result.stderr).strip() or "git for-each-ref failed"}]
+            
+            branches = parse_branch_records(result.stdout)
+            if base:
+                base_tip = self.resolve_refs([base])[base]
+                if base_tip is None:
+                    return [{"error": f"Unknown base branch '{base}'"}]
+                counts = self._ahead_behind([(branch["tip"], base_tip) for branch in branches])
+                for branch in branches:
+                    branch["base_ahead"], branch["base_behind"] = counts.get((branch["tip"], base_tip)) or (None, None)
+            return branches
+        except Exception as e:
+            return [{"error": str(e)}]
+    
+    def _ahead_behind(self, pairs: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Optional[Tuple[int, int]]]:
+        """Ahead/behind counts for (tip, other) pairs, computing only uncached ones (None if git failed)"""
+        counts = {}
+        todo = []
+        for pair in dict.fromkeys(pairs):
+            cached = AHEAD_BEHIND_CACHE.get(pair)
+            if cached is not None:
+                counts[pair] = cached
+            elif pair[0] == pair[1]:
+                counts[pair] = (0, 0)
+            else:
+                todo.append(pair)
+        
+        def count(pair: Tuple[str, str]) -> Tuple[Tuple[str, str], Optional[Tuple[int, int]]]:
+            result = run_command(
+                ['git', 'rev-list', '--left-right', '--count', f'{pair[0]}...{pair[1]}', '--'],
+                cwd=self.repo_path,
+                capture_output=True,
+                text=True
+            )
+            if result.returncode != 0:
+                return pair, None
+            ahead, behind = result.stdout.split()
+            return pair, (int(ahead), int(behind))
+        
+        with ThreadPoolExecutor(max_workers=min(8, len(todo) or 1)) as executor:
+            for pair, value in executor.map(count, todo):
+                if value is not None:
+                    # Only real answers are cached; a failure may be transient
+                    AHEAD_BEHIND_CACHE.put(pair, value)
+                counts[pair] = value
+        return counts
+    
+    def resolve_refs(self, names: List[str]) -> Dict[str, Optional[str]]:
+        """Resolve revisions to object ids in one round-trip on the cat-file pipe"""
+        return ObjectReader.for_repo(self.repo_path).resolve(names)
+    
+    def ref_transaction(self, message: str = None, allow_checked_out: bool = False) -> 'RefTransaction':
+        """Start a batch of ref changes that commit() applies atomically"""
+        return RefTransaction(self.repo_path, message, allow_checked_out)
+    
+    def update_refs(self, operations: List[Dict], message: str = None, allow_checked_out: bool = False) -> Dict:
+        """Apply {"action", "ref", "new", "old"} operations in one all-or-nothing transaction"""
+        if not self.is_git_repo():
+            return {"error": "Not a git repository"}
+        
+        try:
+            transaction = self.ref_transaction(message, allow_checked_out)
+            for operation in operations:
+                transaction.add(operation["action"], operation["ref"], operation.get("new"), operation.get("old"))
+        except (KeyError, ValueError) as e:
+            return {"error": f"Invalid ref operation: {e}"}
+        result = transaction.commit()
+        if 'error' not in result:
+            self.status_cache.invalidate(self.repo_path)
+        return result
+    
+    def analyze_repository(self, top: int = 20, depth: int = 1, min_size: int = 0, commits: bool = True) -> Dict:
+        """Largest blobs with their paths and introducing commits, size per directory and pack stats
+        
+        See RepoAnalyzer.analyze; git output is streamed, so memory stays
+        flat however many objects the repository has.
+        """
+        if not self.is_git_repo():
+            return {"error": "Not a git repository"}
+        
+        try:
+            return RepoAnalyzer(self.repo_path, self.git_dir).analyze(top, depth, min_size, commits)
+        except (RuntimeError, OSError) as e:
+            return {"error": str(e)}
+
+def default_registry_path() -> str:
+    """Where discovered repositories are remembered between scans"""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'github-manager', 'repos.json')
+
+class RepoDiscovery:
+    """Find git repositories under directory trees with parallel os.scandir walkers
+    
+    Repository interiors are never descended into. Working trees with a
+    `.git` directory, `.git` files (linked worktrees, submodules) and bare
+    repositories are recognised. With a registry file, every visited
+    directory's mtime and subdirectories are saved, and later scans reuse
+    that listing for directories whose mtime is unchanged, so a rescan costs
+    one stat per directory instead of one scandir.
+    """
+    
+    REGISTRY_VERSION = 1
+    # Directories modified this recently may change again within the same mtime tick
+    RACY_NS = 2_000_000_000
+    
+    def __init__(self, registry_path: str = None, max_workers: int = 8, exclude: Tuple[str, ...] = ()):
+        self.registry_path = registry_path
+        self.max_workers = max(1, max_workers)
+        self.exclude = set(exclude)
+        self.dirs = {}
+        self.stats = {"scanned": 0, "reused": 0, "repos": 0, "elapsed": 0.0}
+        if registry_path:
+            self._load()
+    
+    def _load(self) -> None:
+        try:
+            with open(self.registry_path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == self.REGISTRY_VERSION:
+            self.dirs = {path: tuple(entry) for path, entry in data.get("dirs", {}).items()}
+    
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.registry_path)), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.registry_path)), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"version": self.REGISTRY_VERSION, "dirs": self.dirs}, f, separators=(',', ':'))
+            os.replace(tmp, self.registry_path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    
+    @staticmethod
+    def _classify(path: str, names: Dict[str, bool]) -> Tuple[Optional[str], Optional[str]]:
+        """(kind, git_dir) for a directory given its entries (name -> is_dir), or (None, None)"""
+        if '.git' in names:
+            git_dir = resolve_git_dir(path)
+            if git_dir is None:
+                return None, None
+            if names['.git']:
+                return "worktree", git_dir
+            parts = git_dir.replace(os.sep, '/').split('/')
+            kind = "linked-worktree" if 'worktrees' in parts else "submodule" if 'modules' in parts else "gitfile"
+            return kind, git_dir
+        if names.get('HEAD') is False and names.get('objects') and names.get('refs'):
+            return "bare", path
+        return None, None
+    
+    def _visit(self, path: str, now_ns: int) -> Tuple[str, Optional[tuple], List[str], bool]:
+        """Stat (and, if it changed, list) one directory; returns (path, entry, subdirs, reused)"""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return path, None, [], False
+        entry = self.dirs.get(path)
+        if entry is not None and entry[0] == mtime:
+            return path, entry, [] if entry[1] else entry[3], True
+        
+        names = {}
+        try:
+            with os.scandir(path) as entries:
+                for item in entries:
+                    try:
+                        names[item.name] = item.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+        except OSError:
+            return path, None, [], False
+        kind, git_dir = self._classify(path, names)
+        subdirs = [] if kind else sorted(name for name, is_dir in names.items()
+                                         if is_dir and name != '.git' and name not in self.exclude)
+        # A directory changed within the racy window is listed again next time
+        recorded_mtime = mtime if now_ns - mtime > self.RACY_NS else None
+        entry = (recorded_mtime, kind, git_dir, subdirs)
+        return path, entry, subdirs, False
+    
+    def scan(self, roots: List[str]) -> List[Dict]:
+        """Walk every root and return {"path", "kind", "git_dir"} for each repository found"""
+        start = time.perf_counter()
+        now_ns = time.time_ns()
+        roots = [os.path.abspath(root) for root in roots]
+        visited = {}
+        scanned = reused = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = {executor.submit(self._visit, root, now_ns) for root in dict.fromkeys(roots)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, entry, subdirs, was_reused = future.result()
+                    if entry is None:
+                        continue
+                    visited[path] = entry
+                    reused += was_reused
+                    scanned += not was_reused
+                    for name in subdirs:
+                        child = os.path.join(path, name)
+                        if child not in visited:
+                            pending.add(executor.submit(self._visit, child, now_ns))
+        
+        # Forget directories under these roots that no longer exist; keep other roots' entries
+        prefixes = tuple(root.rstrip(os.sep) + os.sep for root in roots)
+        self.dirs = {path: entry for path, entry in self.dirs.items()
+                     if path not in roots and not path.startswith(prefixes)}
+        self.dirs.update(visited)
+        if self.registry_path:
+            self._save()
+        
+        repos = sorted(({"path": path, "kind": entry[1], "git_dir": entry[2]}
+                        for path, entry in visited.items() if entry[1]), key=lambda repo: repo["path"])
+        self.stats = {"scanned": scanned, "reused": reused, "repos": len(repos),
+                      "elapsed": round(time.perf_counter() - start, 3)}
+        return repos
+
+class FleetManager:
+    """Run GithubManager operations across many repositories on a bounded thread pool"""
+    
+    def __init__(self, repo_paths: List[str], max_workers: int = 8):
+        self.repo_paths = list(repo_paths)
+        self.max_workers = max(1, max_workers)
+    
+    @staticmethod
+    def load_repo_paths(source: str, registry_path: str = None, include_bare: bool = False) -> List[str]:
+        """Resolve a root directory or a manifest file into repository paths
+        
+        Directories are scanned with RepoDiscovery; pass a registry path to
+        make repeated scans of the same tree incremental.
+        """
+        if os.path.isfile(source):
+            # Manifest: one repository path per line, relative to the manifest
+            base = os.path.dirname(os.path.abspath(source))
+            paths = []
+            with open(source, encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith('#'):
+                        paths.append(os.path.normpath(os.path.join(base, os.path.expanduser(line))))
+            return paths
+        
+        if not os.path.isdir(source):
+            return []
+        
+        discovery = RepoDiscovery(registry_path)
+        return [repo["path"] for repo in discovery.scan([source]) if include_bare or repo["kind"] != "bare"]
+    
+    @staticmethod
+    def load_clone_manifest(source: str, dest: str = '.') -> List[Tuple[str, str]]:
+        """Read `url [path]` lines into (url, path) pairs
+        
+        Paths are relative to `dest` and default to the directory name
+        `git clone` would choose; `#` starts a comment.
+        """
+        entries = []
+        with open(source, encoding='utf-8') as f:
+            for line in f:
+                fields = line.split('#', 1)[0].split()
+                if not fields:
+                    continue
+                url = fields[0]
+                path = os.path.expanduser(fields[1]) if len(fields) > 1 else default_clone_dir(url)
+                entries.append((url, os.path.normpath(os.path.join(os.path.abspath(dest), path))))
+        return entries
+    
+    def _map(self, operation: Callable[[str], object], repo_paths: List[str]) -> Iterator[Dict]:
+        def run_one(repo_path: str) -> Dict:
+            start = time.perf_counter()
+            try:
+                result = operation(repo_path)
+            except Exception as e:
+                result = {"error": str(e)}
+            return {"repo": repo_path, "result": result, "elapsed": time.perf_counter() - start}
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(run_one, path) for path in repo_paths]
+            for future in as_completed(futures):
+                yield future.result()
+    
+    def run(self, operation: Callable[[GithubManager], object]) -> Iterator[Dict]:
+        """Run an operation on every repository, yielding results as they complete"""
+        def run_one(repo_path: str) -> object:
+            # Release each repository's cat-file workers so large fleets don't run out of descriptors
+            with GithubManager(repo_path) as manager:
+                return operation(manager)
+        
+        return self._map(run_one, self.repo_paths)
+    
+    def iter_status(self) -> Iterator[Dict]:
+        """Get repository status for every repository"""
+        return self.run(lambda manager: manager.get_repo_status())
+    
+    def iter_smoke_tests(self) -> Iterator[Dict]:
+        """Run the smoke test for every repository"""
+        return self.run(lambda manager: manager.smoke_test(verbose=False))
+    
+    def iter_analyze(self, top: int = 20, depth: int = 1, min_size: int = 0, commits: bool = True) -> Iterator[Dict]:
+        """Analyze the size of every repository"""
+        return self.run(lambda manager: manager.analyze_repository(top, depth, min_size, commits))
+    
+    @staticmethod
+    def update_reference(cache_path: str, urls: List[str], jobs: int = 8) -> bool:
+        """Create or refresh a bare repository holding the objects of every URL
+        
+        Clones made with `reference=cache_path` borrow its objects instead of
+        downloading and storing them again. Refs are never pruned here, so
+        objects that existing clones rely on stay reachable.
+        """
+        try:
+            if not os.path.isdir(cache_path):
+                run_command(['git', 'init', '-q', '--bare', cache_path], check=True)
+            known = run_command(['git', 'remote'], cwd=cache_path, capture_output=True, text=True).stdout.split()
+            names = []
+            for url in dict.fromkeys(urls):
+                name = 'r' + hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+                if name not in known:
+                    run_command(['git', 'remote', 'add', '--no-tags', name, url], cwd=cache_path, check=True)
+                names.append(name)
+            if names:
+                result = run_command(['git', 'fetch', '--quiet', f'--jobs={max(1, jobs)}', '--multiple', *names],
+                                     cwd=cache_path, capture_output=True, text=True)
+                if result.returncode != 0:
+                    # Other remotes were still fetched; clones of these just won't share objects
+                    failed = [line for line in result.stderr.splitlines() if line.startswith('could not fetch')]
+                    print(f"⚠ Reference cache: {len(failed) or 'some'} remote(s) could not be fetched")
+                    return False
+            print(f"✓ Reference cache '{cache_path}' holds {len(names)} remote(s)")
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"✗ Reference cache update failed: {e}")
+            return False
+    
+    def iter_sync(self, entries: List[Tuple[str, str]], reference: str = None, filter: str = None,
+                  depth: int = None, retries: int = 2, backoff: float = 1.0,
+                  timeout: Optional[float] = None) -> Iterator[Dict]:
+        """Clone every (url, path) entry that is missing and fetch the ones already present
+        
+        Failed operations are retried `retries` times with exponential
+        backoff and jitter, starting at `backoff` seconds. Results carry
+        "action" ("cloned" or "fetched") and "attempts", or an "error".
+        """
+        urls = {path: url for url, path in entries}
+        
+        def sync_one(repo_path: str) -> Dict:
+            if os.path.exists(repo_path):
+                if not GithubManager(repo_path).is_git_repo():
+                    return {"error": "Path exists and is not a git repository", "attempts": 0}
+                action, cmd, cwd = "fetched", fetch_args(depth=depth), repo_path
+            else:
+                action, cwd = "cloned", None
+                cmd = clone_args(urls[repo_path], repo_path, reference, filter, depth)
+            for attempt in range(retries + 1):
+                if attempt:
+                    time.sleep(backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+                try:
+                    result = run_command(cmd, cwd=cwd, capture_output=True, timeout=timeout)
+                    error = _decode(result.stderr).strip() or f"git exited with {result.returncode}"
+                    if result.returncode == 0:
+                        return {"action": action, "url": urls[repo_path], "attempts": attempt + 1}
+                except subprocess.TimeoutExpired:
+                    error = f"Timed out after {timeout}s"
+                if action == "cloned" and os.path.exists(repo_path):
+                    # Don't let a half-written clone turn the retry into a fetch
+                    shutil.rmtree(repo_path, ignore_errors=True)
+            return {"error": error.splitlines()[-1], "url": urls[repo_path], "attempts": retries + 1}
+        
+        return self._map(sync_one, list(urls))
+    
+    @staticmethod
+    def summarize(results: List[Dict], elapsed: float) -> Dict:
+        """Aggregate per-repository fleet results into a summary"""
+        summary = {
+            "repos": len(results),
+            "errors": 0,
+            "elapsed": round(elapsed, 3),
+            "slowest": None
+        }
+        for entry in results:
+            result = entry["result"]
+            if isinstance(result, bool):
+                summary["passed"] = summary.get("passed", 0) + result
+                summary["failed"] = summary.get("failed", 0) + (not result)
+            elif isinstance(result, dict) and 'error' in result:
+                summary["errors"] += 1
+            elif isinstance(result, dict) and 'action' in result:
+                summary[result["action"]] = summary.get(result["action"], 0) + 1
+                summary["retried"] = summary.get("retried", 0) + (result.get("attempts", 1) > 1)
+            elif isinstance(result, dict) and 'packs' in result:
+                summary["objects"] = summary.get("objects", 0) + result["total"]["count"]
+                summary["disk_size"] = summary.get("disk_size", 0) + result["total"]["disk_size"]
+                summary["pack_size"] = summary.get("pack_size", 0) + result["packs"]["pack_size"]
+            elif isinstance(result, dict):
+                summary["dirty"] = summary.get("dirty", 0) + bool(result.get('has_changes'))
+                summary["ahead"] = summary.get("ahead", 0) + bool(result.get('is_ahead'))
+                summary["behind"] = summary.get("behind", 0) + bool(result.get('is_behind'))
+        if results:
+            slowest = max(results, key=lambda entry: entry["elapsed"])
+            summary["slowest"] = {"repo": slowest["repo"], "elapsed": round(slowest["elapsed"], 3)}
+        return summary
+
+def _decode(data: bytes) -> str:
+    """Decode git output, keeping undecodable bytes visible instead of failing"""
+    return data.decode('utf-8', errors='replace')
+
+@instrumented
+class AsyncGithubManager:
+    """Asyncio twin of GithubManager that runs git via asyncio subprocesses
+    
+    Every git invocation is bounded by a per-call timeout, kills its child
+    process when cancelled, and waits on a semaphore shared by all instances
+    on the event loop so the number of concurrent git processes stays capped.
+    """
+    
+    max_concurrent_git = 32
+    _semaphores: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+    
+    def __init__(self, repo_path: str = None, timeout: Optional[float] = 60, verbose: bool = True,
+                 status_cache: Optional[StatusCache] = None, smoke_cache: Optional[SmokeTestCache] = None):
+        self.repo_path = repo_path or os.getcwd()
+        self.git_dir = resolve_git_dir(self.repo_path) or os.path.join(self.repo_path, '.git')
+        self.timeout = timeout
+        self.verbose = verbose
+        self.status_cache = status_cache if status_cache is not None else STATUS_CACHE
+        self.smoke_cache = smoke_cache if smoke_cache is not None else SMOKE_TEST_CACHE
+    
+    @classmethod
+    def set_concurrency(cls, limit: int) -> None:
+        """Change the cap on concurrent git processes (applies to new event loops)"""
+        cls.max_concurrent_git = max(1, limit)
+        cls._semaphores = weakref.WeakKeyDictionary()
+    
+    @classmethod
+    def _semaphore(cls) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = cls._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = cls._semaphores[loop] = asyncio.Semaphore(cls.max_concurrent_git)
+        return semaphore
+    
+    def _log(self, message: str) -> None:
+        if self.verbose:
+            print(message)
+    
+    async def _run(self, cmd: List[str], cwd: Optional[str] = None, check: bool = False,
+                   timeout: Optional[float] = None, input: Optional[bytes] = None) -> subprocess.CompletedProcess:
+        """Run a command, killing it on timeout or cancellation"""
+        timeout = self.timeout if timeout is None else timeout
+        span = _CURRENT_SPAN.get()
+        async with self._semaphore():
+            started = time.perf_counter()
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                cwd=cwd,
+                stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            spawn_seconds = time.perf_counter() - started
+            TELEMETRY.process_started(span)
+            stdout = stderr = b''
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(input), timeout)
+            except asyncio.TimeoutError:
+                await self._kill(process)
+                raise subprocess.TimeoutExpired(cmd, timeout)
+            except BaseException:
+                await self._kill(process)
+                raise
+            finally:
+                TELEMETRY.record(cmd, spawn_seconds, time.perf_counter() - started, process.returncode,
+                                 len(stdout) + len(stderr), span)
+        
+        result = subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+        if check and result.returncode != 0:
+            raise subprocess.CalledProcessError(result.returncode, cmd, stdout, stderr)
+        return result
+    
+    @staticmethod
+    async def _kill(process: asyncio.subprocess.Process) -> None:
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await process.wait()
+    
+    async def _git(self, *args: str, check: bool = False, timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+        return await self._run(['git', *args], cwd=self.repo_path, check=check, timeout=timeout)
+    
+    @staticmethod
+    def _error(e: subprocess.CalledProcessError) -> str:
+        stderr = _decode(e.stderr or b'').strip()
+        return f"{e} {stderr}" if stderr else str(e)
+    
+    def is_git_repo(self) -> bool:
+        """Check if current directory is a git repository (`.git` may be a directory or a gitfile)"""
+        if not os.path.isdir(self.git_dir):
+            # .git may have appeared, or changed from a directory to a gitfile, since __init__
+            self.git_dir = resolve_git_dir(self.repo_path) or self.git_dir
+        return os.path.isdir(self.git_dir)
+    
+    async def get_repo_status(self, use_cache: bool = False) -> Dict:
+        """Get current repository status with detailed information (`use_cache` opts in to the status cache)"""
+        if not self.is_git_repo():
+            return {"error": "Not a git repository"}
+        
+        loop = asyncio.get_running_loop()
+        fingerprint = None
+        try:
+            if use_cache:
+                # Cache lookups stat files (and may walk the worktree); keep that off the event loop
+                cached = await loop.run_in_executor(None, self.status_cache.get, self.repo_path, self.git_dir)
+                if cached is not None:
+                    return cached
+                branch = _read_head_branch(self.git_dir)
+                fingerprint = await loop.run_in_executor(None, self.status_cache.fingerprint, self.repo_path,
+                                                         self.git_dir, {"current_branch": branch})
+            result = await self._git('status', '--porcelain=v2', '-b', '-z')
+            if result.returncode != 0:
+                return {"error": _decode(result.stderr).strip() or "git status failed"}
+            
+            status = parse_status_v2(result.stdout)
+            commit_info = {}
+            if status["head_oid"]:
+                # Same cat-file path as GithubManager, on a worker thread
+                commit_info = await loop.run_in_executor(None, read_commit_info, self.repo_path, status["head_oid"])
+            
+            remotes = read_config_remotes(common_git_dir(self.git_dir))
+            if remotes is None:
+                remote_result = await self._git('remote', '-v')
+                remotes_text = _decode(remote_result.stdout).strip()
+                status["remotes"] = remotes_text.split('\n') if remotes_text else []
+            else:
+                status["remotes"] = remotes
+            status["last_commit"] = commit_info
+            
+            if fingerprint is not None:
+                fingerprint = await loop.run_in_executor(None, self.status_cache.extend, self.repo_path,
+                                                         self.git_dir, fingerprint, status)
+                self.status_cache.put(self.repo_path, status, fingerprint)
+            return status
+        except Exception as e:
+            return {"error": str(e)}
+    
+    async def smoke_test(self, check_remote: bool = True, use_cache: bool = True, status: Dict = None) -> bool:
+        """Run comprehensive smoke test to ensure repository is functional (see GithubManager.smoke_test)"""
+        if not self.is_git_repo():
+            self._log("Error: Not a git repository")
+            return False
+        
+        if use_cache and self.smoke_cache.get(self.repo_path, 'local'):
+            if not check_remote or self.smoke_cache.get(self.repo_path, 'remote') is not None:
+                self._log("✓ Smoke tests passed (cached)")
+                return True
+        
+        self._log("Running smoke tests...")
+        if status is None:
+            status = await self.get_repo_status()
+        if 'error' in status:
+            self._log(f"✗ Smoke test failed: {status['error']}")
+            return False
+        self._log("✓ Git status command works")
+        
+        if not status.get('last_commit'):
+            self._log("✗ Smoke test failed: git log found no commits")
+            return False
+        self._log("✓ Git log command works")
+        self.smoke_cache.put(self.repo_path, 'local', True)
+        
+        if check_remote and status.get('remotes'):
+            cached = self.smoke_cache.get(self.repo_path, 'remote') if use_cache else None
+            if cached is None:
+                try:
+                    await self._git('ls-remote', '--heads', 'origin', check=True, timeout=10)
+                    cached = True
+                except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+                    cached = False
+                self.smoke_cache.put(self.repo_path, 'remote', cached)
+            if cached:
+                self._log("✓ Remote connection works")
+            else:
+                self._log("⚠ Remote connection failed (offline or no access)")
+        
+        self._log("✓ All smoke tests passed")
+        return True
+    
+    def _transfer_timeout(self) -> Optional[float]:
+        """Timeout for network transfers (clone, fetch, pull, push): at least ten minutes"""
+        return None if self.timeout is None else max(self.timeout, 600)
+    
+    async def _simple(self, args: List[str], success: str, failure: str, needs_repo: bool = True,
+                      timeout: Optional[float] = None) -> bool:
+        """Run one git command and report success or failure like GithubManager does"""
+        if needs_repo and not self.is_git_repo():
+            self._log("Error: Not a git repository")
+            return False
+        
+        try:
+            await self._git(*args, check=True, timeout=timeout)
+            self._log(f"✓ {success}")
+            return True
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            detail = self._error(e) if isinstance(e, subprocess.CalledProcessError) else str(e)
+            self._log(f"✗ {failure} failed: {detail}")
+            return False
+    
+    async def commit_changes(self, message: str, add_all: bool = True, files: List[str] = None,
+                             status: Dict = None) -> bool:
+        """Commit current changes with options (see GithubManager.commit_changes)"""
+        if status is None:
+            status = await self.get_repo_status()
+        if not await self.smoke_test(check_remote=False, status=status):
+            return False
+        
+        try:
+            if 'error' in status:
+                self._log(f"✗ Commit failed: {status['error']}")
+                return False
+            if not status.get('has_changes') and not status.get('untracked_files'):
+                self._log("No changes to commit")
+                return True
+            
+            paths = files or (changed_paths(status) if add_all else [])
+            literal = ['--literal-pathspecs'] if not files else []
+            for start in range(0, len(paths), STAGE_BATCH_SIZE):
+                batch = paths[start:start + STAGE_BATCH_SIZE]
+                data = b'\0'.join(path.encode('utf-8', errors='surrogateescape') for path in batch) + b'\0'
+                await self._run(['git', *literal, 'add', '--all', '--pathspec-from-file=-', '--pathspec-file-nul'],
+                                cwd=self.repo_path, check=True, input=data)
+            if paths:
+                self._log(f"✓ Staged changes matching {len(files)} pathspec(s)" if files
+                          else f"✓ All changes staged ({len(paths)} paths)")
+            
+            await self._git('commit', '-m', message, check=True)
+            self._log(f"✓ Changes committed: {message}")
+            return True
+        except subprocess.CalledProcessError as e:
+            if b"nothing to commit" in (e.output or b''):
+                self._log("No changes to commit")
+                return True
+            self._log(f"✗ Commit failed: {self._error(e)}")
+            return False
+    
+    async def push_to_github(self, branch: str = None) -> bool:
+        """Push changes to GitHub"""
+        if not await self.smoke_test():
+            return False
+        return await self._simple(['push', 'origin', branch] if branch else ['push'], "Changes pushed to GitHub", "Push",
+                                  timeout=self._transfer_timeout())
+    
+    async def pull_changes(self, remote: str = 'origin', branch: str = None) -> bool:
+        """Pull changes from remote repository"""
+        if branch:
+            return await self._simple(['pull', remote, branch], f"Pulled changes from {remote}/{branch}", "Pull",
+                                      timeout=self._transfer_timeout())
+        return await self._simple(['pull'], f"Pulled changes from {remote}", "Pull", timeout=self._transfer_timeout())
+    
+    async def create_repository(self, repo_name: str, private: bool = False) -> bool:
+        """Create a new GitHub repository through the REST API, or GitHub CLI without a token"""
+        client = GithubClient.shared()
+        if client.available:
+            try:
+                # The pooled client blocks, so it runs on the loop's default executor
+                repo = await asyncio.get_running_loop().run_in_executor(None, client.create_repo, repo_name, private)
+                self._log(f"✓ Repository '{repo['full_name']}' created on GitHub")
+                return True
+            except GithubAPIError as e:
+                self._log(f"✗ Repository creation failed: {e}")
+                return False
+            except ConnectionError as e:
+                self._log(f"⚠ GitHub API unreachable ({e}), using gh")
+        cmd = ['gh', 'repo', 'create', repo_name, '--private' if private else '--public']
+        try:
+            await self._run(cmd, cwd=self.repo_path, check=True)
+            self._log(f"✓ Repository '{repo_name}' created on GitHub")
+            return True
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError) as e:
+            self._log(f"✗ Repository creation failed: {e}")
+            return False
+    
+    async def fetch_changes(self, remote: str = 'origin', prune: bool = True, depth: int = None) -> bool:
+        """Fetch from a remote without touching the working tree"""
+        return await self._simple(fetch_args(remote, prune, depth)[1:], f"Fetched changes from {remote}", "Fetch",
+                                  timeout=self._transfer_timeout())
+    
+    async def clone_repository(self, repo_url: str, target_dir: str = None, reference: str = None,
+                               filter: str = None, depth: int = None, single_branch: bool = False) -> bool:
+        """Clone a GitHub repository (see clone_args for the sharing and partial-clone options)"""
+        cmd = clone_args(repo_url, target_dir, reference, filter, depth, single_branch)
+        try:
+            await self._run(cmd, check=True, timeout=self._transfer_timeout())
+            self._log(f"✓ Repository cloned to '{target_dir}'" if target_dir else "✓ Repository cloned")
+            return True
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            self._log(f"✗ Clone failed: {e}")
+            return False
+    
+    async def create_branch(self, branch_name: str, checkout: bool = True) -> bool:
+        """Create and optionally checkout a new branch"""
+        if checkout:
+            return await self._simple(['checkout', '-b', branch_name], f"Created and checked out branch '{branch_name}'", "Branch creation")
+        return await self._simple(['branch', branch_name], f"Created branch '{branch_name}'", "Branch creation")
+    
+    async def switch_branch(self, branch_name: str) -> bool:
+        """Switch to an existing branch"""
+        return await self._simple(['checkout', branch_name], f"Switched to branch '{branch_name}'", "Branch switch")
+    
+    async def merge_branch(self, source_branch: str, target_branch: str = None) -> bool:
+        """Merge a branch into current or target branch"""
+        if not self.is_git_repo():
+            self._log("Error: Not a git repository")
+            return False
+        
+        current_branch = (await self.get_repo_status(use_cache=True)).get('current_branch')
+        if target_branch and target_branch != current_branch:
+            if not await self._simple(['checkout', target_branch], f"Switched to branch '{target_branch}'", "Merge"):
+                return False
+        return await self._simple(['merge', source_branch],
+                                  f"Merged branch '{source_branch}' into '{target_branch or current_branch}'", "Merge")
+    
+    async def get_commit_history(self, limit: int = 10, **filters) -> List[Dict]:
+        """Get commit history with details (see iter_commit_history for filters)"""
+        if not self.is_git_repo():
+            return [{"error": "Not a git repository"}]
+        
+        try:
+            return [commit.to_dict() async for commit in self.iter_commit_history(limit=limit, **filters)]
+        except Exception as e:
+            return [{"error": str(e)}]
+    
+    async def iter_commit_history(self, limit: Optional[int] = None, skip: int = 0, rev_range: str = None,
+                                  paths: List[str] = None, since: str = None, until: str = None,
+                                  author: str = None):
+        """Stream commit history from a `git log -z` pipe in constant memory"""
+        if not self.is_git_repo():
+            raise RuntimeError("Not a git repository")
+        
+        args = history_args(limit, skip, rev_range, paths, since, until, author)
+        span = _CURRENT_SPAN.get()
+        async with self._semaphore():
+            started = time.perf_counter()
+            process = await asyncio.create_subprocess_exec(
+                'git', *args,
+                cwd=self.repo_path,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            spawn_seconds = time.perf_counter() - started
+            TELEMETRY.process_started(span)
+            received = 0
+            try:
+                parser = NulFieldParser(len(COMMIT_FIELDS))
+                while True:
+                    chunk = await asyncio.wait_for(process.stdout.read(65536), self.timeout)
+                    if not chunk:
+                        break
+                    received += len(chunk)
+                    for fields in parser.feed(chunk):
+                        yield CommitRecord(*fields)
+                for fields in parser.close():
+                    yield CommitRecord(*fields)
+                stderr = await process.stderr.read()
+                if await process.wait() != 0:
+                    raise RuntimeError(_decode(stderr).strip() or f"git log exited with {process.returncode}")
+            finally:
+                await self._kill(process)
+                TELEMETRY.record(['git', *args], spawn_seconds, time.perf_counter() - started,
+                                 process.returncode, received, span)
+    
+    async def stash_changes(self, message: str = None) -> bool:
+        """Stash current changes"""
+        if message:
+            return await self._simple(['stash', 'push', '-m', message], f"Changes stashed with message: {message}", "Stash")
+        return await self._simple(['stash'], "Changes stashed", "Stash")
+    
+    async def stash_pop(self, stash_index: str = '0') -> bool:
+        """Pop stashed changes"""
+        return await self._simple(['stash', 'pop', f'stash@{{{stash_index}}}'],
+                                  f"Stashed changes applied (stash@{{{stash_index}}})", "Stash pop")
+    
+    async def get_file_diff(self, file_path: str = None, staged: bool = False) -> str:
+        """Get diff for specific file or all changes"""
+        if not self.is_git_repo():
+            return "Error: Not a git repository"
+        
+        try:
+            args = ['diff'] + (['--staged'] if staged else []) + ([file_path] if file_path else [])
+            result = await self._git(*args)
+            return _decode(result.stdout)
+        except Exception as e:
+            return f"Error getting diff: {e}"
+    
+    async def get_diff_stats(self, file_path: str = None, staged: bool = False) -> Dict:
+        """Per-file added/deleted line counts from `git diff --numstat`, without patch text"""
+        if not self.is_git_repo():
+            return {"error": "Not a git repository"}
+        
+        try:
+            args = ['diff', '--numstat', '-z', '-M'] + (['--staged'] if staged else []) + ['--'] + ([file_path] if file_path else [])
+            result = await self._git(*args)
+            if result.returncode != 0:
+                return {"error": _decode(result.stderr).strip()}
+            return parse_numstat(result.stdout)
+        except Exception as e:
+            return {"error": str(e)}
+    
+    async def revert_last_commit(self) -> bool:
+        """Revert the last commit"""
+        return await self._simple(['revert', '--no-edit', 'HEAD'], "Last commit reverted", "Revert")
+    
+    async def reset_to_commit(self, commit_hash: str, hard: bool = False) -> bool:
+        """Reset repository to specific commit"""
+        mode = "hard" if hard else "soft"
+        args = ['reset'] + (['--hard'] if hard else []) + [commit_hash]
+        return await self._simple(args, f"Reset to commit {commit_hash} ({mode} mode)", "Reset")
+    
+    async def add_remote(self, name: str, url: str) -> bool:
+        """Add a new remote repository"""
+        return await self._simple(['remote', 'add', name, url], f"Added remote '{name}': {url}", "Adding remote")
+    
+    async def update_refs(self, operations: List[Dict], message: str = None, allow_checked_out: bool = False) -> Dict:
+        """Apply {"action", "ref", "new", "old"} operations in one all-or-nothing transaction"""
+        if not self.is_git_repo():
+            return {"error": "Not a git repository"}
+        
+        try:
+            transaction = RefTransaction(self.repo_path, message, allow_checked_out)
+            for operation in operations:
+                transaction.add(operation["action"], operation["ref"], operation.get("new"), operation.get("old"))
+        except (KeyError, ValueError) as e:
+            return {"error": f"Invalid ref operation: {e}"}
+        if not transaction.operations:
+            return {"applied": 0, "refs": []}
+        error = transaction.blocked()
+        if error:
+            return {"error": error}
+        return transaction.result(await self._run(transaction.command(), cwd=self.repo_path, input=transaction.stdin()))
+    
+    async def list_branches(self, remote: bool = False) -> List[str]:
+        """List all branches"""
+        if not self.is_git_repo():
+            return ["Error: Not a git repository"]
+        
+        try:
+            result = await self._git('branch', '-r' if remote else '-a')
+            return [b.strip().replace('* ', '') for b in _decode(result.stdout).strip().split('\n') if b.strip()]
+        except Exception as e:
+            return [f"Error: {e}"]
+
+# NUL-separated fields; used with `git log -z` so subjects may contain anything
+COMMIT_FORMAT = '%H%x00%s%x00%ai%x00%an'
+COMMIT_FIELDS = ("hash", "message", "date", "author")
+
+class CommitRecord:
+    """One commit from a history stream; slotted so huge logs stay cheap to walk"""
+    
+    __slots__ = COMMIT_FIELDS
+    
+    def __init__(self, *values: str):
+        for field, value in zip(COMMIT_FIELDS, values):
+            setattr(self, field, value)
+    
+    def to_dict(self) -> Dict:
+        return {field: getattr(self, field) for field in COMMIT_FIELDS}
+    
+    def __repr__(self) -> str:
+        return f"CommitRecord({self.hash[:8]} {self.message!r})"
+
+class NulFieldParser:
+    """Incrementally split NUL-terminated fields into fixed-size records"""
+    
+    def __init__(self, size: int):
+        self.size = size
+        self._buffer = b''
+        self._fields: List[str] = []
+    
+    def feed(self, chunk: bytes) -> List[List[str]]:
+        """Consume a chunk and return every record it completed"""
+        parts = (self._buffer + chunk).split(b'\0')
+        self._buffer = parts.pop()
+        records = []
+        for part in parts:
+            # Some git versions separate -z records with an extra newline
+            self._fields.append(_decode(part).lstrip('\n') if not self._fields else _decode(part))
+            if len(self._fields) == self.size:
+                records.append(self._fields)
+                self._fields = []
+        return records
+    
+    def close(self) -> List[List[str]]:
+        """Flush a final record that wasn't NUL-terminated"""
+        records = self.feed(b'\0') if self._buffer else []
+        self._fields = []
+        return records
+
+def iter_nul_fields(chunks: Iterator[bytes], size: int) -> Iterator[List[str]]:
+    """Yield fixed-size records from a stream of NUL-delimited byte chunks"""
+    parser = NulFieldParser(size)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+def parse_commit_records(data: bytes) -> List[Dict]:
+    """Parse `git log -z --format=COMMIT_FORMAT` output into commit dictionaries"""
+    return [dict(zip(COMMIT_FIELDS, fields)) for fields in iter_nul_fields(iter([data]), len(COMMIT_FIELDS))]
+
+# Paths per `git add --pathspec-from-file` call when staging a status snapshot
+STAGE_BATCH_SIZE = 50000
+
+# Unfiltered histories up to this length are walked over the cat-file pipe
+BATCH_HISTORY_LIMIT = 200
+
+# Names written to cat-file before reading their answers; at most one pipe buffer,
+# so the write can't block while cat-file waits for us to drain its output
+CAT_FILE_CHUNK_BYTES = 4096
+
+class _CatFileWorker:
+    """One long-running `git cat-file` process speaking the batch protocol"""
+    
+    def __init__(self, repo_path: str, mode: str):
+        self.repo_path = repo_path
+        self.mode = mode
+        self.process = None
+        self.restarts = -1
+    
+    def _ensure(self) -> subprocess.Popen:
+        if self.process is None or self.process.poll() is not None:
+            self.close()
+            self.process = start_command(['git', 'cat-file', self.mode], cwd=self.repo_path,
+                                            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                            stderr=subprocess.DEVNULL)
+            self.restarts += 1
+        return self.process
+    
+    def request(self, names: List[str]) -> List[Optional[Tuple[str, str, int, Optional[bytes]]]]:
+        """Send names in chunks of up to CAT_FILE_CHUNK_BYTES, reading each chunk's answers before the next"""
+        for attempt in range(2):
+            process = self._ensure()
+            try:
+                replies = []
+                chunk = []
+                size = 0
+                for name in names:
+                    line = name.encode('utf-8') + b'\n'
+                    if chunk and size + len(line) > CAT_FILE_CHUNK_BYTES:
+                        replies.extend(self._exchange(process, chunk))
+                        chunk, size = [], 0
+                    chunk.append(line)
+                    size += len(line)
+                if chunk:
+                    replies.extend(self._exchange(process, chunk))
+                return replies
+            except (BrokenPipeError, ConnectionResetError, EOFError, ValueError):
+                # The worker died (or was killed); start a fresh one and retry once
+                self.close()
+                if attempt:
+                    raise RuntimeError(f"git cat-file {self.mode} keeps failing")
+        return []
+    
+    def _exchange(self, process: subprocess.Popen,
+                  lines: List[bytes]) -> List[Optional[Tuple[str, str, int, Optional[bytes]]]]:
+        process.stdin.write(b''.join(lines))
+        process.stdin.flush()
+        return [self._read_one(process) for _ in lines]
+    
+    def _read_one(self, process: subprocess.Popen) -> Optional[Tuple[str, str, int, Optional[bytes]]]:
+        header = process.stdout.readline()
+        if not header:
+            raise EOFError("git cat-file exited")
+        # "<oid> <type> <size>", or "<name> missing" / "<name> ambiguous" where the name may contain spaces
+        parts = header.decode('utf-8', errors='replace').rstrip('\n').rsplit(' ', 2)
+        if len(parts) != 3 or not parts[2].isdigit():
+            return None
+        oid, kind, size = parts[0], parts[1], int(parts[2])
+        data = None
+        if self.mode == '--batch':
+            data = process.stdout.read(size)
+            process.stdout.read(1)
+        return (oid, kind, size, data)
+    
+    def close(self) -> None:
+        if self.process is not None:
+            for stream in (self.process.stdin, self.process.stdout):
+                try:
+                    stream.close()
+                except OSError:
+                    pass
+            if self.process.poll() is None:
+                self.process.kill()
+            self.process.wait()
+            self.process = None
+
+class ObjectReader:
+    """Pool of persistent `git cat-file --batch` / `--batch-check` workers for one repository
+    
+    Lookups are pipelined over the workers' stdin/stdout, so each read costs
+    a pipe round-trip instead of a process start. Crashed workers are
+    restarted transparently. Use `ObjectReader.for_repo()` to share readers;
+    at most `max_readers` repositories keep their workers, least recently
+    used ones are closed beyond that.
+    """
+    
+    max_readers = 32
+    _readers: "OrderedDict[str, ObjectReader]" = OrderedDict()
+    _registry_lock = threading.Lock()
+    
+    def __init__(self, repo_path: str):
+        self.repo_path = repo_path
+        self._batch = _CatFileWorker(repo_path, '--batch')
+        self._check = _CatFileWorker(repo_path, '--batch-check')
+        self._batch_lock = threading.Lock()
+        self._check_lock = threading.Lock()
+    
+    @classmethod
+    def for_repo(cls, repo_path: str) -> 'ObjectReader':
+        """Shared reader for a repository, started on first use"""
+        key = os.path.realpath(repo_path)
+        evicted = []
+        with cls._registry_lock:
+            reader = cls._readers.get(key)
+            if reader is None:
+                reader = cls._readers[key] = cls(key)
+            cls._readers.move_to_end(key)
+            while len(cls._readers) > cls.max_readers:
+                evicted.append(cls._readers.popitem(last=False)[1])
+        # Closing waits for in-flight requests, so do it outside the registry lock
+        for old in evicted:
+            old.close()
+        return reader
+    
+    @classmethod
+    def release(cls, repo_path: str) -> None:
+        """Stop the shared workers of one repository, if any are running"""
+        with cls._registry_lock:
+            reader = cls._readers.pop(os.path.realpath(repo_path), None)
+        if reader is not None:
+            reader.close()
+    
+    @classmethod
+    def close_all(cls) -> None:
+        with cls._registry_lock:
+            readers = list(cls._readers.values())
+            cls._readers.clear()
+        for reader in readers:
+            reader.close()
+    
+    @staticmethod
+    def _valid(name: str) -> bool:
+        return bool(name) and '\n' not in name
+    
+    def check(self, names: List[str]) -> Dict[str, Optional[Tuple[str, str, int]]]:
+        """Resolve names to (oid, type, size) in a single round-trip; None if missing"""
+        wanted = [name for name in dict.fromkeys(names) if self._valid(name)]
+        answers = {}
+        if wanted:
+            with self._check_lock:
+                replies = self._check.request(wanted)
+            answers = {name: (reply[:3] if reply else None) for name, reply in zip(wanted, replies)}
+        return {name: answers.get(name) for name in names}
+    
+    def resolve(self, names: List[str]) -> Dict[str, Optional[str]]:
+        """Resolve revisions to object ids in a single round-trip"""
+        return {name: (info[0] if info else None) for name, info in self.check(names).items()}
+    
+    def read(self, name: str) -> Optional[Tuple[str, str, bytes]]:
+        """Read one object as (oid, type, raw data), or None if it doesn't exist"""
+        return self.read_many([name])[0]
+    
+    def read_many(self, names: List[str]) -> List[Optional[Tuple[str, str, bytes]]]:
+        """Read several objects with one pipelined request"""
+        valid = [name for name in names if self._valid(name)]
+        replies = []
+        if valid:
+            with self._batch_lock:
+                replies = self._batch.request(valid)
+        by_name = {name: reply for name, reply in zip(valid, replies)}
+        return [(by_name[name][0], by_name[name][1], by_name[name][3]) if by_name.get(name) else None
+                for name in names]
+    
+    def read_commit(self, name: str) -> Optional[Dict]:
+        obj = self.read(name)
+        if obj is None:
+            return None
+        oid, kind, data = obj
+        if kind == 'tag':
+            # Peel annotated tags down to the commit they point at
+            return self.read_commit(parse_tag(data)["object"])
+        return parse_commit(oid, data) if kind == 'commit' else None
+    
+    def read_tree(self, name: str) -> Optional[List[Dict]]:
+        obj = self.read(name)
+        if obj is None or obj[1] != 'tree':
+            return None
+        return parse_tree(obj[2], len(obj[0]) // 2)
+    
+    def read_tag(self, name: str) -> Optional[Dict]:
+        obj = self.read(name)
+        if obj is None or obj[1] != 'tag':
+            return None
+        return parse_tag(obj[2])
+    
+    def walk_commits(self, start: str, limit: int, skip: int = 0) -> List[Dict]:
+        """First commits reachable from `start` in `git log`'s default (commit date) order"""
+        first = self.read_commit(start)
+        if first is None:
+            return []
+        counter = itertools.count()
+        queue = [(-first["committer_timestamp"], next(counter), first)]
+        seen = {first["hash"]}
+        commits = []
+        while queue and len(commits) < skip + limit:
+            _, _, commit = heapq.heappop(queue)
+            commits.append(commit)
+            parents = [parent for parent in commit["parents"] if parent not in seen]
+            seen.update(parents)
+            if parents:
+                with self._batch_lock:
+                    replies = self._batch.request(parents)
+                for reply in replies:
+                    if reply:
+                        parent = parse_commit(reply[0], reply[3])
+                        heapq.heappush(queue, (-parent["committer_timestamp"], next(counter), parent))
+        return commits[skip:]
+    
+    def close(self) -> None:
+        with self._batch_lock:
+            self._batch.close()
+        with self._check_lock:
+            self._check.close()
+
+atexit.register(ObjectReader.close_all)
+
+def read_commit_info(repo_path: str, rev: str = 'HEAD') -> Dict:
+    """Hash, subject, date and author of a single commit, or {} if there is none"""
+    try:
+        # One round-trip on the shared cat-file pipe instead of a new git process
+        commit = ObjectReader.for_repo(repo_path).read_commit(rev)
+        return {field: commit[field] for field in COMMIT_FIELDS} if commit else {}
+    except (OSError, RuntimeError):
+        pass
+    result = run_command(
+        ['git', 'log', '-1', '-z', f'--format={COMMIT_FORMAT}', rev, '--'],
+        cwd=repo_path,
+        capture_output=True
+    )
+    commits = parse_commit_records(result.stdout) if result.returncode == 0 else []
+    return commits[0] if commits else {}
+
+def _parse_person(value: str) -> Tuple[str, str, int, str]:
+    """Split an author/committer/tagger line into name, email, timestamp and offset"""
+    match = re.match(r'^(.*?) ?<([^>]*)> (\d+) ([+-]\d{4})$', value)
+    if not match:
+        return (value, "", 0, "+0000")
+    return (match.group(1), match.group(2), int(match.group(3)), match.group(4))
+
+def _format_git_date(timestamp: int, offset: str) -> str:
+    """Format like git's %ai: 2024-01-31 12:00:00 +0100"""
+    sign = -1 if offset.startswith('-') else 1
+    delta = datetime.timedelta(hours=int(offset[1:3]), minutes=int(offset[3:5])) * sign
+    moment = datetime.datetime.fromtimestamp(timestamp, datetime.timezone(delta))
+    return moment.strftime('%Y-%m-%d %H:%M:%S ') + offset
+
+def _parse_headers(data: bytes) -> Tuple[Dict[str, List[str]], bytes]:
+    """Split a commit or tag object into headers (with continuation lines) and message"""
+    head, _, message = data.partition(b'\n\n')
+    headers: Dict[str, List[str]] = {}
+    last = None
+    for line in head.decode('utf-8', errors='replace').split('\n'):
+        if line.startswith(' ') and last is not None:
+            headers[last][-1] += '\n' + line[1:]
+            continue
+        key, _, value = line.partition(' ')
+        headers.setdefault(key, []).append(value)
+        last = key
+    return headers, message
+
+def parse_commit(oid: str, data: bytes) -> Dict:
+    """Parse a raw commit object into the fields GithubManager reports"""
+    headers, message = _parse_headers(data)
+    encoding = headers.get('encoding', ['utf-8'])[0]
+    try:
+        text = message.decode(encoding, errors='replace')
+    except LookupError:
+        text = message.decode('utf-8', errors='replace')
+    author, author_email, author_time, author_tz = _parse_person(headers.get('author', [''])[0])
+    committer, _, committer_time, committer_tz = _parse_person(headers.get('committer', [''])[0])
+    # %s: the first paragraph, folded onto one line
+    subject = ' '.join(line.strip() for line in text.strip('\n').split('\n\n', 1)[0].split('\n'))
+    return {
+        "hash": oid,
+        "message": subject,
+        "date": _format_git_date(author_time, author_tz),
+        "author": author,
+        "author_email": author_email,
+        "committer": committer,
+        "committer_date": _format_git_date(committer_time, committer_tz),
+        "committer_timestamp": committer_time,
+        "tree": headers.get('tree', [''])[0],
+        "parents": headers.get('parent', []),
+        "body": text
+    }
+
+def parse_tree(data: bytes, hash_size: int = 20) -> List[Dict]:
+    """Parse a raw tree object into mode/type/name/oid entries"""
+    entries = []
+    i = 0
+    while i < len(data):
+        space = data.index(b' ', i)
+        nul = data.index(b'\0', space)
+        mode = data[i:space].decode('ascii')
+        oid = data[nul + 1:nul + 1 + hash_size].hex()
+        kind = 'tree' if mode == '40000' else 'commit' if mode == '160000' else 'blob'
+        entries.append({"mode": mode.zfill(6), "type": kind, "name": _decode(data[space + 1:nul]), "oid": oid})
+        i = nul + 1 + hash_size
+    return entries
+
+def parse_tag(data: bytes) -> Dict:
+    """Parse a raw annotated tag object"""
+    headers, message = _parse_headers(data)
+    tagger, tagger_email, tagger_time, tagger_tz = _parse_person(headers.get('tagger', [''])[0])
+    return {
+        "object": headers.get('object', [''])[0],
+        "type": headers.get('type', [''])[0],
+        "tag": headers.get('tag', [''])[0],
+        "tagger": tagger,
+        "tagger_email": tagger_email,
+        "date": _format_git_date(tagger_time, tagger_tz) if tagger_time else None,
+        "message": message.decode('utf-8', errors='replace')
+    }
+
+@instrumented
+class CommitIndex:
+    """Incremental on-disk commit index stored in `.git/github_manager/commits.sqlite3`
+    
+    The index covers every commit reachable from local branches, remote-tracking
+    branches and HEAD. `update()` remembers the tip it indexed for each ref and
+    only walks commits that are new since then; when a ref was rewritten or
+    deleted, commits that are no longer reachable are pruned.
+    """
+    
+    INDEX_FORMAT = COMMIT_FORMAT + '%x00%at'
+    INDEX_FIELDS = COMMIT_FIELDS + ("timestamp",)
+    
+    def __init__(self, repo_path: str, git_dir: str = None):
+        self.repo_path = repo_path
+        self.git_dir = git_dir or resolve_git_dir(repo_path) or os.path.join(repo_path, '.git')
+        self.path = os.path.join(self.git_dir, 'github_manager', 'commits.sqlite3')
+        self._lock = threading.Lock()
+        self._db = None
+    
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS commits (
+                    hash TEXT PRIMARY KEY,
+                    message TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    author TEXT NOT NULL,
+                    timestamp INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS commits_timestamp ON commits (timestamp);
+                CREATE INDEX IF NOT EXISTS commits_author ON commits (author, timestamp);
+                CREATE TABLE IF NOT EXISTS refs (
+                    name TEXT PRIMARY KEY,
+                    tip TEXT NOT NULL
+                );
+            """)
+            self._db = db
+        return self._db
+    
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+    
+    def _git(self, *args: str) -> subprocess.CompletedProcess:
+        return run_command(['git', *args], cwd=self.repo_path, capture_output=True)
+    
+    def current_refs(self) -> Dict[str, str]:
+        """Tips of every indexed ref, read with a single for-each-ref"""
+        result = self._git('for-each-ref', '--format=%(refname)%00%(objectname)', 'refs/heads', 'refs/remotes')
+        if result.returncode != 0:
+            raise RuntimeError(_decode(result.stderr).strip() or "git for-each-ref failed")
+        refs = {}
+        for line in _decode(result.stdout).splitlines():
+            name, _, tip = line.partition('\0')
+            if name.endswith('/HEAD') and name.startswith('refs/remotes/'):
+                continue
+            refs[name] = tip
+        if not _read_head_branch(self.git_dir):
+            # Detached HEAD: index it too so the current history is covered
+            head = self._git('rev-parse', '--verify', '-q', 'HEAD')
+            if head.returncode == 0:
+                refs['HEAD'] = _decode(head.stdout).strip()
+        return refs
+    
+    def _unreachable(self, old_tips: List[str], tips: List[str]) -> List[str]:
+        """Commits reachable from old tips but from none of the current ones, listed by one rev-list"""
+        if not old_tips:
+            return []
+        stdin = '\n'.join(old_tips + [f'^{tip}' for tip in tips]) + '\n'
+        result = run_command(['git', 'rev-list', '--stdin'], cwd=self.repo_path, input=stdin.encode('utf-8'),
+                             capture_output=True)
+        if result.returncode != 0:
+            raise RuntimeError(_decode(result.stderr).strip() or "git rev-list failed")
+        return _decode(result.stdout).split()
+    
+    def _existing_commits(self, tips: List[str]) -> List[str]:
+        """The tips that are still commits in the object store (rewritten ones may have been gc'd)"""
+        found = ObjectReader.for_repo(self.repo_path).check(tips)
+        return [tip for tip in tips if found[tip] and found[tip][1] == 'commit']
+    
+    def _ingest(self, db: sqlite3.Connection, include: List[str], exclude: List[str]) -> int:
+        """Stream `git log` for new commits straight into the commits table"""
+        if not include:
+            return 0
+        cmd = ['git', 'log', '-z', f'--format={self.INDEX_FORMAT}', '--stdin']
+        stdin = '\n'.join(include + [f'^{tip}' for tip in exclude]) + '\n'
+        process = start_command(cmd, cwd=self.repo_path, stdin=subprocess.PIPE,
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            # The rev list is small; write it before reading so git can start walking
+            process.stdin.write(stdin.encode('utf-8'))
+            process.stdin.close()
+            added = 0
+            chunks = iter(lambda: process.stdout.read1(65536), b'')
+            rows = iter_nul_fields(chunks, len(self.INDEX_FIELDS))
+            while True:
+                batch = [(h, m, d, a, int(t)) for h, m, d, a, t in itertools.islice(rows, 5000)]
+                if not batch:
+                    break
+                added += db.executemany("INSERT OR IGNORE INTO commits VALUES (?, ?, ?, ?, ?)", batch).rowcount
+            if process.wait() != 0:
+                raise RuntimeError(f"git log exited with {process.returncode}")
+            return added
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+    
+    def _prune(self, db: sqlite3.Connection, tips: List[str]) -> int:
+        """Drop indexed commits that are no longer reachable from any tip"""
+        db.execute("CREATE TEMP TABLE IF NOT EXISTS reachable (hash TEXT PRIMARY KEY)")
+        db.execute("DELETE FROM reachable")
+        if tips:
+            process = start_command(['git', 'rev-list', '--stdin'], cwd=self.repo_path, stdin=subprocess.PIPE,
+                                       stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            process.stdin.write(('\n'.join(tips) + '\n').encode('utf-8'))
+            process.stdin.close()
+            lines = (line.strip().decode('ascii') for line in process.stdout)
+            while True:
+                batch = [(line,) for line in itertools.islice(lines, 5000)]
+                if not batch:
+                    break
+                db.executemany("INSERT OR IGNORE INTO reachable VALUES (?)", batch)
+            process.stdout.close()
+            if process.wait() != 0:
+                raise RuntimeError(f"git rev-list exited with {process.returncode}")
+        pruned = db.execute("DELETE FROM commits WHERE hash NOT IN (SELECT hash FROM reachable)").rowcount
+        db.execute("DELETE FROM reachable")
+        return pruned
+    
+    def update(self) -> Dict:
+        """Bring the index up to date, walking only commits added since the last update"""
+        refs = self.current_refs()
+        with self._lock:
+            db = self._connect()
+            stored = dict(db.execute("SELECT name, tip FROM refs"))
+            changed = {name: tip for name, tip in refs.items() if stored.get(name) != tip}
+            removed = [name for name in stored if name not in refs]
+            if not changed and not removed:
+                return {"added": 0, "pruned": 0, "refs": len(refs)}
+            
+            # `^tip` of a gc'd commit would make git log fail, so only exclude tips that still exist
+            exclude = self._existing_commits(sorted(set(stored.values())))
+            if not stored or exclude:
+                # Whatever only the previous tips of moved or deleted refs reach has left the history
+                old_tips = {stored[name] for name in [*changed, *removed] if name in stored}
+                missing = old_tips.difference(exclude)
+                lost = set(self._unreachable(sorted(old_tips - missing), sorted(set(refs.values()))))
+                rewritten = [name for name in changed if name in stored and stored[name] in lost | missing]
+                with db:
+                    added = self._ingest(db, sorted(set(changed.values())), exclude)
+                    if missing:
+                        # A previous tip was gc'd, so what it reached can't be listed; check every commit
+                        pruned = self._prune(db, sorted(set(refs.values())))
+                    else:
+                        pruned = db.executemany("DELETE FROM commits WHERE hash = ?",
+                                                ((commit,) for commit in lost)).rowcount
+                    db.execute("DELETE FROM refs")
+                    db.executemany("INSERT INTO refs VALUES (?, ?)", refs.items())
+                return {"added": added, "pruned": pruned, "refs": len(refs), "rewritten": rewritten,
+                        "removed": removed}
+        # None of the indexed tips exist any more, so nothing bounds the walk: start over
+        return dict(self.rebuild(), rebuilt=True)
+
+    def rebuild(self) -> Dict:
+        """Discard the index and re-ingest every reachable commit"""
+        refs = self.current_refs()
+        with self._lock:
+            db = self._connect()
+            with db:
+                db.execute("DELETE FROM commits")
+                db.execute("DELETE FROM refs")
+                added = self._ingest(db, sorted(set(refs.values())), [])
+                db.executemany("INSERT INTO refs VALUES (?, ?)", refs.items())
+            return {"added": added, "refs": len(refs)}
+    
+    def verify(self) -> Dict:
+        """Compare the index against the repository without modifying it"""
+        refs = self.current_refs()
+        with self._lock:
+            db = self._connect()
+            stored = dict(db.execute("SELECT name, tip FROM refs"))
+            indexed = db.execute("SELECT COUNT(*) FROM commits").fetchone()[0]
+        tips = sorted(set(refs.values()))
+        expected = 0
+        if tips:
+            result = run_command(['git', 'rev-list', '--count', '--stdin'], cwd=self.repo_path,
+                                    input=('\n'.join(tips) + '\n').encode('utf-8'), capture_output=True)
+            expected = int(result.stdout.strip() or 0)
+        stale = sorted(name for name in set(refs) | set(stored) if refs.get(name) != stored.get(name))
+        return {
+            "ok": not stale and indexed == expected,
+            "indexed_commits": indexed,
+            "reachable_commits": expected,
+            "stale_refs": stale
+        }
+    
+    def query(self, author: str = None, since: str = None, until: str = None,
+              limit: Optional[int] = 10, skip: int = 0) -> List[Dict]:
+        """Look up commits by author substring and date range, newest first"""
+        clauses = []
+        params: List = []
+        if author:
+            clauses.append("author LIKE ? ESCAPE '\\'")
+            params.append('%' + re.sub(r'([%_\\])', r'\\\1', author) + '%')
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(_to_timestamp(since))
+        if until:
+            clauses.append("timestamp <= ?")
+            params.append(_to_timestamp(until))
+        sql = "SELECT hash, message, date, author FROM commits"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY timestamp DESC, hash LIMIT ? OFFSET ?"
+        params += [-1 if limit is None else limit, skip]
+        with self._lock:
+            rows = self._connect().execute(sql, params).fetchall()
+        return [dict(zip(COMMIT_FIELDS, row)) for row in rows]
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            db = self._connect()
+            commits = db.execute("SELECT COUNT(*) FROM commits").fetchone()[0]
+            refs = db.execute("SELECT COUNT(*) FROM refs").fetchone()[0]
+        return {"path": self.path, "commits": commits, "refs": refs, "size": os.path.getsize(self.path)}
+
+OBJECT_TYPES = ("commit", "tree", "blob", "tag")
+ANALYZE_CHECK_FORMAT = '%(objecttype) %(objectname) %(objectsize) %(objectsize:disk)'
+
+def _iter_lines(stream, chunk_size: int = 1 << 20) -> Iterator[bytes]:
+    """Yield newline-terminated lines from a pipe, reading it in large chunks"""
+    buffer = b''
+    for chunk in iter(lambda: stream.read1(chunk_size), b''):
+        lines = (buffer + chunk).split(b'\n')
+        buffer = lines.pop()
+        yield from lines
+    if buffer:
+        yield buffer
+
+def directory_key(path: str, depth: int = 1) -> str:
+    """The first `depth` directories of a file path, or '.' for top-level files"""
+    parts = path.split('/')[:-1][:max(1, depth)]
+    return '/'.join(parts) or '.'
+
+@instrumented
+class RepoAnalyzer:
+    """Object, directory and pack size report for one repository
+    
+    Every pass streams git's output and keeps only bounded state: a heap of
+    the `top` largest blobs, per-type and per-directory totals, and the set
+    of blobs whose path and introducing commit are still wanted. Memory use
+    doesn't grow with the number of objects, so very large repositories can
+    be analyzed.
+    """
+    
+    def __init__(self, repo_path: str, git_dir: str = None):
+        self.repo_path = repo_path
+        self.git_dir = git_dir or resolve_git_dir(repo_path) or os.path.join(repo_path, '.git')
+    
+    @contextlib.contextmanager
+    def _pipe(self, cmd: List[str], **kwargs):
+        """Run a git command and yield its stdout lines; raise RuntimeError if it fails"""
+        process = start_command(cmd, cwd=self.repo_path, stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE, **kwargs)
+        try:
+            yield _iter_lines(process.stdout)
+            stderr = process.stderr.read()
+            if process.wait() != 0:
+                raise RuntimeError(_decode(stderr).strip() or f"{' '.join(cmd[:3])} failed")
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+            process.stderr.close()
+    
+    def object_stats(self, top: int = 20, min_size: int = 0) -> Dict:
+        """Totals per object type and the `top` largest blobs, over every object in the repository
+        
+        Unreachable and not-yet-pruned objects are included, since they take
+        space too. Blobs are ranked by their uncompressed size.
+        """
+        types = {kind: {"count": 0, "size": 0, "disk_size": 0} for kind in OBJECT_TYPES}
+        largest = []
+        cmd = ['git', 'cat-file', '--batch-all-objects', '--unordered', f'--batch-check={ANALYZE_CHECK_FORMAT}']
+        with self._pipe(cmd) as lines:
+            for line in lines:
+                kind, oid, size, disk_size = line.split()
+                size, disk_size = int(size), int(disk_size)
+                totals = types.setdefault(kind.decode('ascii'), {"count": 0, "size": 0, "disk_size": 0})
+                totals["count"] += 1
+                totals["size"] += size
+                totals["disk_size"] += disk_size
+                if kind == b'blob' and size >= min_size and top > 0:
+                    if len(largest) < top:
+                        heapq.heappush(largest, (size, oid, disk_size))
+                    elif size > largest[0][0]:
+                        heapq.heapreplace(largest, (size, oid, disk_size))
+        total = {field: sum(totals[field] for totals in types.values()) for field in ("count", "size", "disk_size")}
+        return {"types": types, "total": total,
+                "largest": [{"oid": oid.decode('ascii'), "size": size, "disk_size": disk_size}
+                            for size, oid, disk_size in sorted(largest, reverse=True)]}
+    
+    def directory_sizes(self, depth: int = 1, wanted: Tuple[str, ...] = ()) -> Tuple[Dict[str, Dict], Dict[str, str]]:
+        """Total size of every blob version reachable from any ref, per directory
+        
+        Returns the per-directory totals and the path of each `wanted` blob.
+        Comparing a directory's "size" with its "head_size" (see head_sizes)
+        shows how much of it is history.
+        """
+        directories: Dict[str, Dict] = {}
+        wanted = {oid.encode('ascii') for oid in wanted}
+        paths: Dict[str, str] = {}
+        objects = start_command(['git', 'rev-list', '--objects', '--all'], cwd=self.repo_path,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            with self._pipe(['git', 'cat-file', f'--batch-check={ANALYZE_CHECK_FORMAT} %(rest)'],
+                            stdin=objects.stdout) as lines:
+                # Only cat-file reads rev-list's output now
+                objects.stdout.close()
+                for line in lines:
+                    fields = line.split(b' ', 4)
+                    if fields[0] != b'blob' or len(fields) < 5:
+                        continue
+                    path = _decode(fields[4])
+                    totals = directories.setdefault(directory_key(path, depth),
+                                                    {"objects": 0, "size": 0, "disk_size": 0})
+                    totals["objects"] += 1
+                    totals["size"] += int(fields[2])
+                    totals["disk_size"] += int(fields[3])
+                    if fields[1] in wanted:
+                        paths[fields[1].decode('ascii')] = path
+                        wanted.discard(fields[1])
+            if objects.wait() != 0:
+                raise RuntimeError("git rev-list --objects failed")
+        finally:
+            if objects.poll() is None:
+                objects.kill()
+                objects.wait()
+        return directories, paths
+    
+    def head_sizes(self, depth: int = 1) -> Dict[str, int]:
+        """Size of the files in HEAD per directory; empty for a repository without commits"""
+        sizes: Dict[str, int] = {}
+        process = start_command(['git', 'ls-tree', '-r', '-l', '-z', 'HEAD'], cwd=self.repo_path,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            chunks = iter(lambda: process.stdout.read1(1 << 20), b'')
+            for (record,) in iter_nul_fields(chunks, 1):
+                meta, _, path = record.partition('\t')
+                size = meta.split()[-1]
+                if size.isdigit():
+                    key = directory_key(path, depth)
+                    sizes[key] = sizes.get(key, 0) + int(size)
+            process.wait()
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+        return sizes
+    
+    def introducing_commits(self, oids: List[str]) -> Dict[str, Dict]:
+        """The oldest commit that added each blob, found in one streamed walk over all refs
+        
+        `git log` lists newer commits first, so the last match for a blob
+        wins. Only the wanted blob ids and one commit per blob are held.
+        """
+        wanted = {oid.encode('ascii') for oid in oids}
+        found: Dict[str, Dict] = {}
+        if not wanted:
+            return found
+        cmd = ['git', 'log', '--all', '--raw', '--no-abbrev', '--no-renames',
+               '--format=%x01%H%x00%ai%x00%an']
+        commit = None
+        with self._pipe(cmd) as lines:
+            for line in lines:
+                if line.startswith(b'\x01'):
+                    commit = line[1:]
+                elif line.startswith(b':') and commit is not None:
+                    new = line.split(b'\t', 1)[0].split()[3]
+                    if new in wanted:
+                        hash_, date, author = _decode(commit).split('\0')
+                        found[new.decode('ascii')] = {"commit": hash_, "date": date, "author": author}
+        return found
+    
+    def pack_stats(self) -> Dict:
+        """`git count-objects -v` in bytes, plus every pack file with its size"""
+        result = run_command(['git', 'count-objects', '-v'], cwd=self.repo_path, capture_output=True)
+        if result.returncode != 0:
+            raise RuntimeError(_decode(result.stderr).strip() or "git count-objects failed")
+        counts = {}
+        for line in _decode(result.stdout).splitlines():
+            key, _, value = line.partition(':')
+            if value.strip().isdigit():
+                counts[key.strip()] = int(value)
+        stats = {
+            "loose_objects": counts.get("count", 0),
+            "loose_size": counts.get("size", 0) * 1024,
+            "packed_objects": counts.get("in-pack", 0),
+            "packs": counts.get("packs", 0),
+            "pack_size": counts.get("size-pack", 0) * 1024,
+            "prune_packable": counts.get("prune-packable", 0),
+            "garbage": counts.get("garbage", 0),
+            "garbage_size": counts.get("size-garbage", 0) * 1024,
+            "pack_files": []
+        }
+        objects_dir = os.path.join(common_git_dir(self.git_dir), 'objects')
+        try:
+            with os.scandir(os.path.join(objects_dir, 'pack')) as entries:
+                names = {entry.name: entry for entry in entries}
+        except OSError:
+            names = {}
+        for name, entry in sorted(names.items()):
+            if name.endswith('.pack'):
+                base = name[:-len('.pack')]
+                stats["pack_files"].append({"name": name, "size": entry.stat().st_size,
+                                            "bitmap": base + '.bitmap' in names, "keep": base + '.keep' in names})
+        stats["alternates"] = os.path.isfile(os.path.join(objects_dir, 'info', 'alternates'))
+        return stats
+    
+    def analyze(self, top: int = 20, depth: int = 1, min_size: int = 0, commits: bool = True) -> Dict:
+        """Run every pass and combine them into one report
+        
+        "largest" lists the biggest blobs with the path they appear under and,
+        unless `commits` is False, the commit that introduced them (the one
+        pass that walks every commit's diff, and usually the slowest).
+        "directories" is sorted by on-disk size, largest first.
+        """
+        start = time.perf_counter()
+        report = self.object_stats(top, min_size)
+        wanted = [blob["oid"] for blob in report["largest"]]
+        directories, paths = self.directory_sizes(depth, wanted)
+        head = self.head_sizes(depth)
+        introduced = self.introducing_commits([oid for oid in wanted if oid in paths]) if commits else {}
+        for blob in report["largest"]:
+            blob["path"] = paths.get(blob["oid"])
+            blob.update(introduced.get(blob["oid"], {"commit": None, "date": None, "author": None}))
+        for key in head.keys() - directories.keys():
+            directories[key] = {"objects": 0, "size": 0, "disk_size": 0}
+        report["directories"] = sorted(
+            ({"path": key, **totals, "head_size": head.get(key, 0)} for key, totals in directories.items()),
+            key=lambda entry: (-entry["disk_size"], entry["path"]))
+        report["packs"] = self.pack_stats()
+        report["elapsed"] = round(time.perf_counter() - start, 3)
+        return report
+
+GITHUB_API_URL = 'https://api.github.com'
+GITHUB_REPO_FIELDS = ("full_name", "private", "default_branch", "description", "html_url", "clone_url",
+                      "ssh_url", "size", "stargazers_count", "forks_count", "open_issues_count", "archived",
+                      "pushed_at", "updated_at")
+
+class GithubAPIError(RuntimeError):
+    """An error status from the GitHub API, with GitHub's message"""
+    
+    def __init__(self, status: int, message: str):
+        super().__init__(f"{message} (HTTP {status})")
+        self.status = status
+        self.message = message
+
+class ConnectionPool:
+    """Keep-alive HTTP(S) connections to one host, at most `max_connections` in use at once
+    
+    Idle connections are reused, so only the first requests pay for the TCP
+    and TLS handshakes. A request that fails on a reused connection (the
+    server closed it while idle) is retried once on a fresh one.
+    """
+    
+    def __init__(self, base_url: str, max_connections: int = 4, timeout: float = 30.0):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.scheme = parsed.scheme
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.timeout = timeout
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(1, max_connections))
+        self.opened = 0
+    
+    def _connect(self) -> http.client.HTTPConnection:
+        with self._lock:
+            self.opened += 1
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+    
+    def request(self, method: str, path: str, body: Optional[bytes],
+                headers: Dict[str, str]) -> Tuple[int, http.client.HTTPMessage, bytes]:
+        """Send a request and read the whole response, returning (status, headers, body)"""
+        with self._slots:
+            for attempt in range(2):
+                with self._lock:
+                    connection = self._idle.pop() if self._idle else None
+                reused = connection is not None
+                connection = connection or self._connect()
+                try:
+                    connection.request(method, path, body=body, headers=headers)
+                    response = connection.getresponse()
+                    data = response.read()
+                except (OSError, http.client.HTTPException) as e:
+                    connection.close()
+                    if reused and not attempt:
+                        continue
+                    raise ConnectionError(f"{method} {path} failed: {e}") from e
+                if response.will_close:
+                    connection.close()
+                else:
+                    with self._lock:
+                        self._idle.append(connection)
+                return response.status, response.headers, data
+        raise ConnectionError(f"{method} {path} failed")
+    
+    def close(self) -> None:
+        with self._lock:
+            while self._idle:
+                self._idle.pop().close()
+
+class ResponseCache:
+    """GET responses with their ETag, one JSON file per URL under `path`
+    
+    `namespace` (derived from the token) keeps responses seen by one
+    account from being served to another.
+    """
+    
+    def __init__(self, path: str, namespace: str = ''):
+        self.path = path
+        self.namespace = namespace
+    
+    def _file(self, url: str) -> str:
+        return os.path.join(self.path, hashlib.sha256((self.namespace + '\0' + url).encode('utf-8')).hexdigest() + '.json')
+    
+    def get(self, url: str) -> Optional[Dict]:
+        try:
+            with open(self._file(url), encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get("url") == url and entry.get("etag") else None
+    
+    def put(self, url: str, etag: str, body: str) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"url": url, "etag": etag, "body": body}, f)
+            os.replace(tmp, self._file(url))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    
+    def delete(self, url: str) -> None:
+        with contextlib.suppress(OSError):
+            os.unlink(self._file(url))
+
+class RateLimiter:
+    """Pace requests by GitHub's rate-limit headers
+    
+    Once `remaining` drops to `reserve`, requests wait for the window to
+    reset; Retry-After and secondary-limit answers pause every request.
+    Writes are spaced `write_interval` seconds apart, as GitHub asks for
+    requests that create content. Waits longer than `max_wait` raise.
+    """
+    
+    def __init__(self, reserve: int = 0, max_wait: float = 900.0, write_interval: float = 1.0):
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.write_interval = write_interval
+        self.limit = None
+        self.remaining = None
+        self.reset = 0.0
+        self.waited = 0.0
+        self._paused_until = 0.0
+        self._last_write = 0.0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+    
+    def acquire(self, write: bool = False) -> None:
+        """Block until a request may be sent"""
+        with self._lock:
+            now = time.time()
+            delay = max(0.0, self._paused_until - now)
+            if self.remaining is not None and self.remaining <= self.reserve and self.reset > now:
+                delay = max(delay, self.reset - now + 1)
+            if self.remaining is not None:
+                # Count this request until the response brings the real figure
+                self.remaining -= 1
+        if delay > self.max_wait:
+            raise GithubAPIError(429, f"Rate limit exhausted for {delay:.0f}s more")
+        if delay:
+            self.waited += delay
+            time.sleep(delay)
+        if write:
+            with self._write_lock:
+                delay = self._last_write + self.write_interval - time.monotonic()
+                if delay > 0:
+                    self.waited += delay
+                    time.sleep(delay)
+                self._last_write = time.monotonic()
+    
+    def update(self, status: int, headers: http.client.HTTPMessage, body: bytes) -> bool:
+        """Record a response's rate-limit headers; True if it was throttled and should be retried"""
+        with self._lock:
+            if headers.get('X-RateLimit-Remaining', '').isdigit():
+                self.limit = int(headers.get('X-RateLimit-Limit') or 0) or self.limit
+                self.remaining = int(headers['X-RateLimit-Remaining'])
+                self.reset = float(headers.get('X-RateLimit-Reset') or 0)
+            if status not in (403, 429):
+                return False
+            retry_after = headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                self._paused_until = time.time() + int(retry_after)
+            elif self.remaining == 0:
+                self._paused_until = self.reset + 1
+            elif b'secondary rate limit' in body.lower():
+                # GitHub asks for at least a minute's pause when no Retry-After is given
+                self._paused_until = time.time() + 60
+            else:
+                return False
+            return True
+    
+    def snapshot(self) -> Dict:
+        return {"limit": self.limit, "remaining": self.remaining, "reset": int(self.reset) or None,
+                "waited": round(self.waited, 3)}
+
+@instrumented
+class GithubClient:
+    """GitHub REST client over pooled keep-alive connections, with ETag caching and rate-limit pacing
+    
+    The token comes from GITHUB_TOKEN, GH_TOKEN or `gh auth token`, and the
+    API root from GITHUB_API_URL (an http:// stand-in server works too).
+    Without a token `available` is False and callers fall back to `gh`.
+    Use `GithubClient.shared()` to reuse one pool per process.
+    """
+    
+    _shared = None
+    _shared_lock = threading.Lock()
+    
+    def __init__(self, token: str = None, base_url: str = None, cache_path: str = None,
+                 max_connections: int = 4, timeout: float = 30.0, reserve: int = 50, retries: int = 2):
+        self.token = token if token is not None else self.discover_token()
+        self.base_url = (base_url or os.environ.get('GITHUB_API_URL') or GITHUB_API_URL).rstrip('/')
+        self.prefix = urllib.parse.urlsplit(self.base_url).path
+        self.max_connections = max(1, max_connections)
+        self.pool = ConnectionPool(self.base_url, self.max_connections, timeout)
+        namespace = hashlib.sha256((self.token or '').encode('utf-8')).hexdigest()
+        self.cache = ResponseCache(cache_path or os.path.join(os.path.dirname(default_registry_path()), 'http'),
+                                   namespace)
+        self.limiter = RateLimiter(reserve=reserve)
+        self.retries = retries
+        self.stats = {"requests": 0, "not_modified": 0}
+        self._stats_lock = threading.Lock()
+        self._login = None
+    
+    @classmethod
+    def shared(cls) -> 'GithubClient':
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+    
+    @staticmethod
+    def discover_token() -> Optional[str]:
+        """GITHUB_TOKEN, GH_TOKEN, or the token `gh` is logged in with"""
+        token = os.environ.get('GITHUB_TOKEN') or os.environ.get('GH_TOKEN')
+        if token or not shutil.which('gh'):
+            return token
+        try:
+            result = run_command(['gh', 'auth', 'token'], capture_output=True, text=True, timeout=10)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        if result.returncode != 0:
+            return None
+        return result.stdout.strip() or None
+    
+    @property
+    def available(self) -> bool:
+        return bool(self.token)
+    
+    def request(self, method: str, path: str, body: Dict = None, use_cache: bool = True):
+        """Send one API request and return the decoded JSON body
+        
+        GET responses carrying an ETag are cached on disk and revalidated
+        with If-None-Match; GitHub answers an unchanged resource with 304,
+        which doesn't count against the rate limit. Throttled requests are
+        retried after the wait GitHub asks for. Raises GithubAPIError for
+        error statuses and ConnectionError when the API can't be reached.
+        """
+        if not self.token:
+            raise GithubAPIError(401, "No GitHub token (set GITHUB_TOKEN or run `gh auth login`)")
+        url = self.prefix + path
+        headers = {"Accept": "application/vnd.github+json", "Authorization": f"Bearer {self.token}",
+                   "User-Agent": "github-manager", "X-GitHub-Api-Version": "2022-11-28"}
+        cached = self.cache.get(self.base_url + path) if method == 'GET' and use_cache else None
+        if cached:
+            headers["If-None-Match"] = cached["etag"]
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode('utf-8')
+            headers["Content-Type"] = "application/json"
+        
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire(write=method != 'GET')
+            with self._stats_lock:
+                self.stats["requests"] += 1
+            status, response_headers, data = self.pool.request(method, url, payload, headers)
+            if not self.limiter.update(status, response_headers, data) or attempt == self.retries:
+                break
+        if status == 304 and cached:
+            with self._stats_lock:
+                self.stats["not_modified"] += 1
+            return json.loads(cached["body"])
+        try:
+            parsed = json.loads(data) if data else None
+        except ValueError:
+            parsed = None
+        if status >= 400:
+            message = parsed.get("message") if isinstance(parsed, dict) else None
+            raise GithubAPIError(status, message or _decode(data[:200]).strip() or "Request failed")
+        etag = response_headers.get('ETag')
+        if method == 'GET' and use_cache and etag:
+            self.cache.put(self.base_url + path, etag, _decode(data))
+        return parsed
+    
+    def login(self) -> str:
+        """The authenticated user's login (revalidated, so usually a free 304)"""
+        if self._login is None:
+            self._login = self.request('GET', '/user')["login"]
+        return self._login
+    
+    def full_name(self, name: str) -> str:
+        """`owner/name`, with the authenticated user as the default owner"""
+        return name if '/' in name else f"{self.login()}/{name}"
+    
+    def get_repo(self, name: str) -> Dict:
+        """Repository metadata from GET /repos/{owner}/{repo}"""
+        owner, repo = self.full_name(name).split('/', 1)
+        return self.request('GET', f"/repos/{urllib.parse.quote(owner)}/{urllib.parse.quote(repo)}")
+    
+    def create_repo(self, name: str, private: bool = False, description: str = None) -> Dict:
+        """Create `name` for the authenticated user, or `org/name` in an organization"""
+        owner, _, repo = name.rpartition('/')
+        body = {"name": repo, "private": private}
+        if description:
+            body["description"] = description
+        if owner and owner != self.login():
+            return self.request('POST', f"/orgs/{urllib.parse.quote(owner)}/repos", body)
+        return self.request('POST', '/user/repos', body)
+    
+    def iter_repos(self, names: List[str]) -> Iterator[Dict]:
+        """Fetch metadata for many repositories over the pool, yielding {"repo", "result"} as they arrive"""
+        def fetch(name: str) -> Dict:
+            try:
+                return {"repo": name, "result": self.get_repo(name)}
+            except (GithubAPIError, ConnectionError) as e:
+                return {"repo": name, "result": {"error": str(e), "status": getattr(e, 'status', None)}}
+        
+        with ThreadPoolExecutor(max_workers=self.max_connections) as executor:
+            for future in as_completed([executor.submit(fetch, name) for name in dict.fromkeys(names)]):
+                yield future.result()
+    
+    def create_repos(self, names: List[str], private: bool = False) -> Iterator[Dict]:
+        """Create every repository that doesn't exist yet, yielding {"repo", "result"} per name
+        
+        Existence is checked first with (cached, conditional) metadata
+        requests, so re-running a provisioning list only spends API calls
+        on what is missing. Creations run one at a time, paced by the
+        rate limiter. Results carry "action" ("created" or "exists").
+        """
+        missing = []
+        for entry in self.iter_repos(names):
+            result = entry["result"]
+            if 'error' not in result:
+                yield {"repo": entry["repo"], "result": {"action": "exists", "full_name": result["full_name"],
+                                                         "html_url": result["html_url"]}}
+            elif result["status"] == 404:
+                missing.append(entry["repo"])
+            else:
+                yield entry
+        for name in missing:
+            try:
+                repo = self.create_repo(name, private)
+                yield {"repo": name, "result": {"action": "created", "full_name": repo["full_name"],
+                                                "html_url": repo["html_url"]}}
+            except (GithubAPIError, ConnectionError) as e:
+                yield {"repo": name, "result": {"error": str(e)}}
+    
+    def rate_limit(self) -> Dict:
+        """Rate-limit state from the last response, plus request and 304 counts"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {**self.limiter.snapshot(), **stats, "connections": self.pool.opened}
+    
+    def close(self) -> None:
+        self.pool.close()
+
+def _to_timestamp(value) -> int:
+    """Convert an epoch, ISO date or ISO datetime into a Unix timestamp"""
+    if isinstance(value, (int, float)) or str(value).isdigit():
+        return int(value)
+    parsed = datetime.datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return int(parsed.timestamp())
+
+def parse_numstat(data: bytes) -> Dict:
+    """Parse `git diff --numstat -z` output into per-file stats and totals"""
+    records = data.split(b'\0')
+    files = []
+    i = 0
+    while i < len(records):
+        record = _decode(records[i])
+        i += 1
+        if not record:
+            continue
+        added, deleted, path = record.split('\t', 2)
+        entry = {"path": path, "added": 0, "deleted": 0, "binary": added == '-'}
+        if not path:
+            # Renames put the old and new paths in the next two records
+            entry["old_path"] = _decode(records[i])
+            entry["path"] = _decode(records[i + 1])
+            i += 2
+        if not entry["binary"]:
+            entry["added"], entry["deleted"] = int(added), int(deleted)
+        files.append(entry)
+    return {
+        "files": files,
+        "files_changed": len(files),
+        "insertions": sum(entry["added"] for entry in files),
+        "deletions": sum(entry["deleted"] for entry in files),
+        "binary_files": sum(entry["binary"] for entry in files)
+    }
+
+def _diff_path(value: str) -> Optional[str]:
+    """Path from a `---`/`+++` line: strip the a/ or b/ prefix and undo C quoting"""
+    value = value.rstrip('\t')
+    if value == '/dev/null':
+        return None
+    if value.startswith('"') and value.endswith('"'):
+        raw = codecs.escape_decode(value[1:-1].encode('utf-8'))[0]
+        value = raw.decode('utf-8', errors='replace')
+    return value[2:] if value[:2] in ('a/', 'b/') else value
+
+def iter_diff_hunks(lines: Iterator[str]) -> Iterator[Dict]:
+    """Group unified diff lines into per-hunk records (see GithubManager.iter_diff_hunks)"""
+    file_info = None
+    hunk = None
+    emitted = False
+    
+    def file_record() -> Dict:
+        return {"path": file_info["path"] or file_info["old_path"], "old_path": file_info["old_path"],
+                "header": None, "lines": [], "binary": file_info["binary"]}
+    
+    for line in lines:
+        if line.startswith('diff --git '):
+            if hunk is not None:
+                yield hunk
+            elif file_info is not None and not emitted:
+                yield file_record()
+            hunk = None
+            emitted = False
+            match = re.match(r'diff --git a/(.*) b/(.*)$', line)
+            guess = match.group(2) if match else None
+            file_info = {"path": guess, "old_path": match.group(1) if match else None, "binary": False}
+            continue
+        if file_info is None:
+            continue
+        if hunk is not None and line[:1] in (' ', '+', '-', '\\'):
+            hunk["lines"].append(line)
+            continue
+        if line.startswith('@@'):
+            if hunk is not None:
+                yield hunk
+            hunk = file_record()
+            hunk["header"] = line
+            emitted = True
+        elif line.startswith('--- '):
+            file_info["old_path"] = _diff_path(line[4:])
+        elif line.startswith('+++ '):
+            file_info["path"] = _diff_path(line[4:])
+        elif line.startswith('new file mode'):
+            file_info["old_path"] = None
+        elif line.startswith('deleted file mode'):
+            file_info["path"] = None
+        elif line.startswith('rename from '):
+            file_info["old_path"] = line[len('rename from '):]
+        elif line.startswith('rename to '):
+            file_info["path"] = line[len('rename to '):]
+        elif line.startswith('Binary files ') or line == 'GIT binary patch':
+            file_info["binary"] = True
+    
+    if hunk is not None:
+        yield hunk
+    elif file_info is not None and not emitted:
+        yield file_record()
+
+def clone_args(repo_url: str, target_dir: str = None, reference: str = None, filter: str = None,
+               depth: int = None, single_branch: bool = False) -> List[str]:
+    """Build a `git clone` command line
+    
+    `reference` borrows objects from a local repository through alternates
+    (skipped if it doesn't exist), so clones that share history store it once;
+    the reference must not be deleted or pruned while clones depend on it.
+    `filter` makes a partial clone (e.g. "blob:none" fetches blobs on demand)
+    and `depth` a shallow one.
+    """
+    cmd = ['git', 'clone']
+    if reference:
+        cmd += ['--reference-if-able', reference]
+    if filter:
+        cmd.append(f'--filter={filter}')
+    if depth:
+        cmd += ['--depth', str(depth)]
+    if single_branch:
+        cmd.append('--single-branch')
+    return cmd + ['--', repo_url] + ([target_dir] if target_dir else [])
+
+def fetch_args(remote: str = 'origin', prune: bool = True, depth: int = None) -> List[str]:
+    """Build a `git fetch` command line"""
+    cmd = ['git', 'fetch']
+    if prune:
+        cmd.append('--prune')
+    if depth:
+        cmd += ['--depth', str(depth)]
+    return cmd + [remote]
+
+def default_clone_dir(repo_url: str) -> str:
+    """The directory name `git clone` would pick for a URL"""
+    name = repo_url.rstrip('/').rsplit('/', 1)[-1].rsplit(':', 1)[-1]
+    return name[:-4] if name.endswith('.git') else name
+
+def history_args(limit: Optional[int] = None, skip: int = 0, rev_range: str = None, paths: List[str] = None,
+                 since: str = None, until: str = None, author: str = None) -> List[str]:
+    """Build `git log` arguments for a NUL-delimited, optionally filtered history walk"""
+    args = ['log', '-z', f'--format={COMMIT_FORMAT}']
+    if limit is not None:
+        args.append(f'--max-count={limit}')
+    if skip:
+        args.append(f'--skip={skip}')
+    if since:
+        args.append(f'--since={since}')
+    if until:
+        args.append(f'--until={until}')
+    if author:
+        args.append(f'--author={author}')
+    if rev_range:
+        args.extend(rev_range.split())
+    args.append('--')
+    args.extend(paths or [])
+    return args
+
+# One NUL-separated record per ref; the subject is last since git folds it onto one line
+BRANCH_FORMAT = ('%(refname)%00%(objectname)%00%(upstream)%00%(upstream:track,nobracket)%00'
+                 '%(authordate:iso)%00%(authorname)%00%(HEAD)%00%(subject)')
+
+def parse_upstream_track(track: str) -> Tuple[Optional[int], Optional[int]]:
+    """(ahead, behind) from %(upstream:track,nobracket) ("ahead 2, behind 1", or "" when in sync); None for gone"""
+    if track == 'gone':
+        return None, None
+    counts = dict(part.split() for part in track.split(', ') if part)
+    return int(counts.get('ahead', 0)), int(counts.get('behind', 0))
+
+def parse_branch_records(data: bytes) -> List[Dict]:
+    """Parse `git for-each-ref --format=BRANCH_FORMAT` output"""
+    branches = []
+    for line in _decode(data).split('\n'):
+        fields = line.split('\0')
+        if len(fields) != 8:
+            continue
+        ref, tip, upstream, track, date, author, head, subject = fields
+        if ref.startswith('refs/remotes/') and ref.endswith('/HEAD'):
+            continue
+        remote = ref.startswith('refs/remotes/')
+        branches.append({
+            "name": ref[len('refs/remotes/'):] if remote else ref[len('refs/heads/'):],
+            "ref": ref,
+            "remote": remote,
+            "current": head == '*',
+            "tip": tip,
+            "upstream": upstream or None,
+            "ahead": parse_upstream_track(track)[0] if upstream else 0,
+            "behind": parse_upstream_track(track)[1] if upstream else 0,
+            "date": date,
+            "author": author,
+            "message": subject
+        })
+    return branches
+
+class AheadBehindCache:
+    """LRU of ahead/behind counts keyed by (tip, other tip)
+    
+    Commit ids are immutable, so entries never go stale; the bound only
+    limits memory.
+    """
+    
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[int, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, pair: Tuple[str, str]) -> Optional[Tuple[int, int]]:
+        with self._lock:
+            value = self._entries.get(pair)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(pair)
+            return value
+    
+    def put(self, pair: Tuple[str, str], value: Tuple[int, int]) -> None:
+        with self._lock:
+            self._entries[pair] = value
+            self._entries.move_to_end(pair)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+AHEAD_BEHIND_CACHE = AheadBehindCache()
+
+REF_ACTIONS = ("create", "update", "delete", "verify")
+
+def qualify_ref(name: str) -> str:
+    """Full ref name: `refs/...` and HEAD as given, `tags/x` as a tag, anything else as a branch"""
+    if name == 'HEAD' or name.startswith('refs/'):
+        return name
+    if name.startswith('tags/'):
+        return 'refs/' + name
+    return 'refs/heads/' + name
+
+def checked_out_branches(git_dir: str) -> List[str]:
+    """Branch refs checked out in the main working tree and in every linked worktree"""
+    heads = [os.path.join(git_dir, 'HEAD')]
+    try:
+        heads += [entry.path + '/HEAD' for entry in os.scandir(os.path.join(git_dir, 'worktrees'))]
+    except OSError:
+        pass
+    branches = []
+    for head in heads:
+        branch = _read_head_branch(os.path.dirname(head))
+        if branch:
+            branches.append('refs/heads/' + branch)
+    return branches
+
+def parse_ref_batch(lines) -> List[Dict]:
+    """Parse `create <ref> <new>`, `update <ref> <new> [<old>]`, `delete <ref> [<old>]`
+    and `verify <ref> [<old>]` lines (blank lines and `#` comments are skipped)"""
+    operations = []
+    for number, line in enumerate(lines, 1):
+        fields = line.split('#', 1)[0].split()
+        if not fields:
+            continue
+        action = fields[0]
+        arity = {"create": (3, 3), "update": (3, 4), "delete": (2, 3), "verify": (2, 3)}.get(action)
+        if arity is None or not arity[0] <= len(fields) <= arity[1]:
+            raise ValueError(f"line {number}: expected create/update/delete/verify with a ref and values: {line.strip()}")
+        if action in ("create", "update"):
+            operations.append({"action": action, "ref": fields[1], "new": fields[2],
+                               "old": fields[3] if len(fields) > 3 else None})
+        else:
+            operations.append({"action": action, "ref": fields[1], "old": fields[2] if len(fields) > 2 else None})
+    return operations
+
+class RefTransaction:
+    """Queue ref creates, updates, deletes and checks, then apply them with one `git update-ref --stdin`
+    
+    git applies the whole batch atomically: if any ref can't be locked or any
+    old value doesn't match, nothing changes. An `old` of None skips the check
+    for update and delete; for verify it means the ref must not exist. Values
+    may be any revision git can resolve. Refs are only rewritten, so the
+    working tree is never touched; changing a checked-out branch is refused
+    unless allow_checked_out is set, because its index would no longer match.
+    """
+    
+    def __init__(self, repo_path: str, message: str = None, allow_checked_out: bool = False):
+        self.repo_path = repo_path
+        self.message = message
+        self.allow_checked_out = allow_checked_out
+        self.operations = []
+    
+    def __len__(self) -> int:
+        return len(self.operations)
+    
+    def add(self, action: str, ref: str, new: str = None, old: str = None) -> 'RefTransaction':
+        if action not in REF_ACTIONS:
+            raise ValueError(f"Unknown ref action '{action}'")
+        if action in ("create", "update") and not new:
+            raise ValueError(f"{action} {ref} needs a new value")
+        self.operations.append((action, qualify_ref(ref), new, old))
+        return self
+    
+    def create(self, ref: str, new: str) -> 'RefTransaction':
+        return self.add("create", ref, new)
+    
+    def update(self, ref: str, new: str, old: str = None) -> 'RefTransaction':
+        return self.add("update", ref, new, old)
+    
+    def delete(self, ref: str, old: str = None) -> 'RefTransaction':
+        return self.add("delete", ref, old=old)
+    
+    def verify(self, ref: str, old: str = None) -> 'RefTransaction':
+        return self.add("verify", ref, old=old)
+    
+    def stdin(self) -> bytes:
+        """The batch in update-ref's NUL-terminated `--stdin -z` format"""
+        lines = []
+        for action, ref, new, old in self.operations:
+            if action == "create":
+                fields = [new]
+            elif action == "update":
+                fields = [new, old or '']
+            else:
+                fields = [old or '']
+            lines.append(f"{action} {ref}\0" + ''.join(f"{field}\0" for field in fields))
+        return ''.join(lines).encode('utf-8')
+    
+    def command(self) -> List[str]:
+        return ['git', 'update-ref', '--stdin', '-z'] + (['-m', self.message] if self.message else [])
+    
+    def blocked(self) -> Optional[str]:
+        """Why the batch must not run (it changes a checked-out branch), or None"""
+        if self.allow_checked_out:
+            return None
+        git_dir = resolve_git_dir(self.repo_path) or os.path.join(self.repo_path, '.git')
+        checked_out = set(checked_out_branches(common_git_dir(git_dir)))
+        busy = sorted({ref for action, ref, _, _ in self.operations
+                       if action in ("update", "delete") and ref in checked_out})
+        return f"Refusing to change checked-out branch(es): {', '.join(busy)}" if busy else None
+    
+    def result(self, completed: subprocess.CompletedProcess) -> Dict:
+        """Turn the update-ref outcome into {"applied", "refs"} or {"error"}"""
+        if completed.returncode != 0:
+            return {"error": _decode(completed.stderr).strip() or f"git update-ref exited with {completed.returncode}"}
+        refs = [ref for action, ref, _, _ in self.operations if action != "verify"]
+        self.operations = []
+        return {"applied": len(refs), "refs": refs}
+    
+    def commit(self) -> Dict:
+        """Apply every queued operation or none of them"""
+        if not self.operations:
+            return {"applied": 0, "refs": []}
+        error = self.blocked()
+        if error:
+            return {"error": error}
+        return self.result(run_command(self.command(), cwd=self.repo_path, input=self.stdin(), capture_output=True))
+
+def _rewrite_url(url: str, rules: Dict[str, str]) -> Optional[str]:
+    """Apply the longest matching `insteadOf` prefix, or None if no rule matches"""
+    matches = [prefix for prefix in rules if url.startswith(prefix)]
+    if not matches:
+        return None
+    prefix = max(matches, key=len)
+    return rules[prefix] + url[len(prefix):]
+
+def config_remotes(config: Dict[Tuple[str, Optional[str]], Dict[str, List[str]]]) -> List[str]:
+    """List remotes from a parsed git config in `git remote -v` form
+    
+    URLs are rewritten by `url.<base>.insteadOf`, and push URLs without a
+    `pushurl` by `url.<base>.pushInsteadOf` first, as git does.
+    """
+    instead_of: Dict[str, str] = {}
+    push_instead_of: Dict[str, str] = {}
+    for (section, base), values in config.items():
+        if section == 'url' and base is not None:
+            instead_of.update((prefix, base) for prefix in values.get('insteadof', []))
+            push_instead_of.update((prefix, base) for prefix in values.get('pushinsteadof', []))
+    
+    remotes = []
+    for (section, name), values in config.items():
+        if section != 'remote' or name is None or 'url' not in values:
+            continue
+        url = values['url'][-1]
+        fetch_url = _rewrite_url(url, instead_of) or url
+        if values.get('pushurl'):
+            push_urls = [_rewrite_url(push_url, instead_of) or push_url for push_url in values['pushurl']]
+        else:
+            push_urls = [_rewrite_url(url, push_instead_of) or fetch_url]
+        remotes.append(f"{name}\t{fetch_url} (fetch)")
+        remotes.extend(f"{name}\t{push_url} (push)" for push_url in push_urls)
+    return remotes
+
+def config_file_paths(common_dir: str) -> List[str]:
+    """The system, global and repository config files git reads, in order"""
+    paths = []
+    if not os.environ.get('GIT_CONFIG_NOSYSTEM'):
+        paths.append(os.environ.get('GIT_CONFIG_SYSTEM') or '/etc/gitconfig')
+    if os.environ.get('GIT_CONFIG_GLOBAL'):
+        paths.append(os.environ['GIT_CONFIG_GLOBAL'])
+    else:
+        config_home = os.environ.get('XDG_CONFIG_HOME') or os.path.join(os.path.expanduser('~'), '.config')
+        paths += [os.path.join(config_home, 'git', 'config'), os.path.join(os.path.expanduser('~'), '.gitconfig')]
+    paths.append(os.path.join(common_dir, 'config'))
+    return paths
+
+def read_config_remotes(common_dir: str) -> Optional[List[str]]:
+    """Remotes in `git remote -v` form from the config files, or None when git must be asked
+    
+    None means the repository config can't be read, or something this
+    parser doesn't resolve is in play: `include` / `includeIf` sections or
+    config passed through the environment.
+    """
+    if os.environ.get('GIT_CONFIG_PARAMETERS') or os.environ.get('GIT_CONFIG_COUNT'):
+        return None
+    merged: Dict[Tuple[str, Optional[str]], Dict[str, List[str]]] = {}
+    paths = config_file_paths(common_dir)
+    for path in paths:
+        config = read_git_config(path)
+        if config is None:
+            if path == paths[-1]:
+                return None
+            continue
+        if any(section in ('include', 'includeif') for section, _ in config):
+            return None
+        for key, values in config.items():
+            section = merged.setdefault(key, {})
+            for name, entries in values.items():
+                section.setdefault(name, []).extend(entries)
+    return config_remotes(merged)
+
+def changed_paths(status: Dict) -> List[str]:
+    """Paths a status snapshot reports with unstaged changes, conflicts or as untracked"""
+    paths = []
+    for entry in status.get('files', []):
+        if entry["index"] == '!':
+            continue
+        if entry["worktree"] != '.' or entry.get("conflict"):
+            paths.append(entry["path"])
+    return paths
+
+@functools.lru_cache(maxsize=None)
+def git_supports_builtin_fsmonitor() -> bool:
+    """Whether the installed git was built with the fsmonitor daemon"""
+    try:
+        result = run_command(['git', 'version', '--build-options'], capture_output=True, text=True)
+    except OSError:
+        return False
+    return 'fsmonitor--daemon' in result.stdout
+
+def resolve_git_dir(path: str) -> Optional[str]:
+    """The git directory for a working tree or bare repository at `path`, or None
+    
+    Handles `.git` directories, `.git` files (linked worktrees, submodules)
+    whose `gitdir:` line may be relative, and bare repositories.
+    """
+    dot_git = os.path.join(path, '.git')
+    if os.path.isdir(dot_git):
+        return dot_git
+    if os.path.isfile(dot_git):
+        try:
+            with open(dot_git, encoding='utf-8') as f:
+                line = f.readline().strip()
+        except OSError:
+            return None
+        if line.startswith('gitdir:'):
+            return os.path.normpath(os.path.join(path, line[len('gitdir:'):].strip()))
+        return None
+    if (os.path.isfile(os.path.join(path, 'HEAD')) and os.path.isdir(os.path.join(path, 'objects'))
+            and os.path.isdir(os.path.join(path, 'refs'))):
+        return path
+    return None
+
+def common_git_dir(git_dir: str) -> str:
+    """Where refs, config and objects live: the main repository's git directory for a linked worktree"""
+    try:
+        with open(os.path.join(git_dir, 'commondir'), encoding='utf-8') as f:
+            return os.path.normpath(os.path.join(git_dir, f.read().strip()))
+    except OSError:
+        return git_dir
+
+def _read_head_branch(git_dir: str) -> str:
+    """Name of the checked-out branch from .git/HEAD, or '' when detached"""
+    try:
+        with open(os.path.join(git_dir, 'HEAD'), encoding='utf-8') as f:
+            head = f.read().strip()
+    except OSError:
+        return ""
+    return head[len('ref: refs/heads/'):] if head.startswith('ref: refs/heads/') else ""
+
+def iter_status_v2(records: Iterator[str], branch: Dict) -> Iterator[Dict]:
+    """Yield file entries from porcelain v2 `-z` records, applying `# branch.*` headers to `branch`"""
+    records = iter(records)
+    for record in records:
+        if not record:
+            continue
+        
+        kind = record[0]
+        if kind == '#':
+            _parse_branch_header(record, branch)
+        elif kind == '1':
+            fields = record.split(' ', 8)
+            yield {"path": fields[8], "index": fields[1][0], "worktree": fields[1][1]}
+        elif kind == '2':
+            # Renames and copies carry the original path in the next NUL record
+            fields = record.split(' ', 9)
+            yield {
+                "path": fields[9],
+                "index": fields[1][0],
+                "worktree": fields[1][1],
+                "orig_path": next(records, ""),
+                "score": fields[8]
+            }
+        elif kind == 'u':
+            fields = record.split(' ', 10)
+            yield {"path": fields[10], "index": fields[1][0], "worktree": fields[1][1], "conflict": True}
+        elif kind == '?':
+            yield {"path": record[2:], "index": '?', "worktree": '?'}
+        elif kind == '!':
+            yield {"path": record[2:], "index": '!', "worktree": '!'}
+
+def status_file_state(entry: Dict) -> str:
+    """One word for a status entry: untracked, ignored, conflicted, renamed, copied, added, deleted,
+    typechange or modified"""
+    x, y = entry["index"], entry["worktree"]
+    if x == '?':
+        return "untracked"
+    if x == '!':
+        return "ignored"
+    if entry.get("conflict"):
+        return "conflicted"
+    if "orig_path" in entry:
+        return "copied" if x == 'C' else "renamed"
+    if x == 'A':
+        return "added"
+    if 'D' in (x, y):
+        return "deleted"
+    if 'T' in (x, y):
+        return "typechange"
+    return "modified"
+
+def status_record(branch: Dict) -> Dict:
+    """NDJSON "status" record built from parsed `# branch.*` headers"""
+    status = _branch_status(branch)
+    return {"type": "status", "branch": status["current_branch"] or None, "detached": status["detached"],
+            "head_oid": status["head_oid"], "upstream": status["upstream"],
+            "ahead": status["ahead"], "behind": status["behind"]}
+
+def status_file_record(entry: Dict) -> Dict:
+    """NDJSON "file" record for one status entry"""
+    x, y = entry["index"], entry["worktree"]
+    tracked = x not in '?!'
+    merged = tracked and not entry.get("conflict")
+    return {"type": "file", "path": entry["path"], "orig_path": entry.get("orig_path"),
+            "state": status_file_state(entry), "index": x, "worktree": y,
+            "staged": merged and x != '.', "unstaged": merged and y != '.'}
+
+def status_counts_record(status: Dict) -> Dict:
+    """NDJSON "status_counts" record from a counts_only get_repo_status result"""
+    return {"type": "status_counts", "branch": status["current_branch"] or None, "detached": status["detached"],
+            "head_oid": status["head_oid"], "upstream": status["upstream"], "ahead": status["ahead"],
+            "behind": status["behind"], **status["counts"]}
+
+def parse_status_v2(data: bytes) -> Dict:
+    """Parse `git status --porcelain=v2 -b -z` output into a status dictionary"""
+    branch = {"oid": None, "head": "", "upstream": None, "ahead": 0, "behind": 0}
+    files = list(iter_status_v2((_decode(record) for record in data.split(b'\0')), branch))
+    
+    modified = []
+    added = []
+    deleted = []
+    renamed = []
+    conflicted = []
+    untracked = []
+    staged = []
+    unstaged = []
+    short_lines = []
+    
+    for entry in files:
+        x, y, path = entry["index"], entry["worktree"], entry["path"]
+        if x == '!':
+            continue
+        if x == '?':
+            untracked.append(path)
+            short_lines.append(f"?? {path}")
+            continue
+        
+        code = f"{x}{y}".replace('.', ' ')
+        short_lines.append(f"{code} {entry['orig_path']} -> {path}" if "orig_path" in entry else f"{code} {path}")
+        if entry.get("conflict"):
+            conflicted.append(path)
+            continue
+        if x != '.':
+            staged.append(path)
+        if y != '.':
+            unstaged.append(path)
+        
+        if "orig_path" in entry:
+            renamed.append({"from": entry["orig_path"], "to": path})
+        elif x == 'A':
+            added.append(path)
+        elif 'D' in (x, y):
+            deleted.append(path)
+        elif x in 'MT' or y in 'MT':
+            modified.append(path)
+    
+    status = _branch_status(branch)
+    head = branch["head"]
+    detached = status["detached"]
+    header = f"## {'HEAD (no branch)' if detached else head}"
+    if branch["upstream"]:
+        header += f"...{branch['upstream']}"
+        tracking = []
+        if branch["ahead"]:
+            tracking.append(f"ahead {branch['ahead']}")
+        if branch["behind"]:
+            tracking.append(f"behind {branch['behind']}")
+        if tracking:
+            header += f" [{', '.join(tracking)}]"
+    
+    status.update({
+        "status": "\n".join([header] + short_lines),
+        "has_changes": bool(short_lines),
+        "modified_files": modified,
+        "added_files": added,
+        "deleted_files": deleted,
+        "renamed_files": renamed,
+        "conflicted_files": conflicted,
+        "untracked_files": untracked,
+        "staged_files": staged,
+        "unstaged_files": unstaged,
+        "files": files
+    })
+    return status
+
+def count_status_v2(data: bytes) -> Dict:
+    """Like parse_status_v2, but only per-category totals; no per-file lists are built"""
+    branch = {"oid": None, "head": "", "upstream": None, "ahead": 0, "behind": 0}
+    counts = dict.fromkeys(("modified", "added", "deleted", "renamed", "conflicted",
+                            "untracked", "staged", "unstaged"), 0)
+    
+    records = data.split(b'\0')
+    skip_next = False
+    for record in records:
+        if skip_next:
+            skip_next = False
+            continue
+        if not record:
+            continue
+        kind = record[:1]
+        if kind == b'#':
+            _parse_branch_header(_decode(record), branch)
+            continue
+        if kind == b'?':
+            counts["untracked"] += 1
+            continue
+        if kind not in (b'1', b'2', b'u'):
+            continue
+        
+        x, y = chr(record[2]), chr(record[3])
+        if kind == b'u':
+            counts["conflicted"] += 1
+            continue
+        counts["staged"] += x != '.'
+        counts["unstaged"] += y != '.'
+        if kind == b'2':
+            skip_next = True
+            counts["renamed"] += 1
+        elif x == 'A':
+            counts["added"] += 1
+        elif 'D' in (x, y):
+            counts["deleted"] += 1
+        elif x in 'MT' or y in 'MT':
+            counts["modified"] += 1
+    
+    status = _branch_status(branch)
+    status.update({
+        "counts": counts,
+        "has_changes": bool(counts["untracked"] or counts["conflicted"] or counts["staged"] or counts["unstaged"])
+    })
+    return status
+
+def _parse_branch_header(record: str, branch: Dict) -> None:
+    """Apply one `# branch.*` porcelain v2 header to a branch dictionary"""
+    key, _, value = record[2:].partition(' ')
+    if key == 'branch.oid':
+        branch["oid"] = None if value == '(initial)' else value
+    elif key == 'branch.head':
+        branch["head"] = value
+    elif key == 'branch.upstream':
+        branch["upstream"] = value
+    elif key == 'branch.ab':
+        ahead, behind = value.split()
+        branch["ahead"] = int(ahead)
+        branch["behind"] = abs(int(behind))
+
+def _branch_status(branch: Dict) -> Dict:
+    detached = branch["head"] == '(detached)'
+    return {
+        "current_branch": "" if detached else branch["head"],
+        "detached": detached,
+        "head_oid": branch["oid"],
+        "upstream": branch["upstream"],
+        "ahead": branch["ahead"],
+        "behind": branch["behind"],
+        "is_ahead": branch["ahead"] > 0,
+        "is_behind": branch["behind"] > 0
+    }
+
+def _unquote_config_value(value: str) -> str:
+    """Strip comments, quotes and escapes from a git config value"""
+    out = []
+    quoted = False
+    i = 0
+    while i < len(value):
+        ch = value[i]
+        if ch == '"':
+            quoted = not quoted
+        elif ch == '\\' and i + 1 < len(value):
+            i += 1
+            out.append({'n': '\n', 't': '\t', 'b': '\b'}.get(value[i], value[i]))
+        elif ch in '#;' and not quoted:
+            break
+        else:
+            out.append(ch)
+        i += 1
+    return ''.join(out).strip()
+
+def read_git_config(path: str) -> Optional[Dict[Tuple[str, Optional[str]], Dict[str, List[str]]]]:
+    """Read a git config file without spawning git
+
+    Returns a mapping of (section, subsection) to multi-valued keys, or None
+    when the file cannot be read.
+    """
+    try:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            physical = f.read().splitlines()
+    except OSError:
+        return None
+    
+    # A value line ending in an unescaped backslash continues on the next line
+    lines = []
+    pending = ''
+    for raw in physical:
+        raw = pending + raw
+        trailing = len(raw) - len(raw.rstrip('\\'))
+        if trailing % 2 and not raw.lstrip().startswith(('#', ';', '[')):
+            pending = raw[:-1]
+            continue
+        pending = ''
+        lines.append(raw)
+    if pending:
+        lines.append(pending)
+    
+    config: Dict[Tuple[str, Optional[str]], Dict[str, List[str]]] = {}
+    current = None
+    for raw in lines:
+        line = raw.strip()
+        if not line or line[0] in '#;':
+            continue
+        if line.startswith('['):
+            match = re.match(r'\[\s*([\w.-]+)(?:\s+"((?:[^"\\]|\\.)*)")?\s*\]', line)
+            if not match:
+                current = None
+                continue
+            section, subsection = match.group(1), match.group(2)
+            if subsection is None and '.' in section:
+                # Legacy [section.subsection] syntax
+                section, subsection = section.split('.', 1)
+            elif subsection is not None:
+                subsection = re.sub(r'\\(.)', r'\1', subsection)
+            current = config.setdefault((section.lower(), subsection), {})
+            continue
+        if current is None:
+            continue
+        key, sep, value = line.partition('=')
+        key = key.strip().lower()
+        current.setdefault(key, []).append(_unquote_config_value(value) if sep else 'true')
+    return config
+
+def default_socket_path() -> str:
+    """Unix socket used by `serve` and by CLI commands looking for a daemon"""
+    env = os.environ.get('GITHUB_MANAGER_SOCKET')
+    if env:
+        return env
+    uid = os.getuid() if hasattr(os, 'getuid') else 0
+    return os.path.join(tempfile.gettempdir(), f'github-manager-{uid}.sock')
+
+class _ThreadLocalOutput(io.TextIOBase):
+    """stdout replacement that lets each daemon worker thread capture its own prints"""
+    
+    def __init__(self, fallback):
+        self.fallback = fallback
+        self.local = threading.local()
+    
+    def write(self, text: str) -> int:
+        buffer = getattr(self.local, 'buffer', None)
+        return (buffer or self.fallback).write(text)
+    
+    def flush(self) -> None:
+        if getattr(self.local, 'buffer', None) is None:
+            self.fallback.flush()
+    
+    @property
+    def buffer(self):
+        return self.fallback.buffer
+
+class GithubManagerDaemon:
+    """Serve GithubManager methods as line-delimited JSON-RPC 2.0 over a Unix socket
+    
+    One warm GithubManager is kept per repository, so the status cache, smoke
+    test cache and commit index stay hot between calls; get_repo_status uses
+    the status cache unless called with use_cache=False. Concurrent identical
+    read-only requests share a single execution.
+    """
+    
+    # Methods that don't modify the repository and may be coalesced
+    READ_METHODS = {
+        'is_git_repo', 'is_dirty', 'get_repo_status', 'get_commit_history', 'search_commits', 'get_file_diff',
+        'get_diff_stats', 'list_branches', 'resolve_refs', 'get_branch_overview', 'check_mergeability',
+        'analyze_repository', 'get_repositories'
+    }
+    # Everything a client may call; no other attribute of the manager is reachable
+    METHODS = READ_METHODS | {
+        'enable_large_repo_mode', 'smoke_test', 'commit_changes', 'push_to_github', 'pull_changes', 'fetch_changes',
+        'create_repository', 'create_repositories', 'create_branch', 'switch_branch', 'merge_branch', 'stash_changes',
+        'stash_pop', 'revert_last_commit', 'reset_to_commit', 'add_remote', 'update_refs', 'commit_index.update',
+        'commit_index.rebuild', 'commit_index.verify', 'commit_index.stats', 'commit_index.query', 'daemon.stats',
+        'daemon.metrics'
+    }
+    
+    def __init__(self, socket_path: str = None):
+        self.socket_path = socket_path or default_socket_path()
+        self._managers: Dict[str, GithubManager] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.coalesced = 0
+    
+    def manager(self, repo_path: str) -> GithubManager:
+        """Warm manager for a repository, created on first use"""
+        key = os.path.realpath(repo_path)
+        with self._lock:
+            if key not in self._managers:
+                self._managers[key] = GithubManager(key)
+            return self._managers[key]
+    
+    def _resolve(self, manager: GithubManager, method: str) -> Callable:
+        owner, _, name = method.rpartition('.')
+        if method not in self.METHODS or owner not in ('', 'commit_index'):
+            raise AttributeError(method)
+        return getattr(manager.commit_index() if owner else manager, name)
+    
+    def _execute(self, method: str, params: Dict) -> Tuple[object, str]:
+        params = dict(params)
+        manager = self.manager(params.pop('repo', None) or os.getcwd())
+        function = self._resolve(manager, method)
+        output = io.StringIO()
+        capture = isinstance(sys.stdout, _ThreadLocalOutput)
+        if capture:
+            sys.stdout.local.buffer = output
+        try:
+            result = function(**params)
+            if isinstance(result, types.GeneratorType):
+                result = list(result)
+        finally:
+            if capture:
+                sys.stdout.local.buffer = None
+        return result, output.getvalue()
+    
+    def call(self, method: str, params: Dict) -> Tuple[object, str]:
+        """Run a method, sharing the result with identical concurrent read requests"""
+        with self._lock:
+            self.requests += 1
+        if method == 'get_repo_status':
+            # Serve status from the warm StatusCache unless the client asks for a fresh one
+            params = dict(params, use_cache=params.get('use_cache', True))
+        if method not in self.READ_METHODS:
+            return self._execute(method, params)
+        
+        key = json.dumps([method, params], sort_keys=True)
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if owner:
+            try:
+                future.set_result(self._execute(method, params))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    del self._inflight[key]
+        return future.result()
+    
+    def handle(self, request: Dict) -> Optional[Dict]:
+        """Answer one JSON-RPC request object"""
+        request_id = request.get('id')
+        method = request.get('method')
+        params = request.get('params') or {}
+        if not isinstance(method, str) or not isinstance(params, dict):
+            return {"jsonrpc": "2.0", "id": request_id, "error": {"code": -32600, "message": "Invalid request"}}
+        
+        if method == 'daemon.stats':
+            with self._lock:
+                result = {"requests": self.requests, "coalesced": self.coalesced, "repos": sorted(self._managers),
+                          "status_cache": STATUS_CACHE.stats()}
+            return {"jsonrpc": "2.0", "id": request_id, "result": result}
+        
+        if method == 'daemon.metrics':
+            return {"jsonrpc": "2.0", "id": request_id, "result": TELEMETRY.prometheus()}
+        
+        try:
+            result, output = self.call(method, params)
+        except AttributeError:
+            return {"jsonrpc": "2.0", "id": request_id, "error": {"code": -32601, "message": f"Method not found: {method}"}}
+        except TypeError as e:
+            return {"jsonrpc": "2.0", "id": request_id, "error": {"code": -32602, "message": str(e)}}
+        except Exception as e:
+            return {"jsonrpc": "2.0", "id": request_id, "error": {"code": -32603, "message": str(e)}}
+        
+        response = {"jsonrpc": "2.0", "id": request_id, "result": result}
+        if output:
+            response["output"] = output
+        return response
+    
+    def serve_forever(self) -> None:
+        """Listen on the socket until interrupted"""
+        daemon = self
+        
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    try:
+                        request = json.loads(line)
+                    except ValueError:
+                        response = {"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Parse error"}}
+                    else:
+                        response = daemon.handle(request) if isinstance(request, dict) else \
+                            {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid request"}}
+                    self.wfile.write(json.dumps(response, separators=(',', ':')).encode('utf-8') + b'\n')
+                    self.wfile.flush()
+        
+        if os.path.exists(self.socket_path):
+            if RemoteGithubManager.available(self.socket_path):
+                raise RuntimeError(f"A daemon is already listening on {self.socket_path}")
+            os.unlink(self.socket_path)
+        
+        if not isinstance(sys.stdout, _ThreadLocalOutput):
+            sys.stdout = _ThreadLocalOutput(sys.stdout)
+        # Bind with an owner-only umask so the socket is never reachable by others, not even briefly
+        umask = os.umask(0o177)
+        try:
+            server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        finally:
+            os.umask(umask)
+        server.daemon_threads = True
+        if threading.current_thread() is threading.main_thread():
+            # Exit through the cleanup below on `kill` as well as Ctrl+C
+            signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+class RemoteGithubManager:
+    """Client-side stand-in for GithubManager that forwards calls to a running daemon
+    
+    Streaming methods run in-process instead: a JSON-RPC response would hold
+    the whole stream in memory on both sides, and a single git pipe gains
+    nothing from the daemon's warm state.
+    """
+    
+    LOCAL_METHODS = {'iter_status_entries', 'iter_commit_history', 'iter_diff_hunks', 'stream_file_diff',
+                     'clone_repository'}
+    
+    def __init__(self, repo_path: str = None, socket_path: str = None):
+        self.repo_path = os.path.abspath(repo_path or os.getcwd())
+        self.socket_path = socket_path or default_socket_path()
+        self._local = None
+        self._sock = None
+        self._file = None
+        self._next_id = 0
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def available(socket_path: str = None) -> bool:
+        """True when a daemon is accepting connections on the socket"""
+        socket_path = socket_path or default_socket_path()
+        if not hasattr(socket, 'AF_UNIX') or not os.path.exists(socket_path):
+            return False
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(0.5)
+                sock.connect(socket_path)
+            return True
+        except OSError:
+            return False
+    
+    def call(self, method: str, **params):
+        """Invoke a daemon method, echoing anything it printed"""
+        with self._lock:
+            if self._sock is None:
+                self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self._sock.connect(self.socket_path)
+                self._file = self._sock.makefile('rb')
+            self._next_id += 1
+            request = {"jsonrpc": "2.0", "id": self._next_id, "method": method,
+                       "params": dict(params, repo=self.repo_path)}
+            self._sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+            response = json.loads(self._file.readline())
+        if response.get("output"):
+            print(response["output"], end='')
+        if "error" in response:
+            raise RuntimeError(response["error"]["message"])
+        return response["result"]
+    
+    def close(self) -> None:
+        with self._lock:
+            if self._sock is not None:
+                self._file.close()
+                self._sock.close()
+                self._sock = None
+    
+    def __getattr__(self, name: str) -> Callable:
+        # Any public GithubManager method, with arguments bound the way the local method takes them
+        method = getattr(GithubManager, name, None) if not name.startswith('_') else None
+        if not inspect.isfunction(method):
+            raise AttributeError(name)
+        if name in self.LOCAL_METHODS:
+            # Clone targets are relative to the caller's directory as well, not the daemon's
+            if self._local is None:
+                self._local = GithubManager(self.repo_path)
+            return getattr(self._local, name)
+        if inspect.isgeneratorfunction(inspect.unwrap(method)):
+            return lambda *args, **kwargs: iter(self._bind(name, *args, **kwargs))
+        return functools.partial(self._bind, name)
+    
+    def _bind(self, name: str, *args, **kwargs):
+        owner, _, attr = name.rpartition('.')
+        signature = inspect.signature(getattr(CommitIndex if owner == 'commit_index' else GithubManager, attr))
+        bound = signature.bind(None, *args, **kwargs)
+        params = dict(bound.arguments)
+        params.pop('self')
+        for parameter in signature.parameters.values():
+            if parameter.kind is inspect.Parameter.VAR_KEYWORD:
+                params.update(params.pop(parameter.name, {}))
+        return self.call(name, **params)
+    
+    def commit_index(self):
+        manager = self
+        
+        class RemoteCommitIndex:
+            def __getattr__(self, name: str) -> Callable:
+                if name.startswith('_') or not inspect.isfunction(getattr(CommitIndex, name, None)):
+                    raise AttributeError(name)
+                return functools.partial(manager._bind, f'commit_index.{name}')
+        
+        return RemoteCommitIndex()
+
+def connect_manager(repo_path: str = None, use_daemon: bool = True):
+    """A RemoteGithubManager when a daemon is running, else a local GithubManager"""
+    if use_daemon and RemoteGithubManager.available():
+        return RemoteGithubManager(repo_path)
+    return GithubManager(repo_path)
+
+def _pop_option(args: List[str], name: str, default: Optional[str] = None) -> Optional[str]:
+    """Remove `name value` from an argument list and return the value"""
+    if name in args:
+        index = args.index(name)
+        if index + 1 < len(args):
+            value = args[index + 1]
+            del args[index:index + 2]
+            return value
+        del args[index]
+    return default
+
+class NdjsonWriter:
+    """Write one compact JSON record per line for `--format ndjson`
+    
+    Records are flushed at least every `flush_interval` seconds, so consumers
+    see slow streams (fleet runs) promptly without a syscall per record on
+    fast ones (long histories). `repo` is added to every record that lacks it.
+    """
+    
+    def __init__(self, stream=None, repo: str = None, flush_interval: float = 0.05):
+        self.stream = stream or sys.stdout
+        self.repo = os.path.abspath(repo) if repo else None
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+    
+    def write(self, record: Dict) -> None:
+        if self.repo and "repo" not in record:
+            record = {"type": record["type"], "repo": self.repo, **record}
+        self.stream.write(json.dumps(record, separators=(',', ':'), ensure_ascii=False) + '\n')
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self.stream.flush()
+            self._last_flush = now
+    
+    def error(self, message: str) -> None:
+        self.write({"type": "error", "message": message})
+    
+    def close(self) -> None:
+        self.stream.flush()
+
+def commit_record(commit) -> Dict:
+    """NDJSON "commit" record from a CommitRecord or commit dictionary"""
+    fields = commit.to_dict() if isinstance(commit, CommitRecord) else commit
+    return {"type": "commit", **{field: fields[field] for field in COMMIT_FIELDS}}
+
+def branch_record(branch: Dict) -> Dict:
+    """NDJSON "branch" record from a get_branch_overview entry"""
+    return {"type": "branch", "name": branch["name"], "ref": branch["ref"], "remote": branch["remote"],
+            "current": branch["current"], "tip": branch["tip"], "upstream": branch["upstream"],
+            "ahead": branch["ahead"], "behind": branch["behind"], "base_ahead": branch.get("base_ahead"),
+            "base_behind": branch.get("base_behind"), "date": branch["date"], "author": branch["author"],
+            "message": branch["message"]}
+
+INDEX_RECORD_FIELDS = ("added", "pruned", "refs", "rewritten", "removed", "rebuilt", "ok", "indexed_commits",
+                       "reachable_commits", "stale_refs", "commits", "size", "path")
+
+def index_record(action: str, result: Dict) -> Dict:
+    """NDJSON "index" record for a CommitIndex update, rebuild, verify or stats result"""
+    return {"type": "index", "action": action, **{field: result.get(field) for field in INDEX_RECORD_FIELDS}}
+
+def format_size(size: int) -> str:
+    """Human-readable byte count (1024-based)"""
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024 or unit == "GiB":
+            return f"{size} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return ""
+
+def analysis_records(report: Dict) -> Iterator[Dict]:
+    """NDJSON records for an analyze_repository report"""
+    for kind, totals in report["types"].items():
+        yield {"type": "object_type", "kind": kind, **totals}
+    for blob in report["largest"]:
+        yield {"type": "object", **blob}
+    for directory in report["directories"]:
+        yield {"type": "directory", **directory}
+    yield {"type": "pack", **report["packs"]}
+
+def read_name_list(path: str) -> List[str]:
+    """Repository names from a file (or `-` for stdin), one per line, `#` starts a comment"""
+    with (contextlib.nullcontext(sys.stdin) if path == '-' else open(path, encoding='utf-8')) as f:
+        return [line.split('#', 1)[0].strip() for line in f if line.split('#', 1)[0].strip()]
+
+def github_repo_record(entry: Dict) -> Dict:
+    """NDJSON "github_repo" record for a create_repositories or get_repositories entry"""
+    result = entry["result"]
+    return {"type": "github_repo", "name": entry["repo"], "action": result.get("action"),
+            "error": result.get("error"), **{field: result.get(field) for field in GITHUB_REPO_FIELDS}}
+
+def fleet_record(entry: Dict, operation: str) -> Dict:
+    """NDJSON "repo" record for one fleet result of `operation` (status, smoke-test, sync or analyze)"""
+    result = entry["result"]
+    error = result.get("error") if isinstance(result, dict) else None
+    record = {"type": "repo", "repo": entry["repo"], "operation": operation,
+              "elapsed": round(entry["elapsed"], 6), "error": error}
+    if operation == "smoke-test":
+        record["passed"] = result is True
+    elif operation == "sync":
+        record.update(action=result.get("action"), url=result.get("url"), attempts=result.get("attempts"))
+    elif operation == "analyze":
+        report = result if not error else {}
+        largest = report["largest"][0] if report.get("largest") else {}
+        record.update(objects=report["total"]["count"] if report else None,
+                      size=report["total"]["size"] if report else None,
+                      disk_size=report["total"]["disk_size"] if report else None,
+                      pack_size=report["packs"]["pack_size"] if report else None,
+                      packs=report["packs"]["packs"] if report else None,
+                      largest_path=largest.get("path"), largest_size=largest.get("size"))
+    else:
+        status = result if not error else {}
+        record.update(branch=status.get("current_branch") or None, detached=status.get("detached"),
+                      upstream=status.get("upstream"), ahead=status.get("ahead"), behind=status.get("behind"),
+                      has_changes=status.get("has_changes"),
+                      changes=len(status["files"]) if "files" in status else None)
+    return record
+
+def run_fleet_command(args: List[str], ndjson: bool = False) -> None:
+    """Handle `fleet <status|smoke-test|sync|analyze> ...` from the command line"""
+    args = list(args)
+    workers = int(_pop_option(args, '--workers', '8'))
+    registry = _pop_option(args, '--registry', default_registry_path())
+    if args[:1] == ["sync"] and len(args) > 1:
+        run_fleet_sync(args[1], args[2:], workers, ndjson)
+        return
+    top = int(_pop_option(args, '--top', '5'))
+    depth = int(_pop_option(args, '--depth', '1'))
+    min_size = int(_pop_option(args, '--min-size', '0'))
+    commits = "--no-commits" not in args
+    args = [arg for arg in args if arg != "--no-commits"]
+    if len(args) < 2 or args[0] not in ("status", "smoke-test", "analyze"):
+        print("Usage: python github_manager.py fleet <status|smoke-test> <root|manifest> [--workers N]")
+        print("       python github_manager.py fleet analyze <root|manifest> [--top N] [--depth N] "
+              "[--min-size BYTES] [--no-commits] [--workers N]")
+        print("       python github_manager.py fleet sync <clone-manifest> [--dest DIR] [--workers N] "
+              "[--reference DIR [--update-reference]] [--filter SPEC] [--depth N] [--retries N] [--timeout S]")
+        return
+    
+    action, source = args[0], args[1]
+    repo_paths = FleetManager.load_repo_paths(source, registry_path=registry)
+    writer = NdjsonWriter() if ndjson else None
+    if not repo_paths:
+        if writer:
+            writer.error(f"No repositories found in '{source}'")
+            writer.close()
+        else:
+            print(f"No repositories found in '{source}'")
+        return
+    
+    fleet = FleetManager(repo_paths, max_workers=workers)
+    if not writer:
+        print(f"Running {action} on {len(repo_paths)} repositories ({fleet.max_workers} workers)...")
+    start = time.perf_counter()
+    results = []
+    if action == "analyze":
+        entries = fleet.iter_analyze(top, depth, min_size, commits)
+    else:
+        entries = fleet.iter_status() if action == "status" else fleet.iter_smoke_tests()
+    for entry in entries:
+        results.append(entry)
+        result = entry["result"]
+        if writer:
+            writer.write(fleet_record(entry, action))
+        elif isinstance(result, bool):
+            print(f"{'✓' if result else '✗'} {entry['repo']}", flush=True)
+        elif 'error' in result:
+            print(f"✗ {entry['repo']}: {result['error']}", flush=True)
+        elif action == "analyze":
+            largest = result["largest"][0] if result["largest"] else None
+            biggest = f", largest {largest['path'] or largest['oid'][:12]} ({format_size(largest['size'])})" if largest else ""
+            print(f"✓ {entry['repo']} {result['total']['count']} objects, "
+                  f"{format_size(result['packs']['pack_size'] + result['packs']['loose_size'])} on disk{biggest}",
+                  flush=True)
+        else:
+            changes = len(result['files'])
+            state = f"{changes} changes" if result['has_changes'] else "clean"
+            tracking = f" +{result['ahead']}/-{result['behind']}" if result['upstream'] else ""
+            print(f"✓ {entry['repo']} [{result['current_branch'] or 'detached'}{tracking}] {state}", flush=True)
+    
+    summary = FleetManager.summarize(results, time.perf_counter() - start)
+    if writer:
+        writer.write({"type": "summary", **summary})
+        writer.close()
+    else:
+        print(json.dumps(summary, indent=2))
+
+def run_discover_command(args: List[str], ndjson: bool = False) -> None:
+    """Handle `discover <root...>`: find repositories and update the registry"""
+    args = list(args)
+    workers = int(_pop_option(args, '--workers', '8'))
+    registry = _pop_option(args, '--registry', default_registry_path())
+    exclude = _pop_option(args, '--exclude', '')
+    full = '--full' in args
+    roots = [arg for arg in args if arg != '--full'] or ['.']
+    
+    discovery = RepoDiscovery(registry, max_workers=workers, exclude=tuple(filter(None, exclude.split(','))))
+    if full:
+        discovery.dirs = {}
+    writer = NdjsonWriter() if ndjson else None
+    for repo in discovery.scan(roots):
+        if writer:
+            writer.write({"type": "repo", "repo": repo["path"], "kind": repo["kind"], "git_dir": repo["git_dir"]})
+        else:
+            print(f"{repo['path']} ({repo['kind']})")
+    if writer:
+        writer.write({"type": "summary", **discovery.stats, "registry": registry})
+        writer.close()
+    else:
+        print(json.dumps(dict(discovery.stats, registry=registry), indent=2))
+
+def run_fleet_sync(manifest: str, args: List[str], workers: int, ndjson: bool = False) -> None:
+    """Handle `fleet sync <clone-manifest>`: clone missing repositories, fetch the rest"""
+    dest = _pop_option(args, '--dest', '.')
+    reference = _pop_option(args, '--reference')
+    update_reference = '--update-reference' in args
+    clone_filter = _pop_option(args, '--filter')
+    depth = _pop_option(args, '--depth')
+    retries = int(_pop_option(args, '--retries', '2'))
+    timeout = _pop_option(args, '--timeout')
+    
+    entries = FleetManager.load_clone_manifest(manifest, dest)
+    writer = NdjsonWriter() if ndjson else None
+    if not entries:
+        if writer:
+            writer.error(f"No repositories listed in '{manifest}'")
+            writer.close()
+        else:
+            print(f"No repositories listed in '{manifest}'")
+        return
+    if reference and update_reference:
+        # Progress messages would corrupt the record stream
+        with contextlib.redirect_stdout(sys.stderr if writer else sys.stdout):
+            FleetManager.update_reference(reference, [url for url, _ in entries], jobs=workers)
+    
+    fleet = FleetManager([path for _, path in entries], max_workers=workers)
+    if not writer:
+        print(f"Syncing {len(entries)} repositories ({fleet.max_workers} workers)...")
+    start = time.perf_counter()
+    results = []
+    for entry in fleet.iter_sync(entries, reference=reference, filter=clone_filter,
+                                 depth=int(depth) if depth else None, retries=retries,
+                                 timeout=float(timeout) if timeout else None):
+        results.append(entry)
+        result = entry["result"]
+        if writer:
+            writer.write(fleet_record(entry, "sync"))
+        elif 'error' in result:
+            print(f"✗ {entry['repo']}: {result['error']}", flush=True)
+        else:
+            retried = f" after {result['attempts']} attempts" if result['attempts'] > 1 else ""
+            print(f"✓ {entry['repo']} {result['action']}{retried} ({entry['elapsed']:.1f}s)", flush=True)
+    
+    summary = FleetManager.summarize(results, time.perf_counter() - start)
+    if writer:
+        writer.write({"type": "summary", **summary})
+        writer.close()
+    else:
+        print(json.dumps(summary, indent=2))
+
+def main():
+    """Main function for command-line usage"""
+    import sys
+    
+    # Global options come before the command, so a command's own arguments are never mistaken for them
+    global_args = []
+    while len(sys.argv) > 1 and sys.argv[1] in ('--profile', '--metrics', '--format', '--no-daemon'):
+        global_args.append(sys.argv.pop(1))
+        if global_args[-1] in ('--metrics', '--format') and len(sys.argv) > 1:
+            global_args.append(sys.argv.pop(1))
+    
+    # --profile and --metrics work with every command; both report at exit
+    profile = "--profile" in global_args
+    if profile:
+        atexit.register(lambda: sys.stderr.write(TELEMETRY.profile_report()))
+    metrics_path = _pop_option(global_args, '--metrics')
+    if metrics_path:
+        atexit.register(lambda: Path(metrics_path).write_text(TELEMETRY.prometheus(), encoding='utf-8'))
+    # --format ndjson: one compact JSON record per line from every read command
+    output_format = _pop_option(global_args, '--format', 'text')
+    if output_format not in ('text', 'ndjson'):
+        print(f"Unknown output format '{output_format}' (expected text or ndjson)")
+        sys.exit(2)
+    ndjson = output_format == 'ndjson'
+    
+    if len(sys.argv) < 2:
+        print("Usage: python github_manager.py [--format text|ndjson] [--profile] [--metrics FILE] [--no-daemon] "
+              "<command> [options]")
+        print("Commands:")
+        print("  status [--counts] [--untracked all|normal|no] [-- paths] - Show repository status")
+        print("  dirty [--no-untracked] [-- paths] - Print clean/dirty (exit status 0/1)")
+        print("  large-repo               - Enable untracked cache and fsmonitor for this repo")
+        print("  smoke-test [--local]     - Run smoke tests (--local skips the remote check)")
+        print("  commit <message> [-- pathspec...] - Commit changes (optionally only matching paths)")
+        print("  push [branch]            - Push to GitHub")
+        print("  pull [remote] [branch]   - Pull from remote")
+        print("  create-repo <name> [name...] [--from FILE] [--private] - Create repositories (skips existing ones)")
+        print("  repo-info <owner/name...> [--from FILE] - GitHub metadata for many repositories")
+        print("  fetch [remote] [--depth N] - Fetch from remote")
+        print("  clone <url> [dir] [--reference DIR] [--filter SPEC] [--depth N] - Clone repository")
+        print("  branch <name>            - Create and checkout branch")
+        print("  checkout <name>          - Switch to branch")
+        print("  merge <source> [target] [--no-worktree] - Merge branches (optionally without checkout)")
+        print("  mergeable <target> [branch...] [--workers N] - Check which branches merge cleanly")
+        print("  history [limit] [--skip N] [--since D] [--until D] [--author A] [--range R] [-- paths]")
+        print("                           - Show commit history")
+        print("  history --indexed [limit] [--author A] [--since D] [--until D] - Query the commit index")
+        print("  index [update|rebuild|verify|stats] - Maintain the commit index")
+        print("  stash [message]          - Stash changes")
+        print("  stash-pop [index]        - Apply stashed changes")
+        print("  diff [file] [--staged] [--stat] - Stream diff (or per-file stats)")
+        print("  revert                   - Revert last commit")
+        print("  reset <hash> [--hard]    - Reset to commit")
+        print("  branches [--verbose [--base B]] - List branches (verbose: tips, tracking, last commit)")
+        print("  remote-add <name> <url>  - Add remote repository")
+        print("  analyze [--top N] [--depth N] [--min-size BYTES] [--no-commits]")
+        print("                           - Largest blobs (path, introducing commit), size per directory, packs")
+        print("  refs <batch-file|-> [-m reflog-message] [--allow-checked-out]")
+        print("                           - Apply create/update/delete/verify lines atomically")
+        print("  discover [root...] [--registry PATH] [--workers N] [--exclude a,b] [--full]")
+        print("                           - Find repositories (rescans only revisit changed directories)")
+        print("  fleet status <root|manifest> [--workers N]      - Status of many repos")
+        print("  fleet smoke-test <root|manifest> [--workers N]  - Smoke test many repos")
+        print("  fleet analyze <root|manifest> [--top N] [--depth N] [--no-commits] [--workers N] - Size of many repos")
+        print("  fleet sync <clone-manifest> [--dest DIR] [--reference DIR [--update-reference]]")
+        print("             [--filter SPEC] [--depth N] [--retries N] [--workers N] - Clone or fetch many repos")
+        print("  serve [--socket PATH]    - Run a JSON-RPC daemon that other commands forward to")
+        print("  bench [--files N] [--commits N] [--branches N] [--iterations N] [--fleet N] [--output F] [--compare F]")
+        print("                           - Benchmark operations against a generated local repository")
+        print("Global options (before the command):")
+        print("  --format ndjson          - One JSON record per line from read commands")
+        print("  --no-daemon              - Run in-process even if a daemon is running")
+        print("  --profile                - Print per-method and per-git-command timings to stderr at the end")
+        print("  --metrics FILE           - Write the same timings in Prometheus text format")
+        return
+    
+    command = sys.argv[1].lower()
+    
+    if command == "fleet":
+        run_fleet_command(sys.argv[2:], ndjson)
+        return
+    
+    if command == "discover":
+        run_discover_command(sys.argv[2:], ndjson)
+        return
+    
+    if command == "bench":
+        from github_manager_bench import run_bench_command
+        run_bench_command(sys.argv[2:])
+        return
+    
+    if command == "serve":
+        socket_path = _pop_option(sys.argv, '--socket')
+        daemon = GithubManagerDaemon(socket_path)
+        print(f"✓ Serving JSON-RPC on {daemon.socket_path} (Ctrl+C to stop)", flush=True)
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+    
+    # Forward to a running daemon unless told not to (profiling measures this process, so it never forwards)
+    use_daemon = "--no-daemon" not in global_args and "--no-daemon" not in sys.argv
+    if "--no-daemon" in sys.argv:
+        sys.argv.remove("--no-daemon")
+    manager = connect_manager(use_daemon=use_daemon and not (profile or metrics_path))
+    
+    writer = NdjsonWriter(repo=manager.repo_path or os.getcwd()) if ndjson else None
     
     if command == "status":
-        status = manager.get_repo_status()
-        print(json.dumps(status, indent=2))
+        args = sys.argv[2:]
+        paths = args[args.index('--') + 1:] if '--' in args else None
+        untracked = _pop_option(args, '--untracked', 'normal')
+        if writer and "--counts" in args:
+            status = manager.get_repo_status(paths=paths, counts_only=True, untracked=untracked)
+            writer.write(status_counts_record(status) if 'error' not in status
+                         else {"type": "error", "message": status["error"]})
+        elif writer:
+            try:
+                for record in manager.iter_status_entries(paths=paths, untracked=untracked):
+                    writer.write(record)
+            except RuntimeError as e:
+                writer.error(str(e))
+        else:
+            status = manager.get_repo_status(paths=paths, counts_only="--counts" in args, untracked=untracked)
+            print(json.dumps(status, indent=2))
+    
+    elif command == "dirty":
+        args = sys.argv[2:]
+        paths = args[args.index('--') + 1:] if '--' in args else None
+        try:
+            dirty = manager.is_dirty(paths, include_untracked="--no-untracked" not in args)
+        except RuntimeError as e:
+            if writer:
+                writer.error(str(e))
+                writer.close()
+            else:
+                print(f"Error: {e}")
+            sys.exit(2)
+        if writer:
+            writer.write({"type": "dirty", "dirty": dirty})
+            writer.close()
+        else:
+            print("dirty" if dirty else "clean")
+        sys.exit(1 if dirty else 0)
+    
+    elif command == "large-repo":
+        manager.enable_large_repo_mode()
     
     elif command == "smoke-test":
-        manager.smoke_test()
+        manager.smoke_test(check_remote="--local" not in sys.argv)
     
     elif command == "commit" and len(sys.argv) > 2:
-        message = " ".join(sys.argv[2:])
-        manager.commit_changes(message)
+        args = sys.argv[2:]
+        files = args[args.index('--') + 1:] if '--' in args else None
+        message = " ".join(args[:args.index('--')] if '--' in args else args)
+        manager.commit_changes(message, files=files)
     
     elif command == "push":
         branch = sys.argv[2] if len(sys.argv) > 2 else None
@@ -481,14 +5002,53 @@ def main():
         manager.pull_changes(remote, branch)
     
     elif command == "create-repo" and len(sys.argv) > 2:
-        repo_name = sys.argv[2]
-        private = "--private" in sys.argv
-        manager.create_repository(repo_name, private)
+        args = sys.argv[2:]
+        names_file = _pop_option(args, '--from')
+        private = "--private" in args
+        names = [arg for arg in args if arg != "--private"] + (read_name_list(names_file) if names_file else [])
+        if len(names) == 1 and not writer:
+            manager.create_repository(names[0], private)
+        else:
+            # Batch: existing repositories are skipped, so re-running a list is cheap
+            for entry in manager.create_repositories(names, private):
+                result = entry["result"]
+                if writer:
+                    writer.write(github_repo_record(entry))
+                elif 'error' in result:
+                    print(f"✗ {entry['repo']}: {result['error']}", flush=True)
+                else:
+                    print(f"✓ {result['full_name']} {result['action']}", flush=True)
+    
+    elif command == "repo-info" and len(sys.argv) > 2:
+        args = sys.argv[2:]
+        names_file = _pop_option(args, '--from')
+        names = args + (read_name_list(names_file) if names_file else [])
+        for entry in manager.get_repositories(names):
+            result = entry["result"]
+            if writer:
+                writer.write(github_repo_record(entry))
+            elif 'error' in result:
+                print(f"✗ {entry['repo']}: {result['error']}")
+            else:
+                visibility = "private" if result["private"] else "public"
+                archived = ", archived" if result["archived"] else ""
+                print(f"✓ {result['full_name']} [{visibility}{archived}] {result['default_branch']} "
+                      f"★{result['stargazers_count']} {format_size(result['size'] * 1024)} "
+                      f"pushed {(result['pushed_at'] or '-')[:10]}")
+    
+    elif command == "fetch":
+        depth = _pop_option(sys.argv, '--depth')
+        remote = sys.argv[2] if len(sys.argv) > 2 else 'origin'
+        manager.fetch_changes(remote, depth=int(depth) if depth else None)
     
     elif command == "clone" and len(sys.argv) > 2:
+        reference = _pop_option(sys.argv, '--reference')
+        clone_filter = _pop_option(sys.argv, '--filter')
+        depth = _pop_option(sys.argv, '--depth')
         repo_url = sys.argv[2]
         target_dir = sys.argv[3] if len(sys.argv) > 3 else None
-        manager.clone_repository(repo_url, target_dir)
+        manager.clone_repository(repo_url, target_dir, reference=reference, filter=clone_filter,
+                                 depth=int(depth) if depth else None)
     
     elif command == "branch" and len(sys.argv) > 2:
         branch_name = sys.argv[2]
@@ -499,18 +5059,97 @@ def main():
         manager.switch_branch(branch_name)
     
     elif command == "merge" and len(sys.argv) > 2:
-        source_branch = sys.argv[2]
-        target_branch = sys.argv[3] if len(sys.argv) > 3 else None
-        manager.merge_branch(source_branch, target_branch)
+        worktree = "--no-worktree" not in sys.argv
+        args = [arg for arg in sys.argv[2:] if arg != "--no-worktree"]
+        source_branch = args[0]
+        target_branch = args[1] if len(args) > 1 else None
+        manager.merge_branch(source_branch, target_branch, worktree=worktree)
+    
+    elif command == "mergeable" and len(sys.argv) > 2:
+        args = sys.argv[2:]
+        workers = int(_pop_option(args, '--workers', '8'))
+        target = args[0]
+        branches = args[1:] or [branch["name"] for branch in manager.get_branch_overview(include_remote=False)
+                                if 'error' not in branch and branch["name"] != target]
+        clean = 0
+        results = []
+        try:
+            for result in manager.check_mergeability(branches, target, max_workers=workers):
+                results.append(result)
+                if writer:
+                    writer.write({"type": "mergeable", "branch": result["branch"], "target": target,
+                                  "clean": result.get("clean"), "conflicts": result.get("conflicts", []),
+                                  "error": result.get("error")})
+                elif result.get("error"):
+                    print(f"✗ {result['branch']}: {result['error']}", flush=True)
+                elif result["clean"]:
+                    clean += 1
+                    print(f"✓ {result['branch']} merges cleanly into {target}", flush=True)
+                else:
+                    print(f"✗ {result['branch']} conflicts: {', '.join(result['conflicts'])}", flush=True)
+            if not writer:
+                print(f"{clean}/{len(results)} branches merge cleanly into {target}")
+        except RuntimeError as e:
+            if writer:
+                writer.error(str(e))
+            else:
+                print(f"Error: {e}")
     
     elif command == "history":
-        limit = int(sys.argv[2]) if len(sys.argv) > 2 else 10
-        history = manager.get_commit_history(limit)
-        for commit in history:
-            if 'error' in commit:
-                print(f"Error: {commit['error']}")
+        args = sys.argv[2:]
+        paths = args[args.index('--') + 1:] if '--' in args else []
+        args = args[:args.index('--')] if '--' in args else args
+        filters = {
+            "skip": int(_pop_option(args, '--skip', '0')),
+            "since": _pop_option(args, '--since'),
+            "until": _pop_option(args, '--until'),
+            "author": _pop_option(args, '--author'),
+            "rev_range": _pop_option(args, '--range'),
+            "paths": paths
+        }
+        indexed = "--indexed" in args
+        args = [arg for arg in args if arg != "--indexed"]
+        limit = int(args[0]) if args else 10
+        if indexed:
+            # Served from the commit index; covers all branches, not just HEAD
+            commits = manager.search_commits(filters["author"], filters["since"], filters["until"], limit, filters["skip"])
+            for commit in commits:
+                if 'error' in commit:
+                    if writer:
+                        writer.error(commit['error'])
+                    else:
+                        print(f"Error: {commit['error']}")
+                elif writer:
+                    writer.write(commit_record(commit))
+                else:
+                    print(f"{commit['hash'][:8]} - {commit['author']} - {commit['date'][:10]} - {commit['message']}")
+        else:
+            try:
+                # Print each commit as git produces it
+                for commit in manager.iter_commit_history(limit=limit, **filters):
+                    if writer:
+                        writer.write(commit_record(commit))
+                    else:
+                        print(f"{commit.hash[:8]} - {commit.author} - {commit.date[:10]} - {commit.message}")
+            except RuntimeError as e:
+                if writer:
+                    writer.error(str(e))
+                else:
+                    print(f"Error: {e}")
+    
+    elif command == "index":
+        action = sys.argv[2] if len(sys.argv) > 2 else "update"
+        if not manager.is_git_repo():
+            if writer:
+                writer.error("Not a git repository")
             else:
-                print(f"{commit['hash'][:8]} - {commit['author']} - {commit['date'][:10]} - {commit['message']}")
+                print("Error: Not a git repository")
+        elif action not in ("update", "rebuild", "verify", "stats"):
+            print("Usage: python github_manager.py index [update|rebuild|verify|stats]")
+        elif writer:
+            writer.write(index_record(action, getattr(manager.commit_index(), action)()))
+        else:
+            print(json.dumps(getattr(manager.commit_index(), action)(), indent=2))
     
     elif command == "stash":
         message = " ".join(sys.argv[2:]) if len(sys.argv) > 2 else None
@@ -521,9 +5160,42 @@ def main():
         manager.stash_pop(stash_index)
     
     elif command == "diff":
-        file_path = sys.argv[2] if len(sys.argv) > 2 else None
-        diff = manager.get_file_diff(file_path)
-        print(diff)
+        args = sys.argv[2:]
+        staged = "--staged" in args
+        stat_mode = "--stat" in args or "--numstat" in args
+        paths = [arg for arg in args if not arg.startswith('--')]
+        file_path = paths[0] if paths else None
+        if writer and stat_mode:
+            stats = manager.get_diff_stats(file_path, staged)
+            if 'error' in stats:
+                writer.error(stats['error'])
+            else:
+                for entry in stats["files"]:
+                    writer.write({"type": "diff_file", "path": entry["path"], "old_path": entry.get("old_path"),
+                                  "added": entry["added"], "deleted": entry["deleted"], "binary": entry["binary"]})
+                writer.write({"type": "diff_summary", **{key: stats[key] for key in
+                              ("files_changed", "insertions", "deletions", "binary_files")}})
+        elif writer:
+            try:
+                for hunk in manager.iter_diff_hunks(file_path, staged):
+                    writer.write({"type": "hunk", "path": hunk["path"], "old_path": hunk["old_path"],
+                                  "header": hunk["header"], "lines": hunk["lines"]})
+            except RuntimeError as e:
+                writer.error(str(e))
+        elif stat_mode:
+            stats = manager.get_diff_stats(file_path, staged)
+            if 'error' in stats:
+                print(f"Error: {stats['error']}")
+            else:
+                for entry in stats["files"]:
+                    name = f"{entry['old_path']} => {entry['path']}" if "old_path" in entry else entry['path']
+                    counts = "binary" if entry["binary"] else f"+{entry['added']} -{entry['deleted']}"
+                    print(f"  {name} | {counts}")
+                print(f"{stats['files_changed']} files changed, {stats['insertions']} insertions(+), "
+                      f"{stats['deletions']} deletions(-), {stats['binary_files']} binary")
+        else:
+            sys.stdout.flush()
+            manager.stream_file_diff(file_path, staged)
     
     elif command == "revert":
         manager.revert_last_commit()
@@ -534,18 +5206,95 @@ def main():
         manager.reset_to_commit(commit_hash, hard)
     
     elif command == "branches":
-        branches = manager.list_branches()
-        for branch in branches:
-            print(f"  {branch}")
+        if writer:
+            # Records always carry the full overview so the schema doesn't depend on --verbose
+            base = _pop_option(sys.argv, '--base')
+            for branch in manager.get_branch_overview(base=base):
+                writer.write({"type": "error", "message": branch["error"]} if 'error' in branch
+                             else branch_record(branch))
+        elif "--verbose" in sys.argv or "-v" in sys.argv:
+            base = _pop_option(sys.argv, '--base')
+            for branch in manager.get_branch_overview(base=base):
+                if 'error' in branch:
+                    print(f"Error: {branch['error']}")
+                    continue
+                tracking = ""
+                if branch["upstream"]:
+                    counts = "gone" if branch["ahead"] is None else f"+{branch['ahead']}/-{branch['behind']}"
+                    tracking = f" {branch['upstream'].split('/', 2)[-1]} [{counts}]"
+                if base:
+                    tracking += f" ({base} +{branch['base_ahead']}/-{branch['base_behind']})"
+                marker = "*" if branch["current"] else " "
+                print(f"{marker} {branch['name']} {branch['tip'][:8]}{tracking} {branch['date'][:10]} "
+                      f"{branch['author']} - {branch['message']}")
+        else:
+            branches = manager.list_branches()
+            for branch in branches:
+                print(f"  {branch}")
     
     elif command == "remote-add" and len(sys.argv) > 3:
         name = sys.argv[2]
         url = sys.argv[3]
         manager.add_remote(name, url)
     
+    elif command == "analyze":
+        args = sys.argv[2:]
+        top = int(_pop_option(args, '--top', '20'))
+        depth = int(_pop_option(args, '--depth', '1'))
+        min_size = int(_pop_option(args, '--min-size', '0'))
+        report = manager.analyze_repository(top, depth, min_size, commits="--no-commits" not in args)
+        if 'error' in report:
+            if writer:
+                writer.error(report['error'])
+            else:
+                print(f"Error: {report['error']}")
+        elif writer:
+            for record in analysis_records(report):
+                writer.write(record)
+        else:
+            print("Objects:")
+            for kind, totals in report["types"].items():
+                print(f"  {kind:<7} {totals['count']:>10}  {format_size(totals['size']):>12}  "
+                      f"{format_size(totals['disk_size']):>12} on disk")
+            print("\nLargest blobs:")
+            for blob in report["largest"]:
+                introduced = f"  {blob['commit'][:8]} {blob['date'][:10]} {blob['author']}" if blob["commit"] else ""
+                print(f"  {format_size(blob['size']):>12}  {blob['oid'][:12]}  {blob['path'] or '(unreachable)'}{introduced}")
+            print("\nDirectories (all history vs. HEAD):")
+            for directory in report["directories"][:top]:
+                print(f"  {format_size(directory['disk_size']):>12} on disk  {format_size(directory['size']):>12}  "
+                      f"{format_size(directory['head_size']):>12} in HEAD  {directory['path']}")
+            packs = report["packs"]
+            print(f"\nPacks: {packs['packs']} ({format_size(packs['pack_size'])}, {packs['packed_objects']} objects), "
+                  f"loose: {packs['loose_objects']} ({format_size(packs['loose_size'])}), "
+                  f"garbage: {packs['garbage']}, prune-packable: {packs['prune_packable']}")
+            print(f"Analyzed in {report['elapsed']:.1f}s")
+    
+    elif command == "refs" and len(sys.argv) > 2:
+        message = _pop_option(sys.argv, '-m')
+        allow_checked_out = "--allow-checked-out" in sys.argv
+        source = sys.argv[2]
+        try:
+            if source == '-':
+                operations = parse_ref_batch(sys.stdin)
+            else:
+                with open(source, encoding='utf-8') as f:
+                    operations = parse_ref_batch(f)
+        except (OSError, ValueError) as e:
+            print(f"✗ Reading ref batch failed: {e}")
+            sys.exit(1)
+        result = manager.update_refs(operations, message, allow_checked_out)
+        if 'error' in result:
+            print(f"✗ Ref transaction failed, nothing was changed: {result['error']}")
+            sys.exit(1)
+        print(f"✓ Applied {result['applied']} ref change(s) in one transaction")
+    
     else:
         print("Invalid command or missing arguments")
         print("Use 'python github_manager.py' to see available commands")
+    
+    if writer:
+        writer.close()
 
 if __name__ == "__main__":
     main()
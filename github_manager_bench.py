@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Github Manager benchmarks - synthetic repositories and latency measurements
+for GithubManager operations. Everything runs offline against local repos.
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import tempfile
+import resource
+import subprocess
+import contextlib
+from typing import Callable, Dict, List
+
+from github_manager import TELEMETRY, FleetManager, GithubManager, StatusCache, _pop_option
+
+def _git(repo_path: str, *args: str, input: bytes = None) -> None:
+    subprocess.run(['git', *args], cwd=repo_path, input=input, check=True, capture_output=True)
+
+def _file_path(index: int, depth: int) -> str:
+    parts = [f"d{(index // (10 ** level)) % 10}" for level in range(depth, 0, -1)]
+    return '/'.join(parts + [f"file{index}.txt"])
+
+def generate_repo(path: str, files: int = 1000, commits: int = 100, branches: int = 5,
+                  depth: int = 2, diff_files: int = 10, diff_lines: int = 20,
+                  with_remote: bool = True) -> Dict:
+    """Create a synthetic repository with `git fast-import` (one process for all history)
+
+    The repository gets `files` files spread over `depth` directory levels,
+    a `commits`-long history on main, `branches` feature branches that each
+    add one commit, and `diff_files` modified files in the working tree. With
+    `with_remote`, a local bare repository is added as origin and pushed to.
+    """
+    os.makedirs(path, exist_ok=True)
+    _git(path, 'init', '-q', '-b', 'main')
+    _git(path, 'config', 'user.name', 'Bench')
+    _git(path, 'config', 'user.email', 'bench@example.com')
+
+    stream = io.BytesIO()
+
+    def data(payload: bytes) -> None:
+        stream.write(b'data %d\n' % len(payload))
+        stream.write(payload + b'\n')
+
+    timestamp = 1700000000
+    for n in range(1, commits + 1):
+        stream.write(b'commit refs/heads/main\nmark :%d\n' % n)
+        stream.write(b'committer Bench <bench@example.com> %d +0000\n' % (timestamp + n * 60))
+        data(f"Commit {n}".encode())
+        if n > 1:
+            stream.write(b'from :%d\n' % (n - 1))
+        # The first commit adds every file; later ones touch a few each
+        touched = range(files) if n == 1 else [(n * 7 + k) % files for k in range(3)]
+        for index in touched:
+            stream.write(f"M 100644 inline {_file_path(index, depth)}\n".encode())
+            data(f"file {index}\nrevision {n}\n".encode())
+
+    for b in range(branches):
+        base = max(1, commits - 1 - (b % max(commits - 1, 1)))
+        stream.write(f"commit refs/heads/feature-{b}\n".encode())
+        stream.write(b'mark :%d\n' % (commits + 1 + b))
+        stream.write(b'committer Bench <bench@example.com> %d +0000\n' % (timestamp + (commits + b) * 60))
+        data(f"Feature {b}".encode())
+        stream.write(b'from :%d\n' % base)
+        stream.write(f"M 100644 inline features/feature-{b}.txt\n".encode())
+        data(f"feature {b}\n".encode())
+    stream.write(b'done\n')
+
+    _git(path, 'fast-import', '--quiet', '--done', input=stream.getvalue())
+    _git(path, 'checkout', '-q', '-f', 'main')
+
+    if with_remote:
+        remote = path.rstrip('/') + '.remote.git'
+        subprocess.run(['git', 'init', '-q', '--bare', '-b', 'main', remote], check=True, capture_output=True)
+        _git(path, 'remote', 'add', 'origin', remote)
+        _git(path, 'push', '-q', '-u', 'origin', 'main')
+
+    for index in range(min(diff_files, files)):
+        with open(os.path.join(path, _file_path(index, depth)), 'a', encoding='utf-8') as f:
+            f.write(''.join(f"changed line {line}\n" for line in range(diff_lines)))
+
+    return {"path": path, "files": files, "commits": commits, "branches": branches,
+            "depth": depth, "diff_files": diff_files, "diff_lines": diff_lines}
+
+@contextlib.contextmanager
+def _silenced():
+    """Discard output from both Python code and the git processes it starts"""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = (os.dup(1), os.dup(2))
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    try:
+        os.dup2(devnull, 1)
+        os.dup2(devnull, 2)
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        for fd, copy in zip((1, 2), saved):
+            os.dup2(copy, fd)
+            os.close(copy)
+        os.close(devnull)
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+def _peak_rss_kb() -> Dict:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    scale = 1024 if os.uname().sysname == 'Darwin' else 1
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // scale
+    }
+
+def measure(name: str, operation: Callable[[int], object], iterations: int = 20,
+            setup: Callable[[int], object] = None) -> Dict:
+    """Time an operation and count the processes it starts"""
+    samples = []
+    spawns = 0
+    for i in range(iterations):
+        if setup:
+            setup(i)
+        started = TELEMETRY.started
+        with _silenced():
+            start = time.perf_counter()
+            operation(i)
+            samples.append(time.perf_counter() - start)
+        spawns += TELEMETRY.started - started
+    return {
+        "name": name,
+        "iterations": iterations,
+        "p50_ms": round(_percentile(samples, 0.50) * 1000, 3),
+        "p95_ms": round(_percentile(samples, 0.95) * 1000, 3),
+        "p99_ms": round(_percentile(samples, 0.99) * 1000, 3),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+        "spawns_per_call": round(spawns / iterations, 2)
+    }
+
+def run_benchmarks(workdir: str, files: int = 1000, commits: int = 100, branches: int = 5, depth: int = 2,
+                   diff_files: int = 10, diff_lines: int = 20, iterations: int = 20, fleet: int = 0,
+                   fleet_workers: int = 8, progress: Callable[[Dict], None] = None) -> Dict:
+    """Generate repositories under workdir and benchmark GithubManager against them"""
+    started = time.perf_counter()
+    repo = generate_repo(os.path.join(workdir, 'repo'), files, commits, branches, depth, diff_files, diff_lines)
+    generated = time.perf_counter() - started
+
+    # A private, disabled cache measures real work even where a method opts in to caching;
+    # the shared one measures warm calls
+    cold = GithubManager(repo["path"], status_cache=StatusCache(max_entries=0))
+    warm = GithubManager(repo["path"])
+    results = []
+
+    def record(result: Dict) -> None:
+        results.append(result)
+        if progress:
+            progress(result)
+
+    record(measure("get_repo_status", lambda i: cold.get_repo_status(), iterations))
+    record(measure("get_repo_status[cached]", lambda i: warm.get_repo_status(use_cache=True), iterations))
+    record(measure("get_repo_status[counts]", lambda i: cold.get_repo_status(counts_only=True), iterations))
+    record(measure("is_dirty", lambda i: cold.is_dirty(), iterations))
+    record(measure("get_commit_history", lambda i: cold.get_commit_history(10), iterations))
+    record(measure("iter_commit_history[all]", lambda i: sum(1 for _ in cold.iter_commit_history()), iterations))
+    record(measure("get_file_diff", lambda i: cold.get_file_diff(), iterations))
+    record(measure("get_diff_stats", lambda i: cold.get_diff_stats(), iterations))
+    record(measure("list_branches", lambda i: cold.list_branches(), iterations))
+    record(measure("get_branch_overview", lambda i: cold.get_branch_overview(), iterations))
+
+    def touch(i: int) -> None:
+        with open(os.path.join(repo["path"], 'bench-commit.txt'), 'a', encoding='utf-8') as f:
+            f.write(f"{i}\n")
+    record(measure("commit_changes", lambda i: cold.commit_changes(f"Bench commit {i}", files=['bench-commit.txt']),
+                   iterations, setup=touch))
+
+    def fresh_target(i: int) -> None:
+        _git(repo["path"], 'branch', '-f', f'bench-merge-{i}', 'main')
+    if branches:
+        record(measure("merge_branch[no-worktree]",
+                       lambda i: cold.merge_branch(f'feature-{i % branches}', f'bench-merge-{i}', worktree=False),
+                       iterations, setup=fresh_target))
+        # The classic path: check out the target, merge in the working tree
+        record(measure("merge_branch[worktree]",
+                       lambda i: cold.merge_branch(f'feature-{i % branches}', f'bench-merge-{i}'),
+                       iterations, setup=fresh_target))
+        _git(repo["path"], 'checkout', '-q', 'main')
+
+    if fleet:
+        fleet_paths = []
+        for n in range(fleet):
+            fleet_repo = generate_repo(os.path.join(workdir, 'fleet', f'repo{n}'), files=20, commits=5,
+                                       branches=1, depth=1, diff_files=n % 2, with_remote=False)
+            fleet_paths.append(fleet_repo["path"])
+        manager = FleetManager(fleet_paths, max_workers=fleet_workers)
+        record(measure(f"fleet.iter_status[{fleet}]", lambda i: list(manager.iter_status()), max(1, iterations // 4)))
+        record(measure(f"fleet.iter_smoke_tests[{fleet}]", lambda i: list(manager.iter_smoke_tests()),
+                       max(1, iterations // 4)))
+
+    return {
+        "created": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        "git_version": subprocess.run(['git', '--version'], capture_output=True, text=True).stdout.strip(),
+        "params": {k: repo[k] for k in ("files", "commits", "branches", "depth", "diff_files", "diff_lines")},
+        "fleet": {"repos": fleet, "workers": fleet_workers},
+        "generate_seconds": round(generated, 3),
+        "results": results,
+        # Process-wide high-water marks, so they cover the whole run rather than any one benchmark
+        "peak_rss_kb": _peak_rss_kb()
+    }
+
+def compare(baseline: Dict, current: Dict, threshold: float = 1.25) -> List[Dict]:
+    """Per-benchmark p50 ratios against a previous run; ratio > threshold is a regression"""
+    previous = {result["name"]: result for result in baseline.get("results", [])}
+    rows = []
+    for result in current["results"]:
+        old = previous.get(result["name"])
+        if not old or not old["p50_ms"]:
+            continue
+        ratio = result["p50_ms"] / old["p50_ms"]
+        rows.append({"name": result["name"], "baseline_p50_ms": old["p50_ms"], "p50_ms": result["p50_ms"],
+                     "ratio": round(ratio, 3), "regression": ratio > threshold})
+    return rows
+
+def run_bench_command(args: List[str]) -> None:
+    """Handle `bench [options]` from the command line"""
+    args = list(args)
+    options = {
+        "files": int(_pop_option(args, '--files', '1000')),
+        "commits": int(_pop_option(args, '--commits', '100')),
+        "branches": int(_pop_option(args, '--branches', '5')),
+        "depth": int(_pop_option(args, '--depth', '2')),
+        "diff_files": int(_pop_option(args, '--diff-files', '10')),
+        "diff_lines": int(_pop_option(args, '--diff-lines', '20')),
+        "iterations": int(_pop_option(args, '--iterations', '20')),
+        "fleet": int(_pop_option(args, '--fleet', '0')),
+        "fleet_workers": int(_pop_option(args, '--workers', '8'))
+    }
+    output = _pop_option(args, '--output')
+    baseline_path = _pop_option(args, '--compare')
+    keep = _pop_option(args, '--keep')
+
+    workdir = keep or tempfile.mkdtemp(prefix='github-manager-bench-')
+
+    def progress(result: Dict) -> None:
+        print(f"  {result['name']:<32} p50 {result['p50_ms']:>9.3f} ms  p95 {result['p95_ms']:>9.3f} ms  "
+              f"p99 {result['p99_ms']:>9.3f} ms  spawns {result['spawns_per_call']:>6}", flush=True)
+
+    print(f"Generating repository ({options['files']} files, {options['commits']} commits, "
+          f"{options['branches']} branches) in {workdir}...", flush=True)
+    try:
+        report = run_benchmarks(workdir, progress=progress, **options)
+    finally:
+        if not keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"Peak RSS over the run: {report['peak_rss_kb']['self']} KiB (self), "
+          f"{report['peak_rss_kb']['children']} KiB (largest child process)")
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Results saved to {output}")
+
+    if baseline_path:
+        with open(baseline_path, encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows = compare(baseline, report)
+        for row in rows:
+            mark = "✗" if row["regression"] else "✓"
+            print(f"{mark} {row['name']:<32} {row['baseline_p50_ms']:>9.3f} -> {row['p50_ms']:>9.3f} ms (x{row['ratio']})")
+        if any(row["regression"] for row in rows):
+            print("✗ Regressions detected")
+
+if __name__ == "__main__":
+    run_bench_command(sys.argv[1:])
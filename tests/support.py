@@ -0,0 +1,70 @@
+"""
+Helpers for tests that run GithubManager against throwaway git repositories.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+# Never open an editor for merge messages, even when the tests run on a terminal
+os.environ['GIT_MERGE_AUTOEDIT'] = 'no'
+
+def git(repo_path: str, *args: str, input: str = None, env: dict = None) -> str:
+    """Run git in a repository and return its stdout, failing the test on errors"""
+    return subprocess.run(['git', *args], cwd=repo_path, input=input, check=True, capture_output=True, text=True,
+                          env=dict(os.environ, **env) if env else None).stdout
+
+def init_repo(path: str, commits: int = 1, branch: str = 'main', bare: bool = False) -> str:
+    """Create a repository with `commits` commits, each adding one file"""
+    os.makedirs(path, exist_ok=True)
+    git(path, 'init', '-q', '-b', branch, *(['--bare'] if bare else []))
+    git(path, 'config', 'user.name', 'Test')
+    git(path, 'config', 'user.email', 'test@example.com')
+    git(path, 'config', 'commit.gpgsign', 'false')
+    for n in range(commits):
+        commit_file(path, f'file{n}.txt', f'{n}\n', f'Commit {n}')
+    return path
+
+def write_file(repo_path: str, name: str, content: str) -> None:
+    path = os.path.join(repo_path, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+def commit_file(repo_path: str, name: str, content: str, message: str = None, date: str = None,
+                author: str = None) -> str:
+    """Write, stage and commit one file; returns the new commit id"""
+    write_file(repo_path, name, content)
+    git(repo_path, 'add', '--', name)
+    env = {"GIT_AUTHOR_DATE": date, "GIT_COMMITTER_DATE": date} if date else {}
+    if author:
+        env.update(GIT_AUTHOR_NAME=author, GIT_AUTHOR_EMAIL=f'{author.lower()}@example.com')
+    git(repo_path, 'commit', '-q', '-m', message or f'Update {name}', env=env)
+    return git(repo_path, 'rev-parse', 'HEAD').strip()
+
+def settle_index(repo_path: str) -> None:
+    """Backdate worktree files and directories and refresh the index, so git status stops rewriting it
+    
+    Files modified in the same second as the index are "racily clean", and
+    recently changed directories defeat the untracked cache; either makes
+    every git status rewrite the index, which would change cache fingerprints.
+    """
+    past = os.stat(os.path.join(repo_path, '.git', 'index')).st_mtime - 10
+    for root, dirs, files in os.walk(repo_path):
+        dirs[:] = [name for name in dirs if name != '.git']
+        for name in files + dirs:
+            os.utime(os.path.join(root, name), (past, past))
+    os.utime(repo_path, (past, past))
+    git(repo_path, 'update-index', '-q', '--really-refresh')
+
+class RepoTestCase(unittest.TestCase):
+    """TestCase with a temporary directory that is removed afterwards"""
+    
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='github-manager-test-')
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+    
+    def make_repo(self, name: str = 'repo', commits: int = 1, **kwargs) -> str:
+        return init_repo(os.path.join(self.tmp, name), commits, **kwargs)
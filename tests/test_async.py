@@ -0,0 +1,87 @@
+import asyncio
+import subprocess
+import time
+import unittest
+from unittest import mock
+
+import github_manager
+from github_manager import AsyncGithubManager, GithubManager, StatusCache
+from tests.support import RepoTestCase, git, settle_index, write_file
+
+class AsyncManagerTests(RepoTestCase, unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        super().setUp()
+        self.repo = self.make_repo(commits=2)
+        settle_index(self.repo)
+        self.cache = StatusCache(ttl=60)
+        self.manager = AsyncGithubManager(self.repo, verbose=False, status_cache=self.cache)
+    
+    async def test_status_matches_the_sync_manager(self):
+        write_file(self.repo, 'file0.txt', 'changed\n')
+        status = await self.manager.get_repo_status()
+        expected = GithubManager(self.repo, status_cache=StatusCache()).get_repo_status()
+        self.assertEqual(status, expected)
+    
+    async def test_status_starts_a_single_git_process(self):
+        commands = []
+        run = self.manager._run
+        
+        async def recording_run(cmd, *args, **kwargs):
+            commands.append(cmd[1])
+            return await run(cmd, *args, **kwargs)
+        
+        with mock.patch.object(self.manager, '_run', recording_run):
+            status = await self.manager.get_repo_status()
+        self.assertEqual(commands, ['status'])
+        self.assertEqual(status["last_commit"]["message"], "Commit 1")
+    
+    async def test_uncached_status_never_fingerprints(self):
+        with mock.patch.object(StatusCache, 'fingerprint', side_effect=AssertionError("fingerprinted")):
+            self.assertNotIn("error", await self.manager.get_repo_status())
+    
+    async def test_slow_fingerprints_do_not_block_the_loop(self):
+        self.cache.scan_worktree = True
+        
+        def slow_signature(root):
+            time.sleep(0.3)
+            return (0, 0)
+        
+        gaps = []
+        
+        async def ticker():
+            last = time.perf_counter()
+            while True:
+                await asyncio.sleep(0.01)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+        
+        with mock.patch.object(github_manager, '_worktree_signature', slow_signature):
+            tick = asyncio.ensure_future(ticker())
+            managers = [AsyncGithubManager(self.repo, verbose=False,
+                                           status_cache=StatusCache(ttl=60, scan_worktree=True))
+                        for _ in range(5)]
+            statuses = await asyncio.gather(*(manager.get_repo_status(use_cache=True) for manager in managers))
+            tick.cancel()
+        self.assertTrue(all("error" not in status for status in statuses))
+        self.assertLess(max(gaps), 0.2)
+    
+    async def test_cached_status(self):
+        first = await self.manager.get_repo_status(use_cache=True)
+        self.assertEqual(await self.manager.get_repo_status(use_cache=True), first)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+    
+    async def test_commit_and_branches(self):
+        write_file(self.repo, 'new.txt', 'new\n')
+        self.assertTrue(await self.manager.commit_changes("Add new"))
+        self.assertEqual(git(self.repo, 'log', '-1', '--format=%s').strip(), "Add new")
+        self.assertTrue(await self.manager.create_branch('feature'))
+        self.assertIn('feature', await self.manager.list_branches())
+        self.assertEqual(await self.manager.list_branches(remote=True), [])
+    
+    async def test_timeouts_kill_git(self):
+        with self.assertRaises(subprocess.TimeoutExpired):
+            await self.manager._run(['sleep', '5'], timeout=0.1)
+
+if __name__ == '__main__':
+    unittest.main()
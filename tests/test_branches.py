@@ -0,0 +1,44 @@
+import unittest
+
+from github_manager import GithubManager
+from tests.support import RepoTestCase, commit_file, git
+
+class BranchOverviewTests(RepoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.remote = self.make_repo('remote.git', commits=0, bare=True)
+        self.repo = self.make_repo(commits=2)
+        git(self.repo, 'remote', 'add', 'origin', self.remote)
+        git(self.repo, 'push', '-q', '-u', 'origin', 'main')
+        git(self.repo, 'checkout', '-q', '-b', 'topic')
+        commit_file(self.repo, 'topic.txt', 'x\n', 'Topic work')
+        git(self.repo, 'push', '-q', '-u', 'origin', 'topic')
+        commit_file(self.repo, 'topic2.txt', 'y\n', 'More topic work')
+        git(self.repo, 'checkout', '-q', 'main')
+        self.manager = GithubManager(self.repo)
+    
+    def overview(self, **kwargs):
+        return {branch["ref"]: branch for branch in self.manager.get_branch_overview(**kwargs)}
+    
+    def test_upstream_tracking_and_base_comparison(self):
+        branches = self.overview(base='main')
+        topic = branches['refs/heads/topic']
+        self.assertEqual((topic["name"], topic["current"], topic["upstream"]), ('topic', False, 'refs/remotes/origin/topic'))
+        self.assertEqual((topic["ahead"], topic["behind"]), (1, 0))
+        self.assertEqual((topic["base_ahead"], topic["base_behind"]), (2, 0))
+        self.assertEqual(topic["message"], 'More topic work')
+        self.assertTrue(branches['refs/heads/main']["current"])
+        self.assertTrue(branches['refs/remotes/origin/topic']["remote"])
+        self.assertNotIn('refs/remotes/origin/topic', self.overview(include_remote=False))
+    
+    def test_gone_upstream(self):
+        git(self.repo, 'push', '-q', 'origin', '--delete', 'topic')
+        git(self.repo, 'fetch', '-q', '--prune')
+        topic = self.overview()['refs/heads/topic']
+        self.assertEqual((topic["ahead"], topic["behind"]), (None, None))
+    
+    def test_unknown_base(self):
+        self.assertEqual(self.manager.get_branch_overview(base='nope'), [{"error": "Unknown base branch 'nope'"}])
+
+if __name__ == '__main__':
+    unittest.main()
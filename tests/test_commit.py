@@ -0,0 +1,58 @@
+import unittest
+from unittest import mock
+
+import github_manager
+from github_manager import GithubManager, SmokeTestCache, StatusCache, changed_paths
+from tests.support import RepoTestCase, git, write_file
+
+class CommitTests(RepoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.repo = self.make_repo(commits=2)
+        self.manager = GithubManager(self.repo, status_cache=StatusCache(), smoke_cache=SmokeTestCache())
+    
+    def committed_paths(self):
+        return sorted(git(self.repo, 'show', '--name-only', '--format=', 'HEAD').splitlines())
+    
+    def test_stages_exactly_the_changed_paths(self):
+        write_file(self.repo, 'file0.txt', 'changed\n')
+        write_file(self.repo, 'new dir/with space.txt', 'new\n')
+        git(self.repo, 'rm', '-q', 'file1.txt')
+        self.assertTrue(self.manager.commit_changes("Everything"))
+        self.assertEqual(self.committed_paths(), ['file0.txt', 'file1.txt', 'new dir/with space.txt'])
+        self.assertEqual(git(self.repo, 'status', '--porcelain'), '')
+    
+    def test_pathspecs_only_stage_matches(self):
+        write_file(self.repo, 'file0.txt', 'changed\n')
+        write_file(self.repo, 'notes.md', 'keep out\n')
+        self.assertTrue(self.manager.commit_changes("Text only", files=['*.txt']))
+        self.assertEqual(self.committed_paths(), ['file0.txt'])
+        self.assertEqual(git(self.repo, 'status', '--porcelain'), '?? notes.md\n')
+    
+    def test_one_status_per_commit(self):
+        write_file(self.repo, 'file0.txt', 'changed\n')
+        commands = []
+        run_command = github_manager.run_command
+        
+        def recording(cmd, *args, **kwargs):
+            commands.append(cmd[1])
+            return run_command(cmd, *args, **kwargs)
+        
+        with mock.patch.object(github_manager, 'run_command', recording):
+            self.assertTrue(self.manager.commit_changes("Once"))
+        self.assertEqual(commands.count('status'), 1)
+    
+    def test_nothing_to_commit(self):
+        head = git(self.repo, 'rev-parse', 'HEAD')
+        self.assertTrue(self.manager.commit_changes("Nothing"))
+        self.assertEqual(git(self.repo, 'rev-parse', 'HEAD'), head)
+    
+    def test_changed_paths_skip_what_is_already_staged(self):
+        git(self.repo, 'mv', 'file0.txt', 'renamed.txt')
+        write_file(self.repo, 'file1.txt', 'changed\n')
+        write_file(self.repo, 'untracked.txt', 'new\n')
+        status = self.manager.get_repo_status()
+        self.assertEqual(sorted(changed_paths(status)), ['file1.txt', 'untracked.txt'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import unittest
+from unittest import mock
+
+import github_manager
+from github_manager import CommitIndex, GithubManager
+from tests.support import RepoTestCase, commit_file, git
+
+class CommitIndexTests(RepoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.repo = self.make_repo(commits=3)
+        self.index = CommitIndex(self.repo)
+        self.addCleanup(self.index.close)
+    
+    def indexed(self):
+        return {commit["hash"] for commit in self.index.query(limit=None)}
+    
+    def reachable(self):
+        return set(git(self.repo, 'rev-list', '--all').split())
+    
+    def test_incremental_updates(self):
+        self.assertEqual(self.index.update()["added"], 3)
+        self.assertEqual(self.index.update(), {"added": 0, "pruned": 0, "refs": 1})
+        commit_file(self.repo, 'more.txt', 'x\n')
+        git(self.repo, 'branch', 'feature')
+        result = self.index.update()
+        self.assertEqual((result["added"], result["refs"]), (1, 2))
+        self.assertEqual(self.indexed(), self.reachable())
+        self.assertTrue(self.index.verify()["ok"])
+    
+    def test_rewrites_and_deletions_are_pruned(self):
+        git(self.repo, 'branch', 'feature')
+        commit_file(self.repo, 'side.txt', 'x\n')
+        git(self.repo, 'checkout', '-q', 'feature')
+        commit_file(self.repo, 'feature.txt', 'x\n')
+        self.index.update()
+        git(self.repo, 'checkout', '-q', 'main')
+        git(self.repo, 'reset', '-q', '--hard', 'HEAD~2')
+        commit_file(self.repo, 'rewritten.txt', 'x\n')
+        git(self.repo, 'branch', '-D', '-q', 'feature')
+        result = self.index.update()
+        self.assertEqual(result["rewritten"], ["refs/heads/main"])
+        self.assertEqual(result["removed"], ["refs/heads/feature"])
+        self.assertEqual((result["added"], result["pruned"]), (1, 3))
+        self.assertEqual(self.indexed(), self.reachable())
+    
+    def test_rewrite_detection_is_one_git_process(self):
+        for n in range(3):
+            git(self.repo, 'branch', f'b{n}')
+        self.index.update()
+        for n in range(3):
+            git(self.repo, 'branch', '-f', f'b{n}', 'HEAD~1')
+        commands = []
+        run_command = github_manager.run_command
+        
+        def recording(cmd, *args, **kwargs):
+            commands.append(cmd[1])
+            return run_command(cmd, *args, **kwargs)
+        
+        with mock.patch.object(github_manager, 'run_command', recording):
+            result = self.index.update()
+        self.assertEqual(result["pruned"], 0)
+        self.assertNotIn('merge-base', commands)
+        self.assertEqual(commands.count('rev-list'), 1)
+    
+    def test_garbage_collected_tips_trigger_a_rebuild(self):
+        git(self.repo, 'checkout', '-q', '--orphan', 'fresh')
+        self.index.update()
+        commit_file(self.repo, 'orphan.txt', 'x\n')
+        git(self.repo, 'branch', '-D', '-q', 'main')
+        git(self.repo, 'reflog', 'expire', '--expire=now', '--all')
+        git(self.repo, 'gc', '-q', '--prune=now')
+        result = self.index.update()
+        self.assertTrue(result.get("rebuilt"))
+        self.assertEqual(self.indexed(), self.reachable())
+    
+    def test_queries(self):
+        commit_file(self.repo, 'ann.txt', 'x\n', 'By Ann', date='2024-05-01T00:00:00Z', author='Ann')
+        commit_file(self.repo, 'bob.txt', 'x\n', 'By Bob 100%', date='2024-06-01T00:00:00Z', author='Bob_')
+        manager = GithubManager(self.repo)
+        self.assertEqual([c["message"] for c in manager.search_commits(author='Ann', limit=None)], ['By Ann'])
+        # LIKE wildcards in the author are matched literally
+        self.assertEqual([c["message"] for c in manager.search_commits(author='b_', limit=None)], ['By Bob 100%'])
+        self.assertEqual(manager.search_commits(author='%', limit=None), [])
+        in_may = manager.search_commits(since='2024-04-15', until='2024-05-15', limit=None)
+        self.assertEqual([c["message"] for c in in_may], ['By Ann'])
+        manager.commit_index().close()
+    
+    def test_stored_inside_the_git_directory(self):
+        self.index.update()
+        self.assertTrue(os.path.isfile(os.path.join(self.repo, '.git', 'github_manager', 'commits.sqlite3')))
+        self.assertEqual(self.index.stats()["commits"], 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import signal
+import stat
+import subprocess
+import sys
+import time
+import unittest
+
+import github_manager
+from github_manager import GithubManagerDaemon, RemoteGithubManager, STATUS_CACHE
+from tests.support import RepoTestCase, settle_index
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'github_manager.py')
+
+class DaemonHandleTests(RepoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.repo = self.make_repo(commits=2)
+        self.daemon = GithubManagerDaemon(os.path.join(self.tmp, 'unused.sock'))
+    
+    def request(self, method, **params):
+        return self.daemon.handle({"jsonrpc": "2.0", "id": 1, "method": method, "params": dict(params, repo=self.repo)})
+    
+    def test_only_allowlisted_methods_are_reachable(self):
+        for method in ('close', 'ref_transaction', 'commit_index.close', 'status_cache.clear', '__class__',
+                       '_git', 'iter_status_entries', 'commit_index.update.__call__'):
+            with self.subTest(method=method):
+                self.assertEqual(self.request(method)["error"]["code"], -32601)
+        self.assertIn("result", self.request('commit_index.stats'))
+    
+    def test_bad_params_are_invalid_params(self):
+        self.assertEqual(self.request('get_repo_status', no_such_option=True)["error"]["code"], -32602)
+    
+    def test_status_is_served_from_the_status_cache(self):
+        settle_index(self.repo)
+        STATUS_CACHE.invalidate(self.repo)
+        first = self.request('get_repo_status')["result"]
+        hits = STATUS_CACHE.stats()["hits"]
+        second = self.request('get_repo_status')["result"]
+        self.assertEqual(first, second)
+        self.assertEqual(STATUS_CACHE.stats()["hits"], hits + 1)
+        self.request('get_repo_status', use_cache=False)
+        self.assertEqual(STATUS_CACHE.stats()["hits"], hits + 1)
+
+@unittest.skipUnless(hasattr(os, 'getuid'), "Unix sockets only")
+class DaemonSocketTests(RepoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.repo = self.make_repo(commits=3)
+        self.socket_path = os.path.join(self.tmp, 'daemon.sock')
+        process = subprocess.Popen([sys.executable, SCRIPT, 'serve', '--socket', self.socket_path],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.addCleanup(process.wait, 10)
+        self.addCleanup(process.send_signal, signal.SIGTERM)
+        deadline = time.monotonic() + 10
+        while not RemoteGithubManager.available(self.socket_path):
+            self.assertIsNone(process.poll(), "daemon exited")
+            self.assertLess(time.monotonic(), deadline, "daemon did not start")
+            time.sleep(0.05)
+        self.remote = RemoteGithubManager(self.repo, self.socket_path)
+        self.addCleanup(self.remote.close)
+    
+    def requests(self):
+        return self.remote.call('daemon.stats')["requests"]
+    
+    def test_socket_is_owner_only(self):
+        self.assertEqual(stat.S_IMODE(os.stat(self.socket_path).st_mode), 0o600)
+    
+    def test_positional_and_keyword_arguments_are_bound(self):
+        history = self.remote.get_commit_history(2, author='Test')
+        self.assertEqual([commit["message"] for commit in history], ['Commit 2', 'Commit 1'])
+        self.assertEqual(self.remote.resolve_refs(['HEAD', 'nope']),
+                         github_manager.GithubManager(self.repo).resolve_refs(['HEAD', 'nope']))
+        self.assertEqual(self.remote.commit_index().update()["added"], 3)
+        with self.assertRaises(TypeError):
+            self.remote.get_commit_history(2, 3)
+        with self.assertRaises(AttributeError):
+            self.remote.no_such_method
+    
+    def test_streaming_methods_run_locally(self):
+        before = self.requests()
+        messages = [commit.message for commit in self.remote.iter_commit_history()]
+        self.assertEqual(messages, ['Commit 2', 'Commit 1', 'Commit 0'])
+        self.assertEqual(self.requests(), before)
+        with self.assertRaisesRegex(RuntimeError, 'Method not found'):
+            self.remote.call('iter_commit_history')
+    
+    def test_refused_methods_raise(self):
+        with self.assertRaisesRegex(RuntimeError, 'Method not found'):
+            self.remote.call('close')
+
+if __name__ == '__main__':
+    unittest.main()
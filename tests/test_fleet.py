@@ -0,0 +1,89 @@
+import os
+import shutil
+import subprocess
+import sys
+import textwrap
+import unittest
+
+import github_manager
+from github_manager import FleetManager, RepoDiscovery
+from tests.support import RepoTestCase, commit_file, git, init_repo, write_file
+
+class FleetTests(RepoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.root = os.path.join(self.tmp, 'src')
+        self.clean = init_repo(os.path.join(self.root, 'clean'))
+        self.dirty = init_repo(os.path.join(self.root, 'group', 'dirty'))
+        write_file(self.dirty, 'file0.txt', 'changed\n')
+        os.makedirs(os.path.join(self.root, 'not-a-repo'))
+    
+    def test_status_across_repositories(self):
+        results = list(FleetManager([self.clean, self.dirty], max_workers=2).iter_status())
+        by_repo = {entry["repo"]: entry["result"] for entry in results}
+        self.assertFalse(by_repo[self.clean]["has_changes"])
+        self.assertTrue(by_repo[self.dirty]["has_changes"])
+        summary = FleetManager.summarize(results, 0.5)
+        self.assertEqual((summary["repos"], summary["dirty"], summary["errors"]), (2, 1, 0))
+    
+    def test_failures_are_reported_per_repository(self):
+        missing = os.path.join(self.tmp, 'missing')
+        results = list(FleetManager([self.clean, missing]).run(lambda manager: manager.get_repo_status()))
+        errors = {entry["repo"] for entry in results if "error" in entry["result"]}
+        self.assertEqual(errors, {missing})
+        raised = list(FleetManager([self.clean]).run(lambda manager: 1 / 0))
+        self.assertIn("division", raised[0]["result"]["error"])
+    
+    def test_smoke_tests(self):
+        results = list(FleetManager([self.clean, self.dirty]).iter_smoke_tests())
+        self.assertEqual(FleetManager.summarize(results, 0.1)["passed"], 2)
+    
+    def test_load_repo_paths(self):
+        self.assertEqual(sorted(FleetManager.load_repo_paths(self.root)), sorted([self.clean, self.dirty]))
+        manifest = os.path.join(self.tmp, 'repos.txt')
+        with open(manifest, 'w', encoding='utf-8') as f:
+            f.write("# fleet\nsrc/clean\n\nsrc/group/dirty\n")
+        self.assertEqual(FleetManager.load_repo_paths(manifest), [self.clean, self.dirty])
+    
+    def test_discovery_registry_reuses_unchanged_directories(self):
+        registry = os.path.join(self.tmp, 'registry.json')
+        bare = init_repo(os.path.join(self.root, 'mirror.git'), commits=0, bare=True)
+        found = {repo["path"]: repo["kind"] for repo in RepoDiscovery(registry).scan([self.root])}
+        self.assertEqual(found, {self.clean: "worktree", self.dirty: "worktree", bare: "bare"})
+        # Backdate every directory past the racy window so the saved listing is trusted
+        for path in (self.root, os.path.join(self.root, 'group'), os.path.join(self.root, 'not-a-repo')):
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10 * 10 ** 9))
+        RepoDiscovery(registry).scan([self.root])
+        again = RepoDiscovery(registry)
+        self.assertEqual(len(again.scan([self.root])), 3)
+        self.assertGreater(again.stats["reused"], 0)
+
+class FleetScaleTests(RepoTestCase):
+    REPOS = 100
+    
+    def test_many_repositories_under_a_low_descriptor_limit(self):
+        template = init_repo(os.path.join(self.tmp, 'template'), commits=2)
+        paths = []
+        for n in range(self.REPOS):
+            path = os.path.join(self.tmp, 'fleet', f'repo{n}')
+            shutil.copytree(template, path)
+            paths.append(path)
+        # Two cat-file workers left behind per repository would need far more than 128 descriptors
+        script = textwrap.dedent("""
+            import resource, sys
+            soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+            resource.setrlimit(resource.RLIMIT_NOFILE, (128, hard))
+            import github_manager
+            results = list(github_manager.FleetManager(sys.argv[1:], max_workers=8).iter_status())
+            errors = [entry["result"]["error"] for entry in results if "error" in entry["result"]]
+            print(len(results), len(github_manager.ObjectReader._readers), errors[:1])
+        """)
+        env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(github_manager.__file__)))
+        result = subprocess.run([sys.executable, '-c', script, *paths], capture_output=True, text=True,
+                                env=env, timeout=300)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.split(), [str(self.REPOS), '0', '[]'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import http.server
+import json
+import threading
+import time
+import unittest
+
+from github_manager import GithubAPIError, GithubClient
+from tests.support import RepoTestCase
+
+class StandInAPI(http.server.ThreadingHTTPServer):
+    """Tiny GitHub API stand-in: one user, a set of repositories, scripted throttling"""
+    
+    daemon_threads = True
+    
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StandInHandler)
+        self.repos = {'test/existing'}
+        self.seen = []
+        self.throttle = []
+        self.rate_headers = {"X-RateLimit-Limit": "5000", "X-RateLimit-Remaining": "4999",
+                             "X-RateLimit-Reset": str(int(time.time()) + 3600)}
+    
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_port}/api/v3'
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def reply(self, status, body=None, etag=None, headers=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else b''
+        self.send_response(status)
+        for name, value in {**self.server.rate_headers, **(headers or {})}.items():
+            self.send_header(name, value)
+        if etag:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def do_GET(self):
+        self.server.seen.append(('GET', self.path, self.headers.get('If-None-Match'), self.headers['Authorization']))
+        if self.server.throttle:
+            return self.reply(*self.server.throttle.pop(0))
+        path = self.path[len('/api/v3'):]
+        if path == '/user':
+            body, etag = {"login": "test"}, '"user-v1"'
+        elif path.startswith('/repos/') and path[len('/repos/'):] in self.server.repos:
+            name = path[len('/repos/'):]
+            body, etag = {"full_name": name, "html_url": f"https://example.com/{name}"}, f'"{name}"'
+        else:
+            return self.reply(404, {"message": "Not Found"})
+        if self.headers.get('If-None-Match') == etag:
+            return self.reply(304)
+        self.reply(200, body, etag)
+    
+    def do_POST(self):
+        self.server.seen.append(('POST', self.path, None, self.headers['Authorization']))
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        name = f"test/{body['name']}"
+        self.server.repos.add(name)
+        self.reply(201, {"full_name": name, "html_url": f"https://example.com/{name}"})
+
+class GithubClientTests(RepoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.server = StandInAPI()
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.client = self.client_for('secret')
+    
+    def client_for(self, token):
+        client = GithubClient(token=token, base_url=self.server.url, cache_path=self.tmp, reserve=0)
+        client.limiter.write_interval = 0
+        self.addCleanup(client.close)
+        return client
+    
+    def test_unchanged_responses_come_from_the_etag_cache(self):
+        self.assertEqual(self.client.get_repo('test/existing')["full_name"], 'test/existing')
+        self.assertEqual(self.client.get_repo('test/existing')["full_name"], 'test/existing')
+        self.assertEqual([entry[2] for entry in self.server.seen], [None, '"test/existing"'])
+        stats = self.client.rate_limit()
+        self.assertEqual((stats["requests"], stats["not_modified"], stats["connections"]), (2, 1, 1))
+        self.assertEqual((stats["limit"], stats["remaining"]), (5000, 4999))
+    
+    def test_cache_is_not_shared_between_tokens(self):
+        self.client.login()
+        other = self.client_for('other-secret')
+        other.login()
+        self.assertEqual([entry[2] for entry in self.server.seen], [None, None])
+        self.assertEqual(other.rate_limit()["not_modified"], 0)
+    
+    def test_error_statuses_raise(self):
+        with self.assertRaises(GithubAPIError) as raised:
+            self.client.get_repo('test/missing')
+        self.assertEqual((raised.exception.status, raised.exception.message), (404, 'Not Found'))
+        with self.assertRaises(GithubAPIError) as raised:
+            GithubClient(token='', base_url=self.server.url, cache_path=self.tmp).login()
+        self.assertEqual(raised.exception.status, 401)
+    
+    def test_throttled_requests_wait_and_retry(self):
+        self.server.throttle.append((403, {"message": "You have exceeded a secondary rate limit"}, None,
+                                     {"Retry-After": "1"}))
+        started = time.monotonic()
+        self.assertEqual(self.client.login(), 'test')
+        self.assertGreaterEqual(time.monotonic() - started, 0.9)
+        self.assertEqual(len(self.server.seen), 2)
+        self.assertGreaterEqual(self.client.rate_limit()["waited"], 0.9)
+    
+    def test_exhausted_limit_stops_before_sending(self):
+        self.server.rate_headers.update({"X-RateLimit-Remaining": "0",
+                                         "X-RateLimit-Reset": str(int(time.time()) + 3600)})
+        self.client.login()
+        with self.assertRaises(GithubAPIError) as raised:
+            self.client.get_repo('test/existing')
+        self.assertEqual(raised.exception.status, 429)
+        self.assertEqual(len(self.server.seen), 1)
+    
+    def test_create_repos_only_creates_missing(self):
+        results = {entry["repo"]: entry["result"] for entry in self.client.create_repos(['existing', 'fresh'])}
+        self.assertEqual(results['existing']["action"], 'exists')
+        self.assertEqual(results['fresh'], {"action": "created", "full_name": "test/fresh",
+                                            "html_url": "https://example.com/test/fresh"})
+        posts = [entry[:2] for entry in self.server.seen if entry[0] == 'POST']
+        self.assertEqual(posts, [('POST', '/api/v3/user/repos')])
+
+if __name__ == '__main__':
+    unittest.main()
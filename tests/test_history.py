@@ -0,0 +1,70 @@
+import unittest
+
+from github_manager import (BATCH_HISTORY_LIMIT, GithubManager, NulFieldParser, history_args, iter_nul_fields,
+                            parse_commit_records)
+from tests.support import RepoTestCase, commit_file, git
+
+class NulFieldTests(unittest.TestCase):
+    def test_records_split_across_chunks(self):
+        data = b'a\x00b\x00c\x00\nd\x00e\x00f\x00'
+        for size in range(1, len(data)):
+            chunks = [data[i:i + size] for i in range(0, len(data), size)]
+            self.assertEqual(list(iter_nul_fields(iter(chunks), 3)), [['a', 'b', 'c'], ['d', 'e', 'f']])
+    
+    def test_unterminated_last_record(self):
+        parser = NulFieldParser(2)
+        self.assertEqual(parser.feed(b'x\x00y\x00z'), [['x', 'y']])
+        self.assertEqual(parser.close(), [])
+        self.assertEqual(list(iter_nul_fields(iter([b'x\x00y']), 2)), [['x', 'y']])
+    
+    def test_undecodable_bytes_survive(self):
+        records = parse_commit_records(b'abc\x00caf\xe9\x00date\x00who\x00')
+        self.assertEqual(records[0]["message"], 'caf�')
+    
+    def test_history_args(self):
+        args = history_args(limit=5, skip=2, rev_range='main..feature', paths=['src'], author='ann')
+        self.assertEqual(args[-2:], ['--', 'src'])
+        self.assertIn('--max-count=5', args)
+        self.assertIn('--skip=2', args)
+        self.assertIn('main..feature', args)
+
+class HistoryTests(RepoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.repo = self.make_repo(commits=0)
+        commit_file(self.repo, 'a.txt', '1\n', 'First | with "quotes"\ttab', date='2024-01-01T12:00:00Z',
+                    author='Ann')
+        commit_file(self.repo, 'docs/b.txt', '2\n', 'Second – ünïcode', date='2024-02-01T12:00:00Z', author='Bob')
+        commit_file(self.repo, 'a.txt', '3\n', 'Third', date='2024-03-01T12:00:00Z', author='Ann')
+        self.manager = GithubManager(self.repo)
+    
+    def test_full_history_in_order(self):
+        messages = [commit.message for commit in self.manager.iter_commit_history()]
+        self.assertEqual(messages, ['Third', 'Second – ünïcode', 'First | with "quotes"\ttab'])
+    
+    def test_filters(self):
+        def messages(**filters):
+            return [commit.message for commit in self.manager.iter_commit_history(**filters)]
+        self.assertEqual(messages(limit=1, skip=1), ['Second – ünïcode'])
+        self.assertEqual(messages(author='Bob'), ['Second – ünïcode'])
+        self.assertEqual(messages(paths=['docs']), ['Second – ünïcode'])
+        self.assertEqual(messages(since='2024-01-15', until='2024-02-15'), ['Second – ünïcode'])
+        self.assertEqual(messages(rev_range='HEAD~1..HEAD'), ['Third'])
+    
+    def test_short_histories_use_the_cat_file_walk(self):
+        walked = self.manager.get_commit_history(2)
+        logged = self.manager.get_commit_history(BATCH_HISTORY_LIMIT + 1)[:2]
+        self.assertEqual(walked, logged)
+        self.assertEqual(walked[0]["hash"], git(self.repo, 'rev-parse', 'HEAD').strip())
+    
+    def test_closing_early_stops_git(self):
+        history = self.manager.iter_commit_history()
+        self.assertEqual(next(history).message, 'Third')
+        history.close()
+    
+    def test_bad_revision_raises(self):
+        with self.assertRaises(RuntimeError):
+            list(self.manager.iter_commit_history(rev_range='no-such-branch'))
+
+if __name__ == '__main__':
+    unittest.main()
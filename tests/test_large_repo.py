@@ -0,0 +1,38 @@
+import unittest
+from unittest import mock
+
+import github_manager
+from github_manager import GithubManager, StatusCache
+from tests.support import RepoTestCase, git, settle_index, write_file
+
+class LargeRepoTests(RepoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.repo = self.make_repo(commits=2)
+        settle_index(self.repo)
+    
+    def test_cached_status_never_walks_the_worktree(self):
+        cache = StatusCache(ttl=60, scan_worktree=True)
+        manager = GithubManager(self.repo, status_cache=cache, large_repo=True)
+        # The first run with the untracked cache on stores it in the index
+        manager.get_repo_status()
+        with mock.patch.object(github_manager, '_worktree_signature', side_effect=AssertionError("walked")):
+            for counts_only in (False, True, False):
+                self.assertNotIn("error", manager.get_repo_status(use_cache=True, counts_only=counts_only))
+        self.assertEqual(cache.stats()["hits"], 1)
+    
+    def test_untracked_cache_is_used_per_call(self):
+        manager = GithubManager(self.repo, large_repo=True)
+        self.assertEqual(manager._status_config()[:2], ['-c', 'core.untrackedCache=true'])
+        write_file(self.repo, 'new.txt', 'new\n')
+        self.assertEqual(manager.get_repo_status()["untracked_files"], ['new.txt'])
+        self.assertEqual(GithubManager(self.repo)._status_config(), [])
+    
+    def test_enable_large_repo_mode(self):
+        manager = GithubManager(self.repo)
+        self.assertTrue(manager.enable_large_repo_mode())
+        self.assertTrue(manager.large_repo)
+        self.assertEqual(git(self.repo, 'config', 'core.untrackedCache').strip(), 'true')
+
+if __name__ == '__main__':
+    unittest.main()
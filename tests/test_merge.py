@@ -0,0 +1,77 @@
+import os
+import unittest
+
+from github_manager import GithubManager
+from tests.support import RepoTestCase, commit_file, git
+
+class MergeTests(RepoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.repo = self.make_repo(commits=1)
+        git(self.repo, 'branch', 'clean')
+        git(self.repo, 'branch', 'conflict')
+        git(self.repo, 'checkout', '-q', 'clean')
+        commit_file(self.repo, 'clean.txt', 'x\n')
+        git(self.repo, 'checkout', '-q', 'conflict')
+        commit_file(self.repo, 'file0.txt', 'theirs\n')
+        git(self.repo, 'checkout', '-q', 'main')
+        commit_file(self.repo, 'file0.txt', 'ours\n')
+        self.manager = GithubManager(self.repo)
+    
+    def check(self, branches, target='main'):
+        return {result["branch"]: result for result in self.manager.check_mergeability(branches, target)}
+    
+    def test_clean_and_conflicting_branches(self):
+        results = self.check(['clean', 'conflict'])
+        self.assertTrue(results['clean']["clean"])
+        self.assertEqual(results['clean']["conflicts"], [])
+        self.assertFalse(results['conflict']["clean"])
+        self.assertEqual(results['conflict']["conflicts"], ['file0.txt'])
+        self.assertNotIn("error", results['conflict'])
+    
+    def test_unknown_branches_are_errors_not_conflicts(self):
+        results = self.check(['clean', 'no-such-branch'])
+        self.assertTrue(results['clean']["clean"])
+        self.assertIn("Unknown branch", results['no-such-branch']["error"])
+        self.assertFalse(results['no-such-branch']["clean"])
+    
+    def test_unknown_target(self):
+        results = self.check(['clean', 'conflict'], target='no-such-target')
+        self.assertEqual({result["error"] for result in results.values()}, {"Unknown target 'no-such-target'"})
+    
+    def test_non_commits_are_rejected(self):
+        results = self.check(['HEAD:file0.txt'])
+        self.assertIn("error", results['HEAD:file0.txt'])
+    
+    def test_mergeability_never_touches_the_worktree(self):
+        before = git(self.repo, 'status', '--porcelain')
+        self.check(['clean', 'conflict'])
+        self.assertEqual(git(self.repo, 'status', '--porcelain'), before)
+    
+    def test_merge_without_worktree(self):
+        git(self.repo, 'branch', 'target', 'main')
+        self.assertTrue(self.manager.merge_branch('clean', 'target', worktree=False))
+        self.assertEqual(git(self.repo, 'log', '-1', '--format=%P', 'target').split(),
+                         [git(self.repo, 'rev-parse', 'main').strip(), git(self.repo, 'rev-parse', 'clean').strip()])
+        self.assertIn('clean.txt', git(self.repo, 'ls-tree', '--name-only', 'target'))
+        self.assertFalse(os.path.exists(os.path.join(self.repo, 'clean.txt')))
+    
+    def test_merge_without_worktree_refuses(self):
+        git(self.repo, 'branch', 'target', 'main')
+        tip = git(self.repo, 'rev-parse', 'target')
+        self.assertFalse(self.manager.merge_branch('conflict', 'target', worktree=False))
+        self.assertFalse(self.manager.merge_branch('clean', 'main', worktree=False))
+        self.assertFalse(self.manager.merge_branch('no-such-branch', 'target', worktree=False))
+        self.assertEqual(git(self.repo, 'rev-parse', 'target'), tip)
+    
+    def test_merge_without_worktree_fast_forwards(self):
+        git(self.repo, 'branch', 'behind', 'main~1')
+        self.assertTrue(self.manager.merge_branch('main', 'behind', worktree=False))
+        self.assertEqual(git(self.repo, 'rev-parse', 'behind'), git(self.repo, 'rev-parse', 'main'))
+    
+    def test_merge_with_worktree(self):
+        self.assertTrue(self.manager.merge_branch('clean'))
+        self.assertTrue(os.path.exists(os.path.join(self.repo, 'clean.txt')))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+from tests.support import RepoTestCase, write_file
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'github_manager.py')
+
+class NdjsonCliTests(RepoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.repo = self.make_repo(commits=2)
+    
+    def records(self, *args, cwd=None):
+        result = subprocess.run([sys.executable, SCRIPT, '--no-daemon', '--format', 'ndjson', *args],
+                                cwd=cwd or self.repo, capture_output=True, text=True, check=True)
+        return [json.loads(line) for line in result.stdout.splitlines()]
+    
+    def test_status_counts(self):
+        write_file(self.repo, 'file0.txt', 'changed\n')
+        write_file(self.repo, 'new.txt', 'x\n')
+        [record] = self.records('status', '--counts')
+        self.assertEqual(record["type"], 'status_counts')
+        self.assertEqual(record["repo"], os.path.realpath(self.repo))
+        self.assertEqual((record["branch"], record["detached"], record["upstream"]), ('main', False, None))
+        self.assertEqual((record["modified"], record["untracked"], record["staged"]), (1, 1, 0))
+    
+    def test_status_counts_outside_a_repository(self):
+        [record] = self.records('status', '--counts', cwd=self.tmp)
+        self.assertEqual((record["type"], record["message"]), ('error', 'Not a git repository'))
+    
+    def test_index_records(self):
+        [update] = self.records('index', 'update')
+        self.assertEqual((update["type"], update["action"], update["added"], update["refs"]), ('index', 'update', 2, 1))
+        [stats] = self.records('index', 'stats')
+        self.assertEqual((stats["action"], stats["commits"]), ('stats', 2))
+        self.assertEqual(set(update), set(stats))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import unittest
+from unittest import mock
+
+from github_manager import GithubManager, ObjectReader, read_commit_info
+from tests.support import RepoTestCase, commit_file, git
+
+class ObjectReaderTests(RepoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.repo = self.make_repo(commits=3)
+        self.reader = ObjectReader(self.repo)
+        self.addCleanup(self.reader.close)
+    
+    def test_check_and_resolve(self):
+        head = git(self.repo, 'rev-parse', 'HEAD').strip()
+        found = self.reader.check(['HEAD', 'HEAD:file0.txt', 'missing', 'name with spaces'])
+        self.assertEqual(found['HEAD'][:2], (head, 'commit'))
+        self.assertEqual(found['HEAD:file0.txt'][1:], ('blob', 2))
+        self.assertIsNone(found['missing'])
+        self.assertIsNone(found['name with spaces'])
+        self.assertEqual(self.reader.resolve(['main'])['main'], head)
+    
+    def test_read_commit_peels_tags(self):
+        git(self.repo, 'tag', '-a', '-m', 'Release', 'v1')
+        commit = self.reader.read_commit('v1')
+        self.assertEqual(commit["message"], "Commit 2")
+        self.assertEqual(commit["author_email"], "test@example.com")
+        self.assertIsNone(self.reader.read_commit('HEAD:file0.txt'))
+    
+    def test_walk_commits_matches_git_log(self):
+        expected = git(self.repo, 'log', '--format=%H').split()
+        self.assertEqual([commit["hash"] for commit in self.reader.walk_commits('HEAD', 10)], expected)
+        self.assertEqual([commit["hash"] for commit in self.reader.walk_commits('HEAD', 1, skip=1)], expected[1:2])
+    
+    def test_requests_larger_than_a_pipe_buffer(self):
+        names = [f'refs/heads/does-not-exist-{n}' for n in range(3000)] + ['HEAD']
+        found = self.reader.check(names)
+        self.assertEqual(sum(info is not None for info in found.values()), 1)
+    
+    def test_restarts_a_killed_worker(self):
+        self.reader.read('HEAD')
+        self.reader._batch.process.kill()
+        self.reader._batch.process.wait()
+        self.assertEqual(self.reader.read('HEAD')[1], 'commit')
+        self.assertEqual(self.reader._batch.restarts, 1)
+    
+    def test_sees_new_commits(self):
+        self.reader.read('HEAD')
+        head = commit_file(self.repo, 'later.txt', 'x\n')
+        self.assertEqual(self.reader.resolve(['HEAD'])['HEAD'], head)
+    
+    def test_read_commit_info(self):
+        info = read_commit_info(self.repo)
+        self.assertEqual(set(info), {"hash", "message", "date", "author"})
+        self.assertEqual(read_commit_info(self.repo, 'missing'), {})
+
+class ReaderRegistryTests(RepoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(ObjectReader.close_all)
+    
+    def test_least_recently_used_readers_are_closed(self):
+        repos = [self.make_repo(f'repo{n}') for n in range(3)]
+        with mock.patch.object(ObjectReader, 'max_readers', 2):
+            first = ObjectReader.for_repo(repos[0])
+            first.read('HEAD')
+            ObjectReader.for_repo(repos[1]).read('HEAD')
+            ObjectReader.for_repo(repos[2]).read('HEAD')
+            self.assertIsNone(first._batch.process)
+            self.assertNotIn(os.path.realpath(repos[0]), ObjectReader._readers)
+            self.assertIs(ObjectReader.for_repo(repos[2]), ObjectReader.for_repo(repos[2]))
+    
+    def test_manager_close_releases_its_reader(self):
+        repo = self.make_repo()
+        with GithubManager(repo) as manager:
+            manager.get_repo_status()
+            self.assertIn(os.path.realpath(repo), ObjectReader._readers)
+        self.assertNotIn(os.path.realpath(repo), ObjectReader._readers)
+
+if __name__ == '__main__':
+    unittest.main()
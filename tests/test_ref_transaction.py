@@ -0,0 +1,85 @@
+import os
+import unittest
+
+from github_manager import GithubManager, parse_ref_batch
+from tests.support import RepoTestCase, git
+
+class RefTransactionTests(RepoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.repo = self.make_repo(commits=2)
+        self.first = git(self.repo, 'rev-parse', 'HEAD~1').strip()
+        self.second = git(self.repo, 'rev-parse', 'HEAD').strip()
+        git(self.repo, 'branch', 'topic', self.first)
+        self.manager = GithubManager(self.repo)
+    
+    def refs(self):
+        return git(self.repo, 'for-each-ref', '--format=%(refname) %(objectname)')
+    
+    def test_batch_is_applied_together(self):
+        result = (self.manager.ref_transaction('move refs')
+                  .create('feature', self.first)
+                  .update('topic', self.second, self.first)
+                  .create('tags/v1', self.second)
+                  .verify('main', self.second)
+                  .commit())
+        self.assertEqual(result, {"applied": 3, "refs": ['refs/heads/feature', 'refs/heads/topic', 'refs/tags/v1']})
+        self.assertEqual(self.manager.resolve_refs(['feature', 'topic', 'v1']),
+                         {'feature': self.first, 'topic': self.second, 'v1': self.second})
+        self.assertIn('move refs', git(self.repo, 'reflog', 'show', 'topic'))
+    
+    def test_failed_check_changes_nothing(self):
+        before = self.refs()
+        result = (self.manager.ref_transaction()
+                  .create('feature', self.first)
+                  .delete('topic')
+                  .update('topic', self.second, self.second)
+                  .commit())
+        self.assertIn("error", result)
+        result = (self.manager.ref_transaction()
+                  .create('feature', self.first)
+                  .verify('topic', self.second)
+                  .commit())
+        self.assertIn("error", result)
+        self.assertEqual(self.refs(), before)
+    
+    def test_checked_out_branch_is_refused(self):
+        before = self.refs()
+        result = self.manager.update_refs([{"action": "create", "ref": "feature", "new": self.first},
+                                           {"action": "update", "ref": "main", "new": self.first}])
+        self.assertEqual(result, {"error": "Refusing to change checked-out branch(es): refs/heads/main"})
+        self.assertEqual(self.refs(), before)
+        
+        git(self.repo, 'worktree', 'add', '-q', os.path.join(self.tmp, 'linked'), 'topic')
+        result = self.manager.update_refs([{"action": "delete", "ref": "topic"}])
+        self.assertIn("refs/heads/topic", result["error"])
+        
+        result = self.manager.update_refs([{"action": "update", "ref": "main", "new": self.first}],
+                                          allow_checked_out=True)
+        self.assertEqual(result["applied"], 1)
+        self.assertEqual(self.manager.resolve_refs(['main'])['main'], self.first)
+    
+    def test_invalid_operations(self):
+        self.assertIn("Invalid ref operation", self.manager.update_refs([{"action": "rename", "ref": "topic"}])["error"])
+        self.assertIn("needs a new value", self.manager.update_refs([{"action": "create", "ref": "x"}])["error"])
+        self.assertEqual(self.manager.ref_transaction().commit(), {"applied": 0, "refs": []})
+
+class ParseRefBatchTests(unittest.TestCase):
+    def test_lines(self):
+        operations = parse_ref_batch(['# move the release', '', 'create refs/tags/v2 HEAD',
+                                      'update main abc def  # checked', 'delete topic', 'verify other'])
+        self.assertEqual(operations, [
+            {"action": "create", "ref": "refs/tags/v2", "new": "HEAD", "old": None},
+            {"action": "update", "ref": "main", "new": "abc", "old": "def"},
+            {"action": "delete", "ref": "topic", "old": None},
+            {"action": "verify", "ref": "other", "old": None},
+        ])
+    
+    def test_malformed_lines(self):
+        for line in ('create only-ref', 'rename a b', 'delete a b c'):
+            with self.subTest(line=line):
+                with self.assertRaisesRegex(ValueError, 'line 1'):
+                    parse_ref_batch([line])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import unittest
+
+from github_manager import GithubManager, StatusCache, count_status_v2, parse_status_v2, status_file_record
+from tests.support import RepoTestCase, commit_file, git, write_file
+
+# `a` modified in the worktree, `b` renamed to `b2`, `c` deleted from the index but still on disk, `new` untracked
+PORCELAIN = (
+    b'# branch.oid d1d5c4c4f5b93e97c84801b2cc36615d12162692\x00# branch.head main\x00'
+    b'# branch.upstream origin/main\x00# branch.ab +2 -1\x00'
+    b'1 .M N... 100644 100644 100644 7898192261 7898192261 a\x00'
+    b'2 R. N... 100644 100644 100644 6178079822 6178079822 R100 b2\x00b\x00'
+    b'1 D. N... 100644 000000 000000 f2ad6c76f0 0000000000 c\x00'
+    b'? c\x00? new with spaces\x00'
+)
+
+class ParseStatusTests(unittest.TestCase):
+    def test_parse_status_v2(self):
+        status = parse_status_v2(PORCELAIN)
+        self.assertEqual(status["current_branch"], "main")
+        self.assertEqual(status["upstream"], "origin/main")
+        self.assertEqual((status["ahead"], status["behind"]), (2, 1))
+        self.assertTrue(status["is_ahead"] and status["is_behind"])
+        self.assertEqual(status["modified_files"], ["a"])
+        self.assertEqual(status["renamed_files"], [{"from": "b", "to": "b2"}])
+        self.assertEqual(status["deleted_files"], ["c"])
+        self.assertEqual(status["untracked_files"], ["c", "new with spaces"])
+        self.assertEqual(status["staged_files"], ["b2", "c"])
+        self.assertEqual(status["unstaged_files"], ["a"])
+        self.assertTrue(status["has_changes"])
+    
+    def test_count_status_v2_matches_parse(self):
+        counts = count_status_v2(PORCELAIN)["counts"]
+        self.assertEqual(counts, {"modified": 1, "added": 0, "deleted": 1, "renamed": 1, "conflicted": 0,
+                                  "untracked": 2, "staged": 2, "unstaged": 1})
+    
+    def test_unborn_and_detached_heads(self):
+        unborn = parse_status_v2(b'# branch.oid (initial)\x00# branch.head main\x00')
+        self.assertIsNone(unborn["head_oid"])
+        self.assertFalse(unborn["has_changes"])
+        detached = parse_status_v2(b'# branch.oid 0123456789\x00# branch.head (detached)\x00')
+        self.assertTrue(detached["detached"])
+    
+    def test_file_records(self):
+        status = parse_status_v2(PORCELAIN)
+        records = [status_file_record(entry) for entry in status["files"]]
+        self.assertEqual([record["state"] for record in records],
+                         ["modified", "renamed", "deleted", "untracked", "untracked"])
+        self.assertEqual(records[1]["orig_path"], "b")
+
+class RepoStatusTests(RepoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.repo = self.make_repo(commits=2)
+        self.manager = GithubManager(self.repo, status_cache=StatusCache())
+    
+    def test_clean_repository(self):
+        status = self.manager.get_repo_status()
+        self.assertNotIn("error", status)
+        self.assertEqual(status["current_branch"], "main")
+        self.assertFalse(status["has_changes"])
+        self.assertEqual(status["last_commit"]["message"], "Commit 1")
+        self.assertEqual(status["head_oid"], git(self.repo, 'rev-parse', 'HEAD').strip())
+    
+    def test_changes_and_pathspecs(self):
+        write_file(self.repo, 'file0.txt', 'changed\n')
+        write_file(self.repo, 'sub/new.txt', 'new\n')
+        status = self.manager.get_repo_status(untracked='all')
+        self.assertEqual(status["modified_files"], ["file0.txt"])
+        self.assertEqual(status["untracked_files"], ["sub/new.txt"])
+        scoped = self.manager.get_repo_status(paths=['sub'])
+        self.assertEqual(scoped["modified_files"], [])
+        self.assertEqual(scoped["untracked_files"], ["sub/"])
+        counts = self.manager.get_repo_status(counts_only=True)["counts"]
+        self.assertEqual((counts["modified"], counts["untracked"]), (1, 1))
+    
+    def test_upstream_tracking(self):
+        remote = self.make_repo('remote.git', commits=0, bare=True)
+        git(self.repo, 'remote', 'add', 'origin', remote)
+        git(self.repo, 'push', '-q', '-u', 'origin', 'main')
+        commit_file(self.repo, 'ahead.txt', 'x\n')
+        status = self.manager.get_repo_status()
+        self.assertEqual(status["upstream"], "origin/main")
+        self.assertEqual((status["ahead"], status["behind"]), (1, 0))
+        self.assertEqual(status["remotes"], [f"origin\t{remote} (fetch)", f"origin\t{remote} (push)"])
+    
+    def test_streamed_entries(self):
+        write_file(self.repo, 'file1.txt', 'changed\n')
+        records = list(self.manager.iter_status_entries())
+        self.assertEqual(records[0]["type"], "status")
+        self.assertEqual([(record["path"], record["state"]) for record in records[1:]], [("file1.txt", "modified")])
+        self.assertTrue(self.manager.is_dirty())
+    
+    def test_not_a_repository(self):
+        plain = os.path.join(self.tmp, 'plain')
+        os.makedirs(plain)
+        self.assertIn("error", GithubManager(plain).get_repo_status())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import time
+import unittest
+from unittest import mock
+
+import github_manager
+from github_manager import GithubManager, StatusCache
+from tests.support import RepoTestCase, commit_file, git, settle_index, write_file
+
+class StatusCacheTests(RepoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.repo = self.make_repo(commits=2)
+        settle_index(self.repo)
+        self.cache = StatusCache(ttl=60)
+        self.manager = GithubManager(self.repo, status_cache=self.cache)
+    
+    def test_uncached_status_never_fingerprints(self):
+        with mock.patch.object(StatusCache, 'fingerprint', side_effect=AssertionError("fingerprinted")), \
+                mock.patch.object(github_manager, '_worktree_signature', side_effect=AssertionError("walked")):
+            self.manager.get_repo_status()
+            self.manager.get_repo_status(counts_only=True)
+        self.assertEqual(self.cache.stats()["entries"], 0)
+    
+    def test_uncached_status_sees_worktree_edits_at_once(self):
+        self.manager.get_repo_status(use_cache=True)
+        write_file(self.repo, 'new.txt', 'new\n')
+        self.assertEqual(self.manager.get_repo_status()["untracked_files"], ["new.txt"])
+    
+    def test_repeated_lookups_hit(self):
+        first = self.manager.get_repo_status(use_cache=True)
+        second = self.manager.get_repo_status(use_cache=True)
+        self.assertEqual(first, second)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+    
+    def test_commit_invalidates(self):
+        self.manager.get_repo_status(use_cache=True)
+        head = commit_file(self.repo, 'file0.txt', 'changed\n')
+        self.assertEqual(self.manager.get_repo_status(use_cache=True)["head_oid"], head)
+    
+    def test_checkout_invalidates(self):
+        self.manager.get_repo_status(use_cache=True)
+        git(self.repo, 'checkout', '-q', '-b', 'other')
+        self.assertEqual(self.manager.get_repo_status(use_cache=True)["current_branch"], "other")
+    
+    def test_upstream_ref_is_watched(self):
+        remote = self.make_repo('remote.git', commits=0, bare=True)
+        git(self.repo, 'remote', 'add', 'origin', remote)
+        git(self.repo, 'push', '-q', '-u', 'origin', 'main')
+        self.assertEqual(self.manager.get_repo_status(use_cache=True)["behind"], 0)
+        # Move the remote-tracking ref back one commit, as a fetch of a rewound branch would
+        git(self.repo, 'update-ref', 'refs/remotes/origin/main', 'HEAD~1')
+        self.assertEqual(self.manager.get_repo_status(use_cache=True)["ahead"], 1)
+    
+    def test_worktree_edits_wait_for_the_ttl(self):
+        self.cache.ttl = 0.2
+        self.manager.get_repo_status(use_cache=True)
+        write_file(self.repo, 'new.txt', 'new\n')
+        self.assertEqual(self.manager.get_repo_status(use_cache=True)["untracked_files"], [])
+        time.sleep(0.3)
+        self.assertEqual(self.manager.get_repo_status(use_cache=True)["untracked_files"], ["new.txt"])
+    
+    def test_scan_worktree_sees_edits_at_once(self):
+        self.cache.scan_worktree = True
+        self.manager.get_repo_status(use_cache=True)
+        write_file(self.repo, 'new.txt', 'new\n')
+        self.assertEqual(self.manager.get_repo_status(use_cache=True)["untracked_files"], ["new.txt"])
+    
+    def test_disabled_cache_stores_nothing(self):
+        manager = GithubManager(self.repo, status_cache=StatusCache(max_entries=0))
+        manager.get_repo_status(use_cache=True)
+        manager.get_repo_status(use_cache=True)
+        self.assertEqual(manager.status_cache.stats()["hits"], 0)
+
+if __name__ == '__main__':
+    unittest.main()